@@ -4,12 +4,12 @@ from typing import List
 from pydantic import BaseModel
 from datetime import datetime, timezone
 import uuid
-import jwt  # Install with `pip install pyjwt`
-from prometheus_client import make_asgi_app
+from common.metrics import make_metrics_app, worker_started, worker_stopped
 from common.middleware import MetricsMiddleware
-from sqlalchemy import create_engine, Column, String, Float, DateTime
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select
+from common.database import SessionRouter, set_read_key
+from common import migrations, queries
+from common.models import AccountModel
 import os
 from fastapi.responses import HTMLResponse
 from fastapi import Form
@@ -17,10 +17,12 @@ from fastapi import FastAPI, Form, Depends, HTTPException
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.requests import Request
-
-# Secret key (should be loaded from environment or secrets)
-JWT_SECRET = "sample_secret"  # Same secret used in auth-service
-ALGORITHM = "HS256"
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi import Query
+import base64
+import binascii
+from contextlib import asynccontextmanager
+from common.lifecycle import Readiness
 
 # Database setup with environment variables
 MYSQL_USER = "root"
@@ -29,25 +31,15 @@ MYSQL_HOST = os.getenv("MYSQL_HOST", "account-mysql")
 MYSQL_PORT = 3306
 MYSQL_DB = os.getenv("MYSQL_DB", "accounts_db")
 
-DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
-
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+DATABASE_URL = os.getenv("DATABASE_URL", f"mysql+aiomysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}")
 
-# Database model
-class AccountModel(Base):
-    __tablename__ = "accounts"
-    account_id = Column(String, primary_key=True, index=True)
-    customer_id = Column(String, nullable=False)
-    account_type = Column(String, nullable=False)
-    currency = Column(String, nullable=False)
-    balance = Column(Float, nullable=False)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
-    status = Column(String, default="ACTIVE")
+ACCOUNTS_PAGE_DEFAULT_LIMIT = int(os.getenv("ACCOUNTS_PAGE_DEFAULT_LIMIT", "50"))
+ACCOUNTS_PAGE_MAX_LIMIT = int(os.getenv("ACCOUNTS_PAGE_MAX_LIMIT", "500"))
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Writes go to the primary; read-only sessions to DATABASE_REPLICA_URLS if set
+db_router = SessionRouter(DATABASE_URL)
+engine = db_router.primary
+SessionLocal = db_router.session
 
 # Pydantic models
 class AccountBase(BaseModel):
@@ -61,22 +53,45 @@ class AccountResponse(AccountBase):
     created_at: datetime
     status: str
 
-app = FastAPI()
+# Columns the JSON listing can project
+ACCOUNT_FIELDS = {column.name: column for column in AccountModel.__table__.columns}
+
+readiness = Readiness(engine)
+
+async def apply_migrations():
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations.upgrade)
+
+# Migrations retry in the background until the database is reachable, so a
+# brief MySQL outage delays readiness instead of failing worker boot
+@asynccontextmanager
+async def lifespan(app):
+    worker_started()
+    readiness.start("migrations", apply_migrations)
+    try:
+        yield
+    finally:
+        await readiness.stop()
+        await db_router.dispose()
+        worker_stopped()
+
+app = FastAPI(lifespan=lifespan)
 templates = Jinja2Templates(directory="templates")
 app.add_middleware(MetricsMiddleware, app_name="account-service")
 
-metrics_app = make_asgi_app()
+metrics_app = make_metrics_app()
 app.mount("/metrics", metrics_app)
 
 #oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # Dependency for DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
+
+async def get_read_db():
+    async with SessionLocal(read_only=True) as db:
         yield db
-    finally:
-        db.close()
 
 
 @app.get("/accounts", response_class=HTMLResponse)
@@ -106,10 +121,10 @@ async def create_account_via_form(
         status="ACTIVE",
     )
 
-    # Save to database
+    # Save to database; the customer's next reads see it on the primary
+    set_read_key(db, customer_id)
     db.add(account_data)
-    db.commit()
-    db.refresh(account_data)
+    await db.commit()
 
     # Return success message
     return templates.TemplateResponse(
@@ -130,10 +145,11 @@ async def render_customer_id_form(request: Request):
 
 # Fetch and display account details based on `customer_id`
 @app.post("/account-details", response_class=HTMLResponse)
-async def get_account_details(request: Request, customer_id: str = Form(...), db=Depends(get_db)):
+async def get_account_details(request: Request, customer_id: str = Form(...), db=Depends(get_read_db)):
     """Fetch and display account details for a given customer_id."""
+    set_read_key(db, customer_id)
     # Query the database for the provided customer_id
-    accounts = db.query(AccountModel).filter(AccountModel.customer_id == customer_id).all()
+    accounts = await queries.list_accounts(db, customer_id)
 
     if not accounts:
         return templates.TemplateResponse(
@@ -148,6 +164,64 @@ async def get_account_details(request: Request, customer_id: str = Form(...), db
     )
 
 
+def encode_cursor(account_id: str) -> str:
+    return base64.urlsafe_b64encode(account_id.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/customers/{customer_id}/accounts", response_class=ORJSONResponse)
+async def list_customer_accounts(
+    customer_id: str,
+    limit: int = Query(ACCOUNTS_PAGE_DEFAULT_LIMIT, ge=1, le=ACCOUNTS_PAGE_MAX_LIMIT),
+    cursor: str = None,
+    fields: str = None,
+    db=Depends(get_read_db),
+):
+    """List a customer's accounts one page at a time, ordered by account_id.
+
+    Pass the returned ``next_cursor`` to get the following page; it is null
+    on the last one. ``fields`` is a comma-separated subset of the account
+    columns (all by default).
+    """
+    names = list(dict.fromkeys(name.strip() for name in (fields or "").split(",") if name.strip()))
+    unknown = [name for name in names if name not in ACCOUNT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    names = names or list(ACCOUNT_FIELDS)
+    set_read_key(db, customer_id)
+
+    # Keyset pagination: seek past the last account_id of the previous page
+    # (customer_id index, ordered by the primary key) and fetch one extra row
+    # to know whether another page follows
+    columns = [ACCOUNT_FIELDS[name] for name in names]
+    if "account_id" not in names:
+        columns.append(AccountModel.account_id)
+    query = select(*columns).where(AccountModel.customer_id == customer_id)
+    if cursor:
+        query = query.where(AccountModel.account_id > decode_cursor(cursor))
+    query = query.order_by(AccountModel.account_id).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].account_id)
+    return ORJSONResponse({
+        "customer_id": customer_id,
+        "accounts": [{name: row._mapping[name] for name in names} for row in rows],
+        "next_cursor": next_cursor,
+    })
+
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "account"}
\ No newline at end of file
+    return {"status": "healthy", "service": "account"}
+
+@app.get("/ready")
+async def readiness_check():
+    ready, detail = await readiness.check()
+    return JSONResponse({**detail, "service": "account"}, status_code=200 if ready else 503)
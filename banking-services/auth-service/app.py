@@ -5,22 +5,20 @@ from fastapi import Request
 from pydantic import BaseModel
 from datetime import datetime, timezone
 import uuid
-import jwt  # Install with `pip install pyjwt`
-from prometheus_client import make_asgi_app
+from common.metrics import make_metrics_app, worker_started, worker_stopped
 from common.middleware import MetricsMiddleware
-from sqlalchemy import create_engine, Column, String, Float, DateTime
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from common.customer_index import CustomerIndex
+from common.tokens import SessionTokens
+from common.database import SessionRouter
+from common import migrations, queries
 import os
 from fastapi.responses import HTMLResponse
 from fastapi import Form
+from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from common.lifecycle import Readiness
+from common.tracing import instrument_app, setup_tracing
 from opentelemetry import trace
-from opentelemetry.sdk.resources import Resource
-from opentelemetry.exporter.jaeger.thrift import JaegerExporter
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.instrumentation.requests import RequestsInstrumentor
 from opentelemetry.propagate import set_global_textmap
 from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
 from opentelemetry.context import attach
@@ -29,9 +27,8 @@ import os
 
 
 
-# Secret key (should be loaded from environment or secrets)
-JWT_SECRET = "sample_secret"  # Same secret used in auth-service
-ALGORITHM = "HS256"
+# Signs session tokens with the active key of JWT_KEYS (see common.tokens)
+session_tokens = SessionTokens()
 
 # Database setup with environment variables
 MYSQL_USER = "root"
@@ -40,25 +37,12 @@ MYSQL_HOST = os.getenv("MYSQL_HOST", "account-mysql")
 MYSQL_PORT = 3306
 MYSQL_DB = os.getenv("MYSQL_DB", "accounts_db")
 
-DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
+DATABASE_URL = os.getenv("DATABASE_URL", f"mysql+aiomysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}")
 
-engine = create_engine(DATABASE_URL, pool_recycle=280, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
-
-# Database model
-class AccountModel(Base):
-    __tablename__ = "accounts"
-    account_id = Column(String, primary_key=True, index=True)
-    customer_id = Column(String, nullable=False)
-    account_type = Column(String, nullable=False)
-    currency = Column(String, nullable=False)
-    balance = Column(Float, nullable=False)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
-    status = Column(String, default="ACTIVE")
-
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Writes go to the primary; read-only sessions to DATABASE_REPLICA_URLS if set
+db_router = SessionRouter(DATABASE_URL)
+engine = db_router.primary
+SessionLocal = db_router.session
 
 # Pydantic models
 class AccountBase(BaseModel):
@@ -72,54 +56,64 @@ class AccountResponse(AccountBase):
     created_at: datetime
     status: str
 
-app = FastAPI()
-
-#Jaegar Setup
-resource = Resource(attributes={
-    "service.name": "auth-service",
-    "service.namespace": "finance",
-    "service.version": "1.0.0",
-})
-# Set up OpenTelemetry tracing
-# Set up tracer provider
-tracer_provider = TracerProvider(resource=resource)
-trace.set_tracer_provider(tracer_provider)
-
-# Configure Jaeger exporter
-jaeger_exporter = JaegerExporter(
-    agent_host_name="jaeger",  # Change this to your Jaeger agent's hostname
-    agent_port=6831,             # Default Jaeger agent port
-)
-# Add span processor
-span_processor = BatchSpanProcessor(jaeger_exporter)
-tracer_provider.add_span_processor(span_processor)
-
-# Instrument FastAPI and Requests
-FastAPIInstrumentor.instrument_app(app)
-RequestsInstrumentor().instrument()
-
-# Add the exporter to the trace processor
-#trace.get_tracer_provider().add_span_processor(BatchSpanProcessor(jaeger_exporter))
-
-# Set the global propagator
-set_global_textmap(TraceContextTextMapPropagator())
+readiness = Readiness(engine)
+
+async def apply_migrations():
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations.upgrade)
+
+# Heavy initialization runs once per worker when it starts serving, not at
+# import; migrations retry in the background until the database is reachable
+@asynccontextmanager
+async def lifespan(app):
+    worker_started()
+    tracer_provider = setup_tracing("auth-service")
+    # Set the global propagator
+    set_global_textmap(TraceContextTextMapPropagator())
+    readiness.start("migrations", apply_migrations)
+    customer_index.start()
+    try:
+        yield
+    finally:
+        await customer_index.stop()
+        await readiness.stop()
+        await db_router.dispose()
+        tracer_provider.shutdown()
+        worker_stopped()
+
+app = FastAPI(lifespan=lifespan)
+
+# Instrument FastAPI
+instrument_app(app)
 
 # Add middleware for metrics
 app.add_middleware(MetricsMiddleware, app_name="auth-service")
 
-metrics_app = make_asgi_app()
+metrics_app = make_metrics_app()
 app.mount("/metrics", metrics_app)
 
 # Dependency for DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
+
+async def get_read_db():
+    async with SessionLocal(read_only=True) as db:
         yield db
-    finally:
-        db.close()
+
+# Customer-existence index (one per worker)
+async def load_customer_page(after_created_at, after_account_id, limit):
+    async with SessionLocal(read_only=True) as db:
+        return await queries.load_customer_page(db, after_created_at, after_account_id, limit)
+
+async def find_account_id(customer_id):
+    async with SessionLocal(read_only=True) as db:
+        return await queries.find_account_id(db, customer_id)
+
+customer_index = CustomerIndex(load_customer_page, find_account_id)
 
 @app.get("/authenticate/{customer_id}")
-async def authenticate_customer(customer_id: str, request: Request, db=Depends(get_db)):
+async def authenticate_customer(customer_id: str, request: Request):
     propagator = TraceContextTextMapPropagator()
 
     # Extract trace context from the incoming request headers
@@ -127,12 +121,34 @@ async def authenticate_customer(customer_id: str, request: Request, db=Depends(g
     attach(context)
     tracer = trace.get_tracer("auth-service")
     with tracer.start_as_current_span("auth-process"):
-        account = db.query(AccountModel).filter(AccountModel.customer_id == customer_id).first()
-        if account:
+        if await customer_index.contains(customer_id):
             return {"message": f"Customer ID {customer_id} authenticated successfully."}
         else:
             raise HTTPException(status_code=404, detail=f"Customer ID {customer_id} not found in accounts.")
 
+@app.post("/token")
+async def issue_token(request: Request, customer_id: str = Form(...)):
+    """Issue a short-lived session token for an existing customer.
+
+    The token carries the customer's account ID so the services that
+    verify it need neither this service nor a lookup query.
+    """
+    context = TraceContextTextMapPropagator().extract(dict(request.headers))
+    attach(context)
+    tracer = trace.get_tracer("auth-service")
+    with tracer.start_as_current_span("token-issue"):
+        # The index's existence check yields the account ID too
+        account_id = await customer_index.account_id(customer_id)
+        if account_id is None:
+            raise HTTPException(status_code=404, detail=f"Customer ID {customer_id} not found in accounts.")
+        token, expires_in = session_tokens.issue(customer_id, acct=account_id)
+        return {"access_token": token, "token_type": "bearer", "expires_in": expires_in, "account_id": account_id}
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "account"}
+
+@app.get("/ready")
+async def readiness_check():
+    ready, detail = await readiness.check()
+    return JSONResponse({**detail, "service": "auth"}, status_code=200 if ready else 503)
@@ -0,0 +1,119 @@
+"""Throughput of /transaction-process against the group-commit window.
+
+Boots transaction-service in-process against DATABASE_URL (a throwaway
+SQLite file by default), seeds a few accounts and, for each window size,
+drives ``--concurrency`` clients for ``--duration`` seconds. ``off`` runs
+with group commit disabled as the baseline.
+
+    python benchmarks/group_commit_window.py --windows off,0,1,2,5,10
+"""
+import argparse
+import asyncio
+import importlib.util
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_transaction_service():
+    service_dir = os.path.join(ROOT, "transaction-service")
+    workdir = tempfile.mkdtemp()
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{workdir}/bench.db?timeout=60")
+    os.environ.setdefault("OUTBOX_FILE", os.path.join(workdir, "outbox-events.jsonl"))
+    os.environ["GROUP_COMMIT_ENABLED"] = "true"
+    sys.path[:0] = [ROOT, service_dir]
+    os.chdir(service_dir)
+    spec = importlib.util.spec_from_file_location("transaction_service_app", os.path.join(service_dir, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    logging.disable(logging.CRITICAL)
+    return module
+
+
+async def seed(service, accounts):
+    """Seed accounts; returns ``(customer_id, session token)`` pairs."""
+    customers = []
+    async with service.SessionLocal() as db:
+        for i in range(accounts):
+            customer_id = f"bench-{i}"
+            account_id = str(uuid.uuid4())
+            db.add(service.AccountModel(
+                account_id=account_id,
+                customer_id=customer_id,
+                account_type="checking",
+                currency="USD",
+                balance=0.0,
+                created_at=datetime.now(timezone.utc),
+                status="ACTIVE",
+            ))
+            customers.append((customer_id, service.session_tokens.issue(customer_id, acct=account_id)[0]))
+        await db.commit()
+    return customers
+
+
+async def run_window(client, customers, concurrency, duration):
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def worker(n):
+        customer_id, token = customers[n % len(customers)]
+        form = {"customer_id": customer_id, "transaction_type": "credit", "amount": "1"}
+        headers = {"authorization": f"Bearer {token}"}
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.post("/transaction-process", data=form, headers=headers)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def main(args):
+    service = load_transaction_service()
+    async with service.app.router.lifespan_context(service.app):
+        while not service.readiness.started:
+            await asyncio.sleep(0.05)
+        await run(service, args)
+
+
+async def run(service, args):
+    committer = service.posting_committer
+    customers = await seed(service, args.accounts)
+
+    transport = httpx.ASGITransport(app=service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'window_ms':>10} {'rps':>10} {'p50_ms':>10} {'p99_ms':>10}")
+        for window in args.windows.split(","):
+            if window == "off":
+                service.posting_committer = None
+            else:
+                committer.window = float(window) / 1000
+                service.posting_committer = committer
+            result = await run_window(client, customers, args.concurrency, args.duration)
+            print(f"{window:>10} {result['rps']:>10.0f} {result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--windows", default="off,0,1,2,5,10", help="comma-separated window sizes in ms, or 'off'")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--accounts", type=int, default=8)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,485 @@
+"""Load test of the services' hot endpoints, with saved baselines.
+
+Each scenario runs in a fresh interpreter: the service is imported and
+started in-process (lifespan, migrations, background tasks) against a
+throwaway SQLite database, seeded with ``--customers`` accounts, and driven
+through the httpx ASGI transport by ``--concurrency`` clients sending
+``--requests`` requests in all, after ``--warmup`` requests that are not
+measured. Nothing listens on a port and no external service is needed;
+trace spans go to a local UDP port nobody reads.
+
+Statement counts are deterministic: every client sends a fixed number of
+requests drawn from its own seeded generator, so a scenario sends the same
+requests on every run, and auth-service's customer index is loaded and
+its verified-hit cache warmed for every seeded customer before the
+warmup, so no lookup depends on which requests happened to come first.
+Only group commit, whose batches depend on timing, varies between runs.
+
+transaction-service gets its session tokens from auth-service. With
+``--auth stub`` (default) requests carry tokens minted locally and
+/transaction logins are answered by a stub /token route; with ``--auth
+inprocess`` the real auth-service app runs in the same process, on the same
+database, behind transaction-service's auth client.
+
+Reported per scenario and per request kind: requests per second, p50, p95
+and p99 latency, and DB statements per request. Statements are counted on
+every engine of the loaded apps; those issued by background tasks (outbox
+publisher, customer index refresh) are reported separately.
+
+    python benchmarks/load.py
+    python benchmarks/load.py --scenarios transaction-process --concurrency 64
+    python benchmarks/load.py --mix transaction-process=8,transaction-batch=2
+    python benchmarks/load.py --save-baseline benchmarks/baseline.json
+    python benchmarks/load.py --check benchmarks/baseline.json
+
+``--check`` exits non-zero when a scenario's throughput dropped or its p95
+grew by more than ``--tolerance``, its statements per request grew by more
+than ``--query-tolerance``, or any request failed. p99 is reported but not
+checked: on SQLite the write scenarios' tail is set by lock retries and
+varies too much between runs. Throughput and latency only compare on the
+machine that recorded the baseline; elsewhere add ``--ignore-timing`` to
+check statement counts and errors only.
+"""
+import argparse
+import asyncio
+import contextvars
+import importlib.util
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Request kinds: the service that serves them and the statuses that count
+# as success (a 404 for an unknown customer is the expected answer)
+REQUESTS = {
+    "account-details": ("account-service", {200}),
+    "account-list": ("account-service", {200}),
+    "authenticate": ("auth-service", {200, 404}),
+    "token": ("auth-service", {200}),
+    "transaction-process": ("transaction-service", {200}),
+    "transaction-process-json": ("transaction-service", {200}),
+    "account-summary-json": ("transaction-service", {200}),
+    "transaction-login": ("transaction-service", {200}),
+    "transaction-batch": ("transaction-service", {200}),
+}
+
+SCENARIOS = {
+    "account-details": {"mix": {"account-details": 1}},
+    "account-list": {"mix": {"account-list": 1}},
+    "authenticate": {"mix": {"authenticate": 9, "token": 1}},
+    "transaction-process": {"mix": {"transaction-process": 1}},
+    "transaction-group-commit": {
+        "mix": {"transaction-process": 1},
+        "env": {"GROUP_COMMIT_ENABLED": "true"},
+    },
+    "transaction-mixed": {"mix": {"transaction-process": 8, "transaction-login": 1, "transaction-batch": 1}},
+    "transaction-json": {"mix": {"transaction-process-json": 8, "account-summary-json": 2}},
+}
+
+UNKNOWN_CUSTOMER_RATE = 0.1
+BATCH_OPERATIONS = 50
+SEED_BALANCE = 1_000_000.0
+ACCEPT_JSON = {"accept": "application/json"}
+
+_in_request = contextvars.ContextVar("in_request", default=False)
+
+
+def scenario_service(mix):
+    services = {REQUESTS[name][0] for name in mix}
+    if len(services) != 1:
+        raise SystemExit(f"request mix spans several services: {', '.join(sorted(services))}")
+    return services.pop()
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in REQUESTS:
+            raise SystemExit(f"unknown request kind {name!r}; choose from {', '.join(REQUESTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return float("nan")
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def summarize(latencies, elapsed, statements=None):
+    ordered = sorted(latencies)
+    result = {
+        "requests": len(ordered),
+        "rps": len(ordered) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+    }
+    if statements is not None:
+        result["queries_per_request"] = statements / len(ordered) if ordered else 0.0
+    return result
+
+
+# --- child: one scenario in this process ------------------------------------
+
+def load_service(service, module_name):
+    service_dir = os.path.join(ROOT, service)
+    sys.path[:0] = [service_dir]
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(service_dir, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def count_statements(module, counts):
+    from sqlalchemy import event
+
+    def before_cursor_execute(*args):
+        counts["request" if _in_request.get() else "background"] += 1
+
+    for engine in [module.db_router.primary, *module.db_router.replicas]:
+        event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def seed(module, customers):
+    from sqlalchemy import insert
+
+    from common.models import AccountModel
+
+    created_at = datetime.now(timezone.utc)
+    accounts = [(f"bench-{i}", str(uuid.uuid4())) for i in range(customers)]
+    async with module.SessionLocal() as db:
+        await db.execute(insert(AccountModel), [
+            {
+                "account_id": account_id,
+                "customer_id": customer_id,
+                "account_type": "checking",
+                "currency": "USD",
+                "balance": SEED_BALANCE,
+                "created_at": created_at,
+                "status": "ACTIVE",
+            }
+            for customer_id, account_id in accounts
+        ])
+        await db.commit()
+    return accounts
+
+
+def stub_auth_app(tokens, accounts):
+    """auth-service's /token route without a database."""
+    from fastapi import FastAPI, Form, HTTPException
+
+    account_ids = dict(accounts)
+    app = FastAPI()
+
+    @app.post("/token")
+    async def issue_token(customer_id: str = Form(...)):
+        if customer_id not in account_ids:
+            raise HTTPException(status_code=404)
+        token, expires_in = tokens.issue(customer_id, acct=account_ids[customer_id])
+        return {"access_token": token, "token_type": "bearer", "expires_in": expires_in,
+                "account_id": account_ids[customer_id]}
+
+    return app
+
+
+def request_builders(accounts, tokens):
+    """Request kind -> function(rng) returning ``(method, url, options)``."""
+    bearer = {
+        customer_id: {"authorization": f"Bearer {tokens.issue(customer_id, acct=account_id)[0]}"}
+        for customer_id, account_id in accounts
+    }
+
+    def customer(rng):
+        return rng.choice(accounts)[0]
+
+    def maybe_unknown(rng):
+        return f"unknown-{rng.randrange(10**9)}" if rng.random() < UNKNOWN_CUSTOMER_RATE else customer(rng)
+
+    def transaction_process(rng):
+        customer_id = customer(rng)
+        form = {
+            "customer_id": customer_id,
+            "transaction_type": rng.choice(("credit", "debit")),
+            "amount": f"{rng.uniform(1, 100):.2f}",
+        }
+        return "POST", "/transaction-process", {"data": form, "headers": bearer[customer_id]}
+
+    def transaction_process_json(rng):
+        customer_id = customer(rng)
+        body = {
+            "customer_id": customer_id,
+            "transaction_type": rng.choice(("credit", "debit")),
+            "amount": round(rng.uniform(1, 100), 2),
+        }
+        return "POST", "/transaction-process", {"json": body, "headers": {**bearer[customer_id], **ACCEPT_JSON}}
+
+    def transaction_batch(rng):
+        # Customers may only post to their own account
+        customer_id, account_id = rng.choice(accounts)
+        operations = [
+            {"account_id": account_id, "transaction_type": rng.choice(("credit", "debit")),
+             "amount": round(rng.uniform(1, 100), 2)}
+            for _ in range(BATCH_OPERATIONS)
+        ]
+        return "POST", "/transactions/batch", {"json": {"operations": operations}, "headers": bearer[customer_id]}
+
+    return {
+        "account-details": lambda rng: ("POST", "/account-details", {"data": {"customer_id": maybe_unknown(rng)}}),
+        "account-list": lambda rng: ("GET", f"/customers/{customer(rng)}/accounts", {}),
+        "authenticate": lambda rng: ("GET", f"/authenticate/{maybe_unknown(rng)}", {}),
+        "token": lambda rng: ("POST", "/token", {"data": {"customer_id": customer(rng)}}),
+        "transaction-process": transaction_process,
+        "transaction-process-json": transaction_process_json,
+        "account-summary-json": lambda rng: (
+            "GET", "/account-summary", {"headers": {**bearer[customer(rng)], **ACCEPT_JSON}}),
+        "transaction-login": lambda rng: ("POST", "/transaction", {"data": {"customer_id": customer(rng)}}),
+        "transaction-batch": transaction_batch,
+    }
+
+
+async def drive(client, builders, mix, concurrency, requests, seed_value, counts):
+    """Send ``requests`` requests of the mix; returns per-request samples."""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = []
+    errors = {}
+
+    async def worker(n):
+        _in_request.set(True)
+        rng = random.Random(seed_value * 1000 + n)
+        for _ in range(requests // concurrency + (n < requests % concurrency)):
+            name = rng.choices(names, weights)[0]
+            method, url, options = builders[name](rng)
+            start = time.perf_counter()
+            response = await client.request(method, url, **options)
+            samples.append((name, time.perf_counter() - start))
+            if response.status_code not in REQUESTS[name][1]:
+                key = f"{name} {response.status_code}"
+                errors[key] = errors.get(key, 0) + 1
+
+    counts.update(request=0, background=0)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return samples, errors, time.perf_counter() - started
+
+
+async def run_scenario(config):
+    import httpx
+    from common.tokens import SessionTokens
+
+    mix = config["mix"]
+    service = scenario_service(mix)
+    counts = {"request": 0, "background": 0}
+    modules = []
+    auth = None
+    if service == "transaction-service" and config["auth"] == "inprocess":
+        auth = load_service("auth-service", "auth_service_app")
+        modules.append(auth)
+    module = load_service(service, service.replace("-", "_") + "_app")
+    modules.append(module)
+    os.chdir(os.path.join(ROOT, service))
+    logging.disable(logging.INFO)
+    for loaded in modules:
+        count_statements(loaded, counts)
+
+    async with AsyncExitStack() as stack:
+        for loaded in modules:
+            await stack.enter_async_context(loaded.app.router.lifespan_context(loaded.app))
+        while not all(loaded.readiness.started for loaded in modules):
+            await asyncio.sleep(0.05)
+
+        accounts = await seed(module, config["customers"])
+        tokens = SessionTokens()
+        for loaded in modules:
+            if hasattr(loaded, "customer_index"):
+                await loaded.customer_index.refresh()
+                for customer_id, _ in accounts:
+                    await loaded.customer_index.account_id(customer_id)
+        if service == "transaction-service":
+            auth_app = auth.app if auth is not None else stub_auth_app(tokens, accounts)
+            await module.auth_client.close()
+            module.auth_client.transport = httpx.ASGITransport(app=auth_app)
+            await module.auth_client.start()
+
+        builders = request_builders(accounts, tokens)
+        transport = httpx.ASGITransport(app=module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            if config["warmup"] > 0:
+                await drive(client, builders, mix, config["concurrency"], config["warmup"], -config["seed"], counts)
+            samples, errors, elapsed = await drive(
+                client, builders, mix, config["concurrency"], config["requests"], config["seed"], counts)
+        statements = dict(counts)
+
+    result = summarize([latency for _, latency in samples], elapsed, statements["request"])
+    result["errors"] = sum(errors.values())
+    result["error_kinds"] = errors
+    result["background_queries"] = statements["background"]
+    result["by_request"] = {
+        name: summarize([latency for kind, latency in samples if kind == name], elapsed)
+        for name in mix
+    }
+    return result
+
+
+def child(config):
+    env = {
+        "DATABASE_URL": f"sqlite+aiosqlite:///{config['workdir']}/load.db?timeout=60",
+        "OUTBOX_FILE": os.path.join(config["workdir"], "outbox-events.jsonl"),
+        "JAEGER_AGENT_HOST": "127.0.0.1",
+        **config.get("env", {}),
+    }
+    os.environ.update(env)
+    sys.path.insert(0, ROOT)
+    result = asyncio.run(run_scenario(config))
+    print(json.dumps(result))
+
+
+# --- parent: run scenarios, report, compare --------------------------------
+
+def run_child(name, scenario, args):
+    with tempfile.TemporaryDirectory() as workdir:
+        config = {
+            "mix": scenario["mix"],
+            "env": scenario.get("env", {}),
+            "auth": args.auth,
+            "customers": args.customers,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "workdir": workdir,
+        }
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", json.dumps(config)],
+            capture_output=True, text=True,
+        )
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stderr)
+        raise SystemExit(f"scenario {name} failed")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def print_results(results):
+    print(f"{'scenario':<26} {'requests':>9} {'rps':>8} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} "
+          f"{'queries/req':>12} {'bg_queries':>11} {'errors':>7}")
+    for name, result in results.items():
+        print(f"{name:<26} {result['requests']:>9} {result['rps']:>8.0f} {result['p50_ms']:>8.2f} "
+              f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['queries_per_request']:>12.2f} "
+              f"{result['background_queries']:>11} {result['errors']:>7}")
+        if len(result["by_request"]) > 1:
+            for kind, sub in result["by_request"].items():
+                print(f"  {kind:<24} {sub['requests']:>9} {sub['rps']:>8.0f} {sub['p50_ms']:>8.2f} "
+                      f"{sub['p95_ms']:>8.2f} {sub['p99_ms']:>8.2f}")
+        for kind, count in result["error_kinds"].items():
+            print(f"  unexpected status: {kind} x{count}")
+
+
+def compare(results, baseline, args):
+    """Regressions of ``results`` against ``baseline``, as messages."""
+    regressions = []
+    for name, result in results.items():
+        if result["errors"]:
+            regressions.append(f"{name}: {result['errors']} failed request(s)")
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            print(f"note: no baseline for {name}")
+            continue
+        query_limit = base["queries_per_request"] * (1 + args.query_tolerance)
+        if result["queries_per_request"] > query_limit + 1e-9:
+            regressions.append(
+                f"{name}: {result['queries_per_request']:.2f} queries/request, baseline "
+                f"{base['queries_per_request']:.2f}")
+        if args.ignore_timing:
+            continue
+        if result["rps"] < base["rps"] * (1 - args.tolerance):
+            regressions.append(f"{name}: {result['rps']:.0f} rps, baseline {base['rps']:.0f}")
+        if result["p95_ms"] > base["p95_ms"] * (1 + args.tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']:.2f} ms, baseline {base['p95_ms']:.2f} ms")
+    return regressions
+
+
+def settings(args):
+    return {
+        "auth": args.auth,
+        "customers": args.customers,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "warmup": args.warmup,
+        "seed": args.seed,
+    }
+
+
+def main(args):
+    if args.mix:
+        scenarios = {"custom": {"mix": parse_mix(args.mix)}}
+    else:
+        names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+        unknown = [name for name in names if name not in SCENARIOS]
+        if unknown:
+            raise SystemExit(f"unknown scenario(s) {', '.join(unknown)}; choose from {', '.join(SCENARIOS)}")
+        scenarios = {name: SCENARIOS[name] for name in names}
+    for scenario in scenarios.values():
+        scenario_service(scenario["mix"])
+
+    results = {name: run_child(name, scenario, args) for name, scenario in scenarios.items()}
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump({
+                "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "machine": f"{platform.machine()}, {os.cpu_count()} CPUs, python {platform.python_version()}",
+                "settings": settings(args),
+                "scenarios": results,
+            }, baseline_file, indent=2)
+            baseline_file.write("\n")
+        print(f"baseline saved to {args.save_baseline}")
+
+    if args.check:
+        with open(args.check) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("settings") != settings(args):
+            print(f"note: baseline was recorded with {baseline.get('settings')}")
+        regressions = compare(results, baseline, args)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print(f"no regressions against {args.check}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", help=f"comma-separated, default all: {','.join(SCENARIOS)}")
+    parser.add_argument("--mix", help="ad-hoc request mix, e.g. transaction-process=8,transaction-batch=2")
+    parser.add_argument("--auth", choices=("stub", "inprocess"), default="stub")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1600, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=320, help="unmeasured requests before them")
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--check", metavar="PATH", help="fail on regressions against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed rps drop and p95 growth")
+    parser.add_argument("--query-tolerance", type=float, default=0.10, help="allowed growth in queries/request")
+    parser.add_argument("--ignore-timing", action="store_true", help="check queries/request and errors only")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(json.loads(args.child))
+    else:
+        sys.exit(main(args))
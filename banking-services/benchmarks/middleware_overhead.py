@@ -0,0 +1,93 @@
+"""Per-request overhead of MetricsMiddleware.
+
+Drives a minimal FastAPI app in-process (httpx ASGI transport, no network)
+with no middleware, with the previous BaseHTTPMiddleware implementation and
+with the current pure ASGI one, and reports the mean time per request and
+the overhead over the bare app.
+
+    python benchmarks/middleware_overhead.py --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from starlette.middleware.base import BaseHTTPMiddleware
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.middleware import MetricsMiddleware  # noqa: E402
+
+
+class LegacyMetricsMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware implementation this replaced, on its own registry."""
+
+    def __init__(self, app, app_name: str):
+        super().__init__(app)
+        registry = CollectorRegistry()
+        self.request_count = Counter(
+            'http_requests_total', 'Total HTTP requests',
+            ['service', 'method', 'endpoint', 'status'], registry=registry
+        )
+        self.request_latency = Histogram(
+            'http_request_duration_seconds', 'HTTP request latency', ['service'], registry=registry
+        )
+        self.service_up = Gauge('up', 'Service up status', ['app'], registry=registry)
+        self.app_name = app_name
+        self.service_up.labels(app=self.app_name).set(1)
+
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        self.request_count.labels(
+            service=self.app_name, method=request.method,
+            endpoint=request.url.path, status=response.status_code
+        ).inc()
+        self.request_latency.labels(service=self.app_name).observe(time.time() - start_time)
+        return response
+
+
+def build_app(middleware):
+    app = FastAPI()
+
+    @app.get("/authenticate/{customer_id}")
+    async def authenticate(customer_id: str):
+        return {"message": f"Customer ID {customer_id} authenticated successfully."}
+
+    if middleware is not None:
+        app.add_middleware(middleware, app_name="auth-service")
+    return app
+
+
+async def drive(app, requests):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        for i in range(requests):
+            await client.get(f"/authenticate/customer-{i}")
+        return (time.perf_counter() - start) / requests
+
+
+async def main(args):
+    variants = [("none", None), ("BaseHTTPMiddleware", LegacyMetricsMiddleware), ("pure ASGI", MetricsMiddleware)]
+    results = {}
+    for name, middleware in variants:
+        app = build_app(middleware)
+        await drive(app, 500)  # warm up
+        results[name] = min([await drive(app, args.requests) for _ in range(args.repeats)])
+
+    baseline = results["none"]
+    print(f"{'middleware':<20} {'us/request':>11} {'overhead_us':>12}")
+    for name, per_request in results.items():
+        print(f"{name:<20} {per_request * 1e6:>11.1f} {(per_request - baseline) * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
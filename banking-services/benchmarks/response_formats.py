@@ -0,0 +1,138 @@
+"""Latency and CPU per request of transaction-service's JSON API vs its HTML views.
+
+Boots transaction-service in-process against DATABASE_URL (a throwaway
+SQLite file by default), seeds one account and sends ``--requests``
+sequential requests per endpoint and format, so CPU time per request is the
+process's own work: routing, body parsing, token verification, tracing,
+the database driver and rendering. The formats of an endpoint take turns in
+rounds of ``--round`` requests, so drift over the run (a growing table,
+warming caches) affects them alike. Endpoints:
+
+    authenticate     POST /transaction with a valid session token
+    post             POST /transaction-process, a 1.00 credit
+    account-summary  GET /account-summary
+
+Formats: ``html`` posts forms and renders the precompiled templates;
+``html-uncached`` does the same with a plain Jinja2Templates (templates
+stat'ed on every render, no bytecode cache), as before; ``json`` posts
+JSON and asks for JSON.
+
+    python benchmarks/response_formats.py --requests 2000
+"""
+import argparse
+import asyncio
+import importlib.util
+import logging
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_transaction_service():
+    service_dir = os.path.join(ROOT, "transaction-service")
+    workdir = tempfile.mkdtemp()
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{workdir}/bench.db?timeout=60")
+    os.environ.setdefault("OUTBOX_FILE", os.path.join(workdir, "outbox-events.jsonl"))
+    os.environ.setdefault("JAEGER_AGENT_HOST", "127.0.0.1")
+    sys.path[:0] = [ROOT, service_dir]
+    os.chdir(service_dir)
+    spec = importlib.util.spec_from_file_location("transaction_service_app", os.path.join(service_dir, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    logging.disable(logging.CRITICAL)
+    return module
+
+
+async def seed(service):
+    customer_id, account_id = "bench-1", str(uuid.uuid4())
+    async with service.SessionLocal() as db:
+        db.add(service.AccountModel(
+            account_id=account_id,
+            customer_id=customer_id,
+            account_type="checking",
+            currency="USD",
+            balance=0.0,
+            created_at=datetime.now(timezone.utc),
+            status="ACTIVE",
+        ))
+        await db.commit()
+    return customer_id, service.session_tokens.issue(customer_id, acct=account_id)[0]
+
+
+def requests_for(customer_id, token):
+    """(endpoint, format) -> ``(method, url, options)``."""
+    html = {"authorization": f"Bearer {token}", "accept": "text/html"}
+    json_headers = {"authorization": f"Bearer {token}", "accept": "application/json"}
+    posting = {"customer_id": customer_id, "transaction_type": "credit", "amount": "1.00"}
+    return {
+        "authenticate": {
+            "html": ("POST", "/transaction", {"data": {"customer_id": customer_id}, "headers": html}),
+            "json": ("POST", "/transaction", {"json": {"customer_id": customer_id}, "headers": json_headers}),
+        },
+        "post": {
+            "html": ("POST", "/transaction-process", {"data": posting, "headers": html}),
+            "json": ("POST", "/transaction-process", {"json": {**posting, "amount": 1.0}, "headers": json_headers}),
+        },
+        "account-summary": {
+            "html": ("GET", "/account-summary", {"headers": html}),
+            "json": ("GET", "/account-summary", {"headers": json_headers}),
+        },
+    }
+
+
+async def measure(client, request, count):
+    """Total wall and CPU seconds of ``count`` sequential requests."""
+    method, url, options = request
+    wall, cpu = time.perf_counter(), time.process_time()
+    for _ in range(count):
+        response = await client.request(method, url, **options)
+        response.raise_for_status()
+    return time.perf_counter() - wall, time.process_time() - cpu
+
+
+async def main(args):
+    from fastapi.templating import Jinja2Templates
+
+    service = load_transaction_service()
+    async with service.app.router.lifespan_context(service.app):
+        while not service.readiness.started:
+            await asyncio.sleep(0.05)
+        customer_id, token = await seed(service)
+        precompiled = service.templates
+        uncached = Jinja2Templates(directory="templates")
+
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            print(f"{'endpoint':<16} {'format':<14} {'us/request':>11} {'cpu_us/request':>15}")
+            for endpoint, formats in requests_for(customer_id, token).items():
+                variants = [
+                    ("html-uncached", uncached, formats["html"]),
+                    ("html", precompiled, formats["html"]),
+                    ("json", precompiled, formats["json"]),
+                ]
+                totals = {name: [0.0, 0.0] for name, _, _ in variants}
+                for round_index in range(-1, args.requests // args.round):
+                    for name, templates, request in variants:
+                        service.templates = templates
+                        wall, cpu = await measure(client, request, args.round)
+                        if round_index >= 0:  # the first round warms up
+                            totals[name][0] += wall
+                            totals[name][1] += cpu
+                measured = args.requests // args.round * args.round
+                for name, (wall, cpu) in totals.items():
+                    print(f"{endpoint:<16} {name:<14} {wall / measured * 1e6:>11.0f} {cpu / measured * 1e6:>15.0f}")
+        service.templates = precompiled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--round", type=int, default=50, help="requests per format before switching")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,96 @@
+"""Worker boot time for each service: import time and time to first response.
+
+Each service is imported in a fresh interpreter (``--runs`` times, median
+reported), then started under uvicorn while ``/health`` and ``/ready`` are
+polled. Runs against a throwaway SQLite database unless DATABASE_URL is set.
+
+    python benchmarks/startup.py --runs 5
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICES = ["account-service", "auth-service", "transaction-service"]
+
+IMPORT_PROBE = "import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)"
+
+
+def service_env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT
+    env.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/startup.db")
+    return env
+
+
+def import_time(service, env):
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        cwd=os.path.join(ROOT, service), env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def boot_time(service, env, timeout):
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.join(ROOT, service), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + timeout
+        healthy = wait_for(f"http://127.0.0.1:{port}/health", deadline)
+        ready = wait_for(f"http://127.0.0.1:{port}/ready", deadline)
+    finally:
+        process.terminate()
+        process.wait()
+    return (
+        healthy - start if healthy else float("nan"),
+        ready - start if ready else float("nan"),
+    )
+
+
+def main(args):
+    env = service_env()
+    print(f"{'service':<22} {'import_s':>9} {'first_response_s':>17} {'ready_s':>8}")
+    for service in args.services.split(","):
+        imports = [import_time(service, env) for _ in range(args.runs)]
+        boots = [boot_time(service, env, args.timeout) for _ in range(args.runs)]
+        print(
+            f"{service:<22} {statistics.median(imports):>9.3f} "
+            f"{statistics.median(b[0] for b in boots):>17.3f} {statistics.median(b[1] for b in boots):>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--services", default=",".join(SERVICES))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    main(parser.parse_args())
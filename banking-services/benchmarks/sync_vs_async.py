@@ -0,0 +1,258 @@
+"""/transaction-process and /account-details before and after async sessions.
+
+Compares two revisions of the services: by default the last one with
+synchronous PyMySQL sessions (``8ed252f^``) and the one that moved them to
+async SQLAlchemy sessions (``8ed252f``). Each revision's banking-services
+tree is extracted with ``git archive`` and every (revision, endpoint,
+latency) run happens in a fresh interpreter, in-process as in load.py: a
+throwaway SQLite database seeded with ``--customers`` accounts, driven
+through the httpx ASGI transport by ``--concurrency`` clients. The sync
+revision hard-codes a MySQL URL, so its ``create_engine`` is pointed at the
+same SQLite file.
+
+A local SQLite statement costs microseconds, where a MySQL round trip
+costs a network hop, so ``--db-latency-ms`` adds a sleep to every
+statement (BEGIN and COMMIT included) in the thread that executes it. For
+the sync revision that is the event loop, as with PyMySQL; for the async
+one it is aiosqlite's worker thread, as the wait on aiomysql's socket
+would be. SQLite still serializes writers, so /transaction-process gains
+less from async here than it would on MySQL, where different accounts do
+not contend.
+
+    python benchmarks/sync_vs_async.py
+    python benchmarks/sync_vs_async.py --db-latency-ms 0,1,5 --save benchmarks/sync_vs_async.json
+"""
+import argparse
+import asyncio
+import importlib.util
+import io
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = {
+    "transaction-process": "transaction-service",
+    "account-details": "account-service",
+}
+
+SEED_BALANCE = 1_000_000.0
+
+
+def summarize(latencies, elapsed):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "rps": len(ordered) / elapsed if elapsed else 0.0,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+
+
+# --- child: one revision, endpoint and latency in this process -------------
+
+def sleep_per_statement(latency):
+    def trace(statement):
+        time.sleep(latency)
+    return trace
+
+
+def install_latency(engine, latency):
+    from sqlalchemy import event
+
+    if not latency:
+        return
+    trace = sleep_per_statement(latency)
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        if hasattr(dbapi_connection, "await_"):
+            # aiosqlite: register on its own thread, where statements run
+            dbapi_connection.await_(dbapi_connection._connection.set_trace_callback(trace))
+        else:
+            dbapi_connection.set_trace_callback(trace)
+
+
+def redirect_sync_engines(database):
+    """Point the sync revision's hard-coded MySQL engine at SQLite."""
+    import sqlalchemy
+
+    create_engine = sqlalchemy.create_engine
+
+    def sqlite_engine(url, **options):
+        return create_engine(f"sqlite:///{database}", connect_args={"check_same_thread": False, "timeout": 60})
+
+    sqlalchemy.create_engine = sqlite_engine
+
+
+def load_service(tree, service):
+    service_dir = os.path.join(tree, service)
+    sys.path[:0] = [tree, service_dir]
+    os.chdir(service_dir)
+    spec = importlib.util.spec_from_file_location(f"{service.replace('-', '_')}_app", "app.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    logging.disable(logging.CRITICAL)
+    return module
+
+
+def seed(database, customers):
+    created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+    customer_ids = [str(uuid.uuid4()) for _ in range(customers)]
+    with sqlite3.connect(database) as conn:
+        conn.executemany(
+            "INSERT INTO accounts (account_id, customer_id, account_type, currency, balance, created_at, status)"
+            " VALUES (?, ?, 'checking', 'USD', ?, ?, 'ACTIVE')",
+            [(f"bench-{i}", customer_id, SEED_BALANCE, created_at) for i, customer_id in enumerate(customer_ids)],
+        )
+    return customer_ids
+
+
+def build_request(endpoint, customer_ids, rng):
+    customer_id = rng.choice(customer_ids)
+    if endpoint == "account-details":
+        return "/account-details", {"customer_id": customer_id}
+    return "/transaction-process", {
+        "customer_id": customer_id,
+        "transaction_type": rng.choice(("credit", "debit")),
+        "amount": f"{rng.uniform(1, 100):.2f}",
+    }
+
+
+async def drive(client, endpoint, customer_ids, concurrency, requests, seed_value):
+    latencies = []
+    errors = 0
+
+    async def worker(n):
+        nonlocal errors
+        rng = random.Random(seed_value * 1000 + n)
+        for _ in range(requests // concurrency + (n < requests % concurrency)):
+            url, form = build_request(endpoint, customer_ids, rng)
+            start = time.perf_counter()
+            response = await client.post(url, data=form)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def run(config):
+    import httpx
+
+    database = os.path.join(config["workdir"], "bench.db")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite+aiosqlite:///{database}?timeout=60",
+        "JAEGER_AGENT_HOST": "127.0.0.1",
+    })
+    redirect_sync_engines(database)
+    module = load_service(config["tree"], ENDPOINTS[config["endpoint"]])
+    install_latency(module.engine, config["latency_ms"] / 1000)
+
+    async with module.app.router.lifespan_context(module.app):
+        customer_ids = seed(database, config["customers"])
+        transport = httpx.ASGITransport(app=module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await drive(client, config["endpoint"], customer_ids, config["concurrency"], config["warmup"], -1)
+            latencies, errors, elapsed = await drive(
+                client, config["endpoint"], customer_ids, config["concurrency"], config["requests"], 1)
+    return {**summarize(latencies, elapsed), "errors": errors}
+
+
+def child(config):
+    print(json.dumps(asyncio.run(run(config))))
+
+
+# --- parent -----------------------------------------------------------------
+
+def extract(revision, destination):
+    archive = subprocess.run(
+        ["git", "archive", f"{revision}:banking-services"],
+        cwd=os.path.dirname(ROOT), capture_output=True, check=True,
+    ).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(destination)
+    return destination
+
+
+def run_child(tree, endpoint, latency_ms, args):
+    with tempfile.TemporaryDirectory() as workdir:
+        config = {
+            "tree": tree,
+            "endpoint": endpoint,
+            "latency_ms": latency_ms,
+            "customers": args.customers,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "workdir": workdir,
+        }
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", json.dumps(config)],
+            capture_output=True, text=True,
+        )
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stderr)
+        raise SystemExit(f"{endpoint} at {latency_ms} ms failed")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(args):
+    revisions = {"sync": args.before, "async": args.after}
+    latencies = [float(value) for value in args.db_latency_ms.split(",")]
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        trees = {label: extract(revision, os.path.join(workdir, label)) for label, revision in revisions.items()}
+        print(f"{'endpoint':<20} {'db_ms':>6} {'sessions':>9} {'rps':>8} {'p50_ms':>8} {'p95_ms':>8} {'errors':>7}")
+        for endpoint in ENDPOINTS:
+            for latency_ms in latencies:
+                for label, tree in trees.items():
+                    result = run_child(tree, endpoint, latency_ms, args)
+                    results.append({"endpoint": endpoint, "db_latency_ms": latency_ms, "sessions": label, **result})
+                    print(f"{endpoint:<20} {latency_ms:>6g} {label:>9} {result['rps']:>8.0f} "
+                          f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['errors']:>7}")
+
+    if args.save:
+        with open(args.save, "w") as results_file:
+            json.dump({
+                "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "machine": f"{platform.machine()}, {os.cpu_count()} CPUs, python {platform.python_version()}",
+                "revisions": revisions,
+                "settings": {"customers": args.customers, "concurrency": args.concurrency,
+                             "requests": args.requests, "warmup": args.warmup},
+                "results": results,
+            }, results_file, indent=2)
+            results_file.write("\n")
+        print(f"results saved to {args.save}")
+    return 1 if any(result["errors"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--before", default="8ed252f^", help="revision with sync sessions")
+    parser.add_argument("--after", default="8ed252f", help="revision with async sessions")
+    parser.add_argument("--db-latency-ms", default="0,2", help="comma-separated per-statement latencies")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1600, help="measured requests per run")
+    parser.add_argument("--warmup", type=int, default=320, help="unmeasured requests before them")
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--save", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(json.loads(args.child))
+    else:
+        sys.exit(main(args))
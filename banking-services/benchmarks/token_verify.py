@@ -0,0 +1,75 @@
+"""Per-request cost of verifying a session token locally.
+
+Times SessionTokens.issue and SessionTokens.verify (HS256, three-key ring,
+with and without a revocation file), and for scale an in-process call to a
+stub of auth-service's /authenticate route: the lower bound of the HTTP hop
+that local verification replaces, without network or database.
+
+    python benchmarks/token_verify.py --iterations 50000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.tokens import RevocationList, SessionTokens  # noqa: E402
+
+KEYS = {"2024-q4": "old-secret", "2025-q1": "current-secret", "2025-q2": "next-secret"}
+
+
+def per_call(fn, iterations):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+async def authenticate_hop(iterations):
+    app = FastAPI()
+
+    @app.get("/authenticate/{customer_id}")
+    async def authenticate(customer_id: str):
+        return {"message": f"Customer ID {customer_id} authenticated successfully."}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://auth") as client:
+        await client.get("/authenticate/customer-1")
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await client.get("/authenticate/customer-1")
+        return (time.perf_counter() - start) / iterations
+
+
+def main(args):
+    tokens = SessionTokens(KEYS, active_kid="2025-q1", revocations=RevocationList())
+    token, _ = tokens.issue("customer-1", acct="account-1")
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as revoked:
+        revoked.writelines(f"{index:032x}\n" for index in range(1000))
+        revoked.write("sub:customer-2\n")
+    with_revocations = SessionTokens(KEYS, active_kid="2025-q1", revocations=RevocationList(revoked.name))
+
+    results = [
+        ("issue", per_call(lambda: tokens.issue("customer-1", acct="account-1"), args.iterations)),
+        ("verify", per_call(lambda: tokens.verify(token), args.iterations)),
+        ("verify + 1001 revocations", per_call(lambda: with_revocations.verify(token), args.iterations)),
+        ("auth hop, in-process stub", asyncio.run(authenticate_hop(min(args.iterations, 5000)))),
+    ]
+    os.unlink(revoked.name)
+
+    print(f"{'operation':<28} {'us/call':>9}")
+    for name, seconds in results:
+        print(f"{name:<28} {seconds * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50000)
+    main(parser.parse_args())
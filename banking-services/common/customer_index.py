@@ -0,0 +1,286 @@
+"""Per-worker index of known customer IDs.
+
+Negative lookups are answered by a Bloom filter that is refreshed
+incrementally from ``accounts.created_at`` and rebuilt from scratch every
+``full_refresh_interval`` seconds; positive lookups are verified against
+the database at most once per ``hit_ttl`` seconds, and the verification
+also yields the customer's account ID.
+
+Memory footprint of the filter (bits only, per worker):
+
+    customers   error rate   size       hashes
+    1,000,000   0.1%          1.7 MiB   10
+    5,000,000   0.1%          8.6 MiB   10
+    10,000,000  0.1%         17.1 MiB   10
+
+The verified-hit cache adds roughly 250 bytes per entry and is capped at
+``max_cached_hits`` entries (~12 MiB at the default of 50,000).
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+CUSTOMER_INDEX_CAPACITY = int(os.getenv("CUSTOMER_INDEX_CAPACITY", "5000000"))
+CUSTOMER_INDEX_ERROR_RATE = float(os.getenv("CUSTOMER_INDEX_ERROR_RATE", "0.001"))
+CUSTOMER_INDEX_REFRESH_SECONDS = float(os.getenv("CUSTOMER_INDEX_REFRESH_SECONDS", "5"))
+CUSTOMER_INDEX_REFRESH_OVERLAP_SECONDS = float(os.getenv("CUSTOMER_INDEX_REFRESH_OVERLAP_SECONDS", "30"))
+CUSTOMER_INDEX_FULL_REFRESH_SECONDS = float(os.getenv("CUSTOMER_INDEX_FULL_REFRESH_SECONDS", "900"))
+CUSTOMER_INDEX_MAX_STALENESS_SECONDS = float(os.getenv("CUSTOMER_INDEX_MAX_STALENESS_SECONDS", "60"))
+CUSTOMER_INDEX_HIT_TTL_SECONDS = float(os.getenv("CUSTOMER_INDEX_HIT_TTL_SECONDS", "300"))
+CUSTOMER_INDEX_MAX_CACHED_HITS = int(os.getenv("CUSTOMER_INDEX_MAX_CACHED_HITS", "50000"))
+CUSTOMER_INDEX_PAGE_SIZE = int(os.getenv("CUSTOMER_INDEX_PAGE_SIZE", "5000"))
+
+index_lookups = Counter(
+    'customer_index_lookups_total',
+    'Customer index lookups by outcome',
+    ['result']
+)
+index_refreshes = Counter(
+    'customer_index_refreshes_total',
+    'Customer index refreshes',
+    ['kind', 'status']
+)
+index_refresh_duration = Histogram(
+    'customer_index_refresh_duration_seconds',
+    'Time spent loading new customers into the index',
+    ['kind']
+)
+index_size = Gauge(
+    'customer_index_customers',
+    'Customer IDs loaded into the Bloom filter',
+    multiprocess_mode='livemax'
+)
+index_memory = Gauge(
+    'customer_index_memory_bytes',
+    'Approximate memory held by the customer index',
+    ['part'],
+    multiprocess_mode='livesum'
+)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over one blake2b digest."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key: str) -> bool:
+        """Add ``key``; returns False if it was (probably) already present."""
+        bits = self.bits
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.bits)
+
+
+class CustomerIndex:
+    """Answers "does this customer exist?" without a query for every call.
+
+    ``load_page(after_created_at, after_account_id, limit)`` must return up
+    to ``limit`` ``(account_id, customer_id, created_at)`` rows: when
+    ``after_created_at`` is None (full loads) those with ``account_id >
+    after_account_id`` ordered by ``account_id``, otherwise (incremental
+    loads) those with ``(created_at, account_id)`` after the pair, ordered
+    by ``(created_at, account_id)`` so an index on ``created_at`` serves
+    it. ``lookup(customer_id)`` is the authoritative
+    database check and returns one of the customer's account IDs, or None.
+    Both are coroutines.
+
+    Customers created after the last refresh are reported missing for at most
+    ``refresh_interval`` seconds. Incremental refreshes re-read the last
+    ``refresh_overlap`` seconds of ``created_at``; a row that becomes visible
+    later than that (a replica lagging further behind) is picked up by the
+    next full rebuild, at most ``full_refresh_interval`` seconds later. If
+    refreshes stop succeeding for longer than ``max_staleness`` the index
+    steps aside and every lookup goes to the database.
+    """
+
+    def __init__(
+        self,
+        load_page,
+        lookup,
+        capacity: int = CUSTOMER_INDEX_CAPACITY,
+        error_rate: float = CUSTOMER_INDEX_ERROR_RATE,
+        refresh_interval: float = CUSTOMER_INDEX_REFRESH_SECONDS,
+        refresh_overlap: float = CUSTOMER_INDEX_REFRESH_OVERLAP_SECONDS,
+        full_refresh_interval: float = CUSTOMER_INDEX_FULL_REFRESH_SECONDS,
+        max_staleness: float = CUSTOMER_INDEX_MAX_STALENESS_SECONDS,
+        hit_ttl: float = CUSTOMER_INDEX_HIT_TTL_SECONDS,
+        max_cached_hits: int = CUSTOMER_INDEX_MAX_CACHED_HITS,
+        page_size: int = CUSTOMER_INDEX_PAGE_SIZE,
+    ):
+        self._load_page = load_page
+        self._lookup = lookup
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.refresh_overlap = timedelta(seconds=refresh_overlap)
+        self.full_refresh_interval = full_refresh_interval
+        self.max_staleness = max_staleness
+        self.hit_ttl = hit_ttl
+        self.max_cached_hits = max_cached_hits
+        self.page_size = page_size
+
+        self._bloom = None
+        self._high_water_mark = None
+        self._last_refresh = 0.0
+        self._last_full_refresh = 0.0
+        self._verified = OrderedDict()
+        self._task = None
+
+    @property
+    def ready(self) -> bool:
+        return (
+            self._bloom is not None
+            and time.monotonic() - self._last_refresh <= self.max_staleness
+        )
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def contains(self, customer_id: str) -> bool:
+        return await self.account_id(customer_id) is not None
+
+    async def account_id(self, customer_id: str):
+        """One of the customer's account IDs, or None if it does not exist."""
+        if not self.ready:
+            index_lookups.labels(result="fallback").inc()
+            return await self._lookup(customer_id)
+
+        if customer_id not in self._bloom:
+            index_lookups.labels(result="miss").inc()
+            return None
+
+        now = time.monotonic()
+        cached = self._verified.get(customer_id)
+        if cached is not None and cached[0] > now:
+            index_lookups.labels(result="cached_hit").inc()
+            return cached[1]
+
+        account_id = await self._lookup(customer_id)
+        index_lookups.labels(result="false_positive" if account_id is None else "verified_hit").inc()
+        if account_id is not None:
+            self._remember(customer_id, account_id, now + self.hit_ttl)
+        else:
+            self._verified.pop(customer_id, None)
+        return account_id
+
+    def _remember(self, customer_id: str, account_id: str, expires_at: float):
+        self._verified[customer_id] = (expires_at, account_id)
+        self._verified.move_to_end(customer_id)
+        while len(self._verified) > self.max_cached_hits:
+            self._verified.popitem(last=False)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Customer index refresh failed")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def refresh(self):
+        """Load customers created since the high-water mark.
+
+        The first call, one after the filter outgrew its capacity and one
+        every ``full_refresh_interval`` seconds load every account into a
+        fresh filter and swap it in when complete.
+        """
+        full = (
+            self._bloom is None
+            or self._bloom.count > self.capacity
+            or time.monotonic() - self._last_full_refresh >= self.full_refresh_interval
+        )
+        kind = "full" if full else "incremental"
+        start_time = time.perf_counter()
+        try:
+            if full:
+                capacity = max(self.capacity, 2 * self._bloom.count) if self._bloom else self.capacity
+                bloom = BloomFilter(capacity, self.error_rate)
+                since = None
+            else:
+                bloom = self._bloom
+                since = self._high_water_mark - self.refresh_overlap if self._high_water_mark else None
+            high_water_mark = await self._load_into(bloom, since)
+        except Exception:
+            index_refreshes.labels(kind=kind, status="failure").inc()
+            raise
+        index_refresh_duration.labels(kind=kind).observe(time.perf_counter() - start_time)
+        index_refreshes.labels(kind=kind, status="success").inc()
+
+        if full:
+            self.capacity = bloom.capacity
+            self._bloom = bloom
+            self._last_full_refresh = time.monotonic()
+        if high_water_mark is not None:
+            self._high_water_mark = max(high_water_mark, self._high_water_mark or high_water_mark)
+        self._last_refresh = time.monotonic()
+
+        index_size.set(self._bloom.count)
+        index_memory.labels(part="bloom").set(self._bloom.nbytes)
+        index_memory.labels(part="verified_hits").set(len(self._verified) * 250)
+
+    async def _load_into(self, bloom: BloomFilter, since):
+        high_water_mark = None
+        after_created_at, after_account_id = since, ""
+        while True:
+            rows = await self._load_page(after_created_at, after_account_id, self.page_size)
+            if not rows:
+                break
+            for account_id, customer_id, created_at in rows:
+                bloom.add(customer_id)
+                if created_at is not None and (high_water_mark is None or created_at > high_water_mark):
+                    high_water_mark = created_at
+            after_account_id = rows[-1][0]
+            if since is not None:
+                after_created_at = rows[-1][2]
+            if len(rows) < self.page_size:
+                break
+            # Large initial loads: let other requests run between pages
+            await asyncio.sleep(0)
+        return high_water_mark
@@ -0,0 +1,236 @@
+import itertools
+import os
+import time
+from collections import OrderedDict
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.sql.dml import UpdateBase
+
+# Pool sizing, set per service through the deployment environment
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "280"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Compiled statements kept per engine (SQLAlchemy's default is 500)
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "500"))
+
+# Read replicas (comma-separated URLs); reads stay on the primary without them
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# How long reads for a key go to the primary after a commit that wrote it
+DB_STICKY_SECONDS = float(os.getenv("DB_STICKY_SECONDS", "5"))
+DB_STICKY_MAX_KEYS = int(os.getenv("DB_STICKY_MAX_KEYS", "100000"))
+
+pool_connections = Gauge(
+    'db_pool_connections',
+    'Connections in the database pool by state',
+    ['engine', 'state'],
+    multiprocess_mode='livesum'
+)
+pool_size = Gauge(
+    'db_pool_size',
+    'Configured size of the database pool (excluding overflow)',
+    ['engine'],
+    multiprocess_mode='livesum'
+)
+pool_checkout_wait = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time to obtain a pooled connection, including connecting when the pool grows',
+    ['engine'],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5)
+)
+pool_checkout_timeouts = Counter(
+    'db_pool_checkout_timeouts_total',
+    'Checkouts that gave up after DB_POOL_TIMEOUT',
+    ['engine']
+)
+pool_connection_age = Histogram(
+    'db_pool_connection_age_seconds',
+    'Age of the connection handed out at checkout',
+    ['engine'],
+    buckets=(1, 10, 30, 60, 120, 280, 600, 1800, 3600)
+)
+read_routing = Counter(
+    'db_read_routing_total',
+    'Statements of read-only sessions by the engine they were sent to',
+    ['target']
+)
+
+
+def _update_pool_gauges(name, pool):
+    pool_connections.labels(engine=name, state="checked_out").set(pool.checkedout())
+    pool_connections.labels(engine=name, state="idle").set(pool.checkedin())
+    pool_connections.labels(engine=name, state="overflow").set(max(pool.overflow(), 0))
+
+
+class _InstrumentedPoolMixin:
+    # Times checkouts and refreshes the pool gauges once a checkout or
+    # check-in has completed; pool events fire before the counters move
+    engine_name = "primary"
+
+    def _do_get(self):
+        start_time = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            pool_checkout_timeouts.labels(engine=self.engine_name).inc()
+            raise
+        finally:
+            pool_checkout_wait.labels(engine=self.engine_name).observe(time.perf_counter() - start_time)
+        pool_connection_age.labels(engine=self.engine_name).observe(time.time() - record.starttime)
+        _update_pool_gauges(self.engine_name, self)
+        return record
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        _update_pool_gauges(self.engine_name, self)
+
+
+def instrumented_pool_class(poolclass, name: str):
+    """Subclass of ``poolclass`` exporting its gauges under ``engine=name``."""
+    return type(
+        f"Instrumented{poolclass.__name__}",
+        (_InstrumentedPoolMixin, poolclass),
+        {"engine_name": name},
+    )
+
+
+def create_engine(url: str, name: str = "primary", **overrides):
+    """Create an async engine with the shared pool settings.
+
+    Keyword arguments override the environment defaults, e.g. a service that
+    only reads can pass a smaller ``pool_size``. SQLite URLs (local runs)
+    skip the pool options, which its driver does not accept. ``name`` labels
+    the engine's pool metrics.
+    """
+    options = {"query_cache_size": DB_QUERY_CACHE_SIZE}
+    if not url.startswith("sqlite"):
+        options.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    options.update(overrides)
+    poolclass = options.get("poolclass")
+    if poolclass is not None and issubclass(poolclass, QueuePool):
+        options["poolclass"] = instrumented_pool_class(poolclass, name)
+    engine = create_async_engine(url, **options)
+    pool = engine.sync_engine.pool
+    if isinstance(pool, QueuePool):
+        pool_size.labels(engine=name).set(pool.size())
+        _update_pool_gauges(name, pool)
+    return engine
+
+
+def create_session_factory(engine):
+    # Objects stay usable after commit so handlers can render them without
+    # another round trip
+    return sessionmaker(
+        engine,
+        class_=AsyncSession,
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+class RoutingSession(Session):
+    """Sync session behind ``AsyncSession`` that picks the engine per statement.
+
+    Sessions opened read-only send their statements to one replica (chosen
+    once per session) unless their read key was written recently; anything
+    that flushes or runs INSERT/UPDATE/DELETE goes to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        router = self.info["router"]
+        if (
+            self.info.get("read_only")
+            and router.replicas
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+        ):
+            if not router.is_sticky(self.info.get("read_key")):
+                replica = self.info.get("replica")
+                if replica is None:
+                    replica = self.info["replica"] = router.next_replica()
+                read_routing.labels(target="replica").inc()
+                return replica.sync_engine
+            read_routing.labels(target="primary").inc()
+        return router.primary.sync_engine
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_write(session):
+    key = session.info.get("read_key")
+    if key is not None and not session.info.get("read_only"):
+        session.info["router"].mark_written(key)
+
+
+def set_read_key(session, key):
+    """Tie ``session`` to ``key`` (e.g. a customer_id) for read-your-writes.
+
+    A commit on a write session marks the key; for the next
+    ``DB_STICKY_SECONDS`` read-only sessions with the same key read from the
+    primary instead of a possibly lagging replica. Stickiness is tracked per
+    worker process.
+    """
+    session.info["read_key"] = key
+
+
+class SessionRouter:
+    """Primary engine plus optional read replicas behind one session factory.
+
+    ``router.session()`` opens a write session on the primary;
+    ``router.session(read_only=True)`` one whose reads go to a replica. With
+    no replicas configured both behave like ``create_session_factory``.
+    """
+
+    def __init__(self, primary_url: str, replica_urls=None, sticky_seconds: float = DB_STICKY_SECONDS):
+        self.primary = create_engine(primary_url)
+        urls = DATABASE_REPLICA_URLS if replica_urls is None else replica_urls
+        self.replicas = [create_engine(url, name=f"replica-{index}") for index, url in enumerate(urls)]
+        self.sticky_seconds = sticky_seconds
+        self._replica_cycle = itertools.cycle(self.replicas)
+        self._written = OrderedDict()
+
+    def session(self, read_only: bool = False, read_key=None) -> AsyncSession:
+        return AsyncSession(
+            sync_session_class=RoutingSession,
+            autoflush=False,
+            expire_on_commit=False,
+            info={"router": self, "read_only": read_only, "read_key": read_key},
+        )
+
+    def next_replica(self):
+        return next(self._replica_cycle)
+
+    def mark_written(self, key):
+        if self.sticky_seconds <= 0:
+            return
+        self._written[key] = time.monotonic() + self.sticky_seconds
+        self._written.move_to_end(key)
+        while len(self._written) > DB_STICKY_MAX_KEYS:
+            self._written.popitem(last=False)
+
+    def is_sticky(self, key) -> bool:
+        if key is None:
+            return False
+        expires_at = self._written.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del self._written[key]
+            return False
+        return True
+
+    async def dispose(self):
+        for engine in (self.primary, *self.replicas):
+            await engine.dispose()
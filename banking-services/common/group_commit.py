@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+from prometheus_client import Histogram
+
+group_commit_batch_size = Histogram(
+    'group_commit_batch_size',
+    'Items coalesced into one group commit',
+    ['name'],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+group_commit_wait = Histogram(
+    'group_commit_wait_seconds',
+    'Time an item waited for its group to be flushed',
+    ['name'],
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1)
+)
+group_commit_flush_duration = Histogram(
+    'group_commit_flush_duration_seconds',
+    'Time spent flushing one group',
+    ['name']
+)
+
+
+class GroupCommitter:
+    """Coalesces concurrent submissions into one ``flush`` call.
+
+    Items submitted within ``window`` seconds of the first pending item, or
+    until ``max_items`` are pending, are handed to ``flush(items)`` together.
+    ``flush`` is a coroutine returning one result per item; each submitter
+    gets its own result back, or the exception if the whole flush failed.
+    """
+
+    def __init__(self, name: str, flush, window: float, max_items: int):
+        self.name = name
+        self.window = window
+        self.max_items = max_items
+        self._flush = flush
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        if len(self._pending) >= self.max_items or self.window <= 0:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_pending)
+        return await future
+
+    async def close(self):
+        """Flush whatever is pending and wait for in-flight groups."""
+        self._flush_pending()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        start_time = time.perf_counter()
+        group_commit_batch_size.labels(name=self.name).observe(len(batch))
+        for _, _, submitted_at in batch:
+            group_commit_wait.labels(name=self.name).observe(start_time - submitted_at)
+
+        try:
+            results = await self._flush([item for item, _, _ in batch])
+        except Exception as exc:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            group_commit_flush_duration.labels(name=self.name).observe(time.perf_counter() - start_time)
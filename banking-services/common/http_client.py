@@ -0,0 +1,141 @@
+import os
+import time
+
+import httpx
+from opentelemetry import trace
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+from prometheus_client import Counter, Gauge, Histogram
+
+# Upstream call settings (override per deployment through the environment)
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "0.5"))
+UPSTREAM_READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "2.0"))
+UPSTREAM_POOL_TIMEOUT = float(os.getenv("UPSTREAM_POOL_TIMEOUT", "0.5"))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100"))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "20"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+
+upstream_request_duration = Histogram(
+    'upstream_request_duration_seconds',
+    'Latency of calls to upstream services',
+    ['upstream', 'outcome']
+)
+upstream_request_errors = Counter(
+    'upstream_request_errors_total',
+    'Upstream calls that failed before a response was received',
+    ['upstream', 'reason']
+)
+upstream_requests_in_flight = Gauge(
+    'upstream_requests_in_flight',
+    'Upstream calls currently holding a pooled connection',
+    ['upstream'],
+    multiprocess_mode='livesum'
+)
+upstream_pool_connections = Gauge(
+    'upstream_pool_connections',
+    'Connections currently open in the upstream pool',
+    ['upstream', 'state'],
+    multiprocess_mode='livesum'
+)
+upstream_pool_max_connections = Gauge(
+    'upstream_pool_max_connections',
+    'Configured upper bound of the upstream pool',
+    ['upstream'],
+    multiprocess_mode='livesum'
+)
+
+
+class UpstreamClient:
+    """Keep-alive, connection-pooled async client for one upstream service.
+
+    A single instance is shared by every request on the worker; call
+    ``start()`` on application startup and ``close()`` on shutdown.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        connect_timeout: float = UPSTREAM_CONNECT_TIMEOUT,
+        read_timeout: float = UPSTREAM_READ_TIMEOUT,
+        pool_timeout: float = UPSTREAM_POOL_TIMEOUT,
+        max_connections: int = UPSTREAM_MAX_CONNECTIONS,
+        max_keepalive: int = UPSTREAM_MAX_KEEPALIVE,
+        keepalive_expiry: float = UPSTREAM_KEEPALIVE_EXPIRY,
+        transport: httpx.AsyncBaseTransport = None,
+    ):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(
+            read_timeout, connect=connect_timeout, pool=pool_timeout
+        )
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.transport = transport
+        self.span_name = f"http_request_to_{name.replace('-', '_')}"
+        self._client = None
+        self._propagator = TraceContextTextMapPropagator()
+        upstream_pool_max_connections.labels(upstream=name).set(max_connections)
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                transport=self.transport,
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        if self._client is None:
+            await self.start()
+
+        tracer = trace.get_tracer("common.http_client")
+        with tracer.start_as_current_span(self.span_name):
+            # Inject trace context into the outgoing headers
+            carrier = {}
+            self._propagator.inject(carrier)
+            headers = {key: str(value) for key, value in carrier.items()}
+            headers.update(kwargs.pop("headers", None) or {})
+
+            outcome = "error"
+            start_time = time.perf_counter()
+            upstream_requests_in_flight.labels(upstream=self.name).inc()
+            try:
+                response = await self._client.request(method, path, headers=headers, **kwargs)
+                outcome = f"{response.status_code // 100}xx"
+                return response
+            except httpx.TimeoutException:
+                outcome = "timeout"
+                upstream_request_errors.labels(upstream=self.name, reason="timeout").inc()
+                raise
+            except httpx.HTTPError:
+                upstream_request_errors.labels(upstream=self.name, reason="transport").inc()
+                raise
+            finally:
+                upstream_requests_in_flight.labels(upstream=self.name).dec()
+                upstream_request_duration.labels(
+                    upstream=self.name, outcome=outcome
+                ).observe(time.perf_counter() - start_time)
+                self._record_pool_state()
+
+    def _record_pool_state(self):
+        # httpx does not expose pool statistics publicly; read them from the
+        # default transport when it is in use and skip otherwise.
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is None:
+            return
+        idle = sum(1 for connection in connections if connection.is_idle())
+        upstream_pool_connections.labels(upstream=self.name, state="idle").set(idle)
+        upstream_pool_connections.labels(upstream=self.name, state="active").set(len(connections) - idle)
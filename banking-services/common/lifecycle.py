@@ -0,0 +1,65 @@
+import asyncio
+import logging
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Startup work that must finish before a worker takes traffic.
+
+    Steps run in the background and are retried with backoff, so a database
+    that is briefly unavailable delays readiness instead of failing boot.
+    """
+
+    def __init__(self, engine, initial_delay: float = 0.5, max_delay: float = 10.0):
+        self.engine = engine
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.pending = set()
+        self._tasks = []
+
+    @property
+    def started(self) -> bool:
+        return not self.pending
+
+    def start(self, name: str, step):
+        """Run coroutine function ``step`` until it succeeds."""
+        self.pending.add(name)
+        self._tasks.append(asyncio.create_task(self._run(name, step)))
+
+    async def _run(self, name, step):
+        delay = self.initial_delay
+        while True:
+            try:
+                await step()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Startup step %s failed (%s), retrying in %.1fs", name, exc, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_delay)
+            else:
+                self.pending.discard(name)
+                return
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def check(self):
+        """Return ``(ready, detail)`` for the readiness endpoint."""
+        if self.pending:
+            return False, {"status": "starting", "pending": sorted(self.pending)}
+        try:
+            await asyncio.wait_for(self._ping(), timeout=2)
+        except Exception as exc:
+            return False, {"status": "unavailable", "reason": type(exc).__name__}
+        return True, {"status": "ready"}
+
+    async def _ping(self):
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
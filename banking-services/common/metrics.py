@@ -0,0 +1,123 @@
+"""/metrics endpoint that is correct under ``uvicorn --workers N``.
+
+With ``PROMETHEUS_MULTIPROC_DIR`` set (before the worker starts), every
+worker writes its samples to memory-mapped files in that directory and a
+scrape aggregates all of them, whichever worker answers it. Without it the
+endpoint serves the worker's own default registry as before.
+
+The directory must be emptied when the pod starts (the Dockerfiles do this)
+so counters from a previous container are not carried over. Files of dead
+workers are handled here: their counters and histograms are kept so totals
+never go backwards, and their ``live*`` gauges are removed.
+
+Rendering reads every worker's files, so the output is cached for
+``METRICS_CACHE_SECONDS`` and built off the event loop.
+"""
+import asyncio
+import glob
+import gzip
+import logging
+import os
+import re
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+from prometheus_client import multiprocess
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+METRICS_CACHE_SECONDS = float(os.getenv("METRICS_CACHE_SECONDS", "1"))
+
+_LIVE_GAUGE_FILE = re.compile(r"gauge_live\w+?_(\d+)\.db$")
+
+
+def multiprocess_enabled() -> bool:
+    return bool(PROMETHEUS_MULTIPROC_DIR)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # A worker killed by a signal stays a zombie until uvicorn reaps it
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            return stat.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+def cleanup_dead_workers():
+    """Drop the live gauges of workers that exited without ``worker_stopped``."""
+    if not multiprocess_enabled():
+        return
+    dead = set()
+    for path in glob.glob(os.path.join(PROMETHEUS_MULTIPROC_DIR, "gauge_live*.db")):
+        match = _LIVE_GAUGE_FILE.search(os.path.basename(path))
+        if match and not _pid_alive(int(match.group(1))):
+            dead.add(int(match.group(1)))
+    for pid in dead:
+        logger.info("Removing live gauges of dead worker %d", pid)
+        multiprocess.mark_process_dead(pid, PROMETHEUS_MULTIPROC_DIR)
+
+
+def worker_started():
+    """Call from the lifespan startup of each worker."""
+    cleanup_dead_workers()
+
+
+def worker_stopped():
+    """Call from the lifespan shutdown of each worker."""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(os.getpid(), PROMETHEUS_MULTIPROC_DIR)
+
+
+class MetricsApp:
+    """ASGI app rendering the (aggregated) registry with a short output cache."""
+
+    def __init__(self, cache_seconds: float = METRICS_CACHE_SECONDS):
+        self.cache_seconds = cache_seconds
+        if multiprocess_enabled():
+            self.registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(self.registry, path=PROMETHEUS_MULTIPROC_DIR)
+        else:
+            self.registry = REGISTRY
+        self._cached = None
+        self._cached_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _render(self):
+        cleanup_dead_workers()
+        output = generate_latest(self.registry)
+        return output, gzip.compress(output, compresslevel=1)
+
+    async def output(self):
+        # Concurrent scrapes share one render
+        async with self._lock:
+            if self._cached is None or time.monotonic() - self._cached_at >= self.cache_seconds:
+                self._cached = await asyncio.to_thread(self._render)
+                self._cached_at = time.monotonic()
+            return self._cached
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        plain, compressed = await self.output()
+        headers = [(b"content-type", CONTENT_TYPE_LATEST.encode())]
+        accept_encoding = dict(scope["headers"]).get(b"accept-encoding", b"")
+        if b"gzip" in accept_encoding:
+            body = compressed
+            headers.append((b"content-encoding", b"gzip"))
+        else:
+            body = plain
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+def make_metrics_app(cache_seconds: float = METRICS_CACHE_SECONDS):
+    return MetricsApp(cache_seconds)
@@ -1,82 +1,132 @@
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from prometheus_client import Counter, Histogram, Gauge
+import os
 import time
 
+from prometheus_client import Counter, Histogram, Gauge
+
+HTTP_LATENCY_BUCKETS = tuple(
+    float(bucket)
+    for bucket in os.getenv(
+        "HTTP_LATENCY_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10"
+    ).split(",")
+)
+
+# Label for requests that matched no route (404s, scanners), so unknown
+# paths cannot create new series
+UNMATCHED_ROUTE = "<unmatched>"
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+# Basic request metrics
+request_count = Counter(
+    'http_requests_total',
+    'Total HTTP requests',
+    ['service', 'method', 'endpoint', 'status']
+)
+request_latency = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency',
+    ['service', 'method', 'endpoint'],
+    buckets=HTTP_LATENCY_BUCKETS
+)
+
+# Business metrics
+business_operations = Counter(
+    'business_operations_total',
+    'Business operation metrics',
+    ['service', 'operation', 'status']
+)
+
+# Service health
+service_up = Gauge(
+    'up',
+    'Service up status',
+    ['app'],
+    # Across workers: 0 if any live worker has failed
+    multiprocess_mode='livemin'
+)
+
+# (service, method, route template) -> business operation
+BUSINESS_OPERATIONS = {
+    ("account-service", "POST", "/accounts"): "account_creation",
+    ("auth-service", "POST", "/token"): "authentication",
+    ("auth-service", "GET", "/authenticate/{customer_id}"): "authentication",
+    ("transaction-service", "POST", "/transaction-process"): "transaction",
+    ("transaction-service", "POST", "/transactions/batch"): "transaction",
+}
 
-class MetricsMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, app_name: str):
-        super().__init__(app)
-
-        # Basic request metrics
-        self.request_count = Counter(
-            'http_requests_total',
-            'Total HTTP requests',
-            ['service', 'method', 'endpoint', 'status']
-        )
-        self.request_latency = Histogram(
-            'http_request_duration_seconds',
-            'HTTP request latency',
-            ['service']
-        )
-
-        # Business metrics
-        self.business_operations = Counter(
-            'business_operations_total',
-            'Business operation metrics',
-            ['service', 'operation', 'status']
-        )
-
-        # Service health
-        self.service_up = Gauge(
-            'up',
-            'Service up status',
-            ['app']
-        )
 
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request metrics per route template.
+
+    Requests are labelled with the matched route's path template (e.g.
+    ``/authenticate/{customer_id}``), never the raw URL path.
+    """
+
+    def __init__(self, app, app_name: str):
+        self.app = app
         self.app_name = app_name
-        self.service_up.labels(app=self.app_name).set(1)
+        self.operations = {
+            (method, route): operation
+            for (service, method, route), operation in BUSINESS_OPERATIONS.items()
+            if service == app_name
+        }
+        self._route_templates = None
+        service_up.labels(app=self.app_name).set(1)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            service_up.labels(app=self.app_name).set(0)
+            raise
+        finally:
+            self.record(scope, status_code, time.perf_counter() - start_time)
+
+    def record(self, scope, status_code, duration):
+        method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+        endpoint = self.route_template(scope)
 
-            # Record request metrics
-            duration = time.time() - start_time
-            self.request_count.labels(
+        # Record request metrics
+        request_count.labels(
+            service=self.app_name,
+            method=method,
+            endpoint=endpoint,
+            status=status_code
+        ).inc()
+        request_latency.labels(
+            service=self.app_name,
+            method=method,
+            endpoint=endpoint
+        ).observe(duration)
+
+        # Record business metrics based on route and status
+        operation = self.operations.get((method, endpoint))
+        if operation is not None:
+            business_operations.labels(
                 service=self.app_name,
-                method=request.method,
-                endpoint=request.url.path,
-                status=response.status_code
+                operation=operation,
+                status="success" if status_code < 400 else "failure"
             ).inc()
-            self.request_latency.labels(
-                service=self.app_name
-            ).observe(duration)
-
-            # Record business metrics based on endpoint and status
-            if request.url.path == "/accounts" and self.app_name == "account-service":
-                self.business_operations.labels(
-                    service=self.app_name,
-                    operation="account_creation",
-                    status="success" if response.status_code < 400 else "failure"
-                ).inc()
-            elif request.url.path == "/token" and self.app_name == "auth-service":
-                self.business_operations.labels(
-                    service=self.app_name,
-                    operation="authentication",
-                    status="success" if response.status_code < 400 else "failure"
-                ).inc()
-            elif request.url.path == "/transactions" and self.app_name == "transaction-service":
-                self.business_operations.labels(
-                    service=self.app_name,
-                    operation="transaction",
-                    status="success" if response.status_code < 400 else "failure"
-                ).inc()
-
-            return response
-
-        except Exception as e:
-            self.service_up.labels(app=self.app_name).set(0)
-            raise e
+
+    def route_template(self, scope):
+        # The router stores the matched endpoint in the scope; map it back to
+        # the route it was registered under
+        if self._route_templates is None:
+            app = scope.get("app")
+            self._route_templates = {
+                getattr(route, "endpoint", None) or getattr(route, "app", None): route.path
+                for route in reversed(getattr(app, "routes", []))
+            }
+        return self._route_templates.get(scope.get("endpoint"), UNMATCHED_ROUTE)
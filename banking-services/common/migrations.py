@@ -0,0 +1,225 @@
+"""Versioned schema migrations for the shared banking database.
+
+Each migration runs once, in order, and is recorded in ``schema_migrations``.
+Services call ``upgrade`` from their startup hook; on MySQL an advisory lock
+serializes concurrent workers and pods. The same module checks that the hot
+queries of the three services are served by an index:
+
+    python -m common.migrations upgrade
+    python -m common.migrations check-indexes
+"""
+import asyncio
+import logging
+import os
+import re
+import sys
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Float, ForeignKey, Index, Integer, MetaData, String, Table, Text,
+    select, text, update,
+)
+
+from common import queries
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_LOCK_NAME = "banking_schema_migrations"
+MIGRATION_LOCK_TIMEOUT = int(os.getenv("MIGRATION_LOCK_TIMEOUT", "60"))
+
+# Schema as of the migrations below; deliberately independent of the ORM
+# models so old migrations keep meaning what they meant when written.
+metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations", metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+accounts = Table(
+    "accounts", metadata,
+    Column("account_id", String(64), primary_key=True),
+    Column("customer_id", String(64), nullable=False),
+    Column("account_type", String(32), nullable=False),
+    Column("currency", String(8), nullable=False),
+    Column("balance", Float, nullable=False),
+    Column("created_at", DateTime),
+    Column("status", String(32)),
+)
+
+transactions = Table(
+    "transactions", metadata,
+    Column("transaction_id", String(64), primary_key=True),
+    Column("account_id", String(64), ForeignKey("accounts.account_id"), nullable=False),
+    Column("transaction_type", String(16), nullable=False),
+    Column("amount", Float, nullable=False),
+    Column("created_at", DateTime),
+)
+
+transaction_outbox = Table(
+    "transaction_outbox", metadata,
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    Column("topic", String(64), nullable=False),
+    Column("payload", Text, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+)
+
+
+def _create_base_tables(conn):
+    # Existing databases already have these tables from create_all
+    metadata.create_all(conn, tables=[accounts, transactions], checkfirst=True)
+
+
+def _add_access_path_indexes(conn):
+    # customer_id: auth lookups, /transaction, /transaction-process,
+    # /account-details. created_at: auth-service customer index refresh.
+    # (account_id, created_at): per-account transaction history.
+    for index in (
+        Index("ix_accounts_customer_id", accounts.c.customer_id),
+        Index("ix_accounts_created_at", accounts.c.created_at),
+        Index("ix_transactions_account_id_created_at", transactions.c.account_id, transactions.c.created_at),
+    ):
+        index.create(conn, checkfirst=True)
+
+
+def _create_transaction_outbox(conn):
+    # Drained in id order by common.outbox; published rows are deleted, so
+    # the primary key is the only access path it needs
+    transaction_outbox.create(conn, checkfirst=True)
+
+
+MIGRATIONS = [
+    (1, "create accounts and transactions", _create_base_tables),
+    (2, "add customer_id, created_at and account history indexes", _add_access_path_indexes),
+    (3, "create transaction_outbox", _create_transaction_outbox),
+]
+
+
+def upgrade(conn):
+    """Apply pending migrations on a sync connection; returns their versions.
+
+    From async code: ``await conn.run_sync(upgrade)``.
+    """
+    use_lock = conn.dialect.name == "mysql"
+    if use_lock:
+        acquired = conn.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"),
+            {"name": MIGRATION_LOCK_NAME, "timeout": MIGRATION_LOCK_TIMEOUT},
+        ).scalar()
+        if acquired != 1:
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+    try:
+        schema_migrations.create(conn, checkfirst=True)
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+        newly_applied = []
+        for version, description, apply in MIGRATIONS:
+            if version in applied:
+                continue
+            logger.info("Applying schema migration %d: %s", version, description)
+            apply(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version,
+                description=description,
+                applied_at=datetime.now(timezone.utc),
+            ))
+            newly_applied.append(version)
+        return newly_applied
+    finally:
+        if use_lock:
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
+
+
+# Hot queries of the three services, with representative parameters. Where a
+# service runs a prepared statement from common.queries, the entry is that
+# statement with the bind values it runs with, not a lookalike
+HOT_QUERIES = [
+    ("auth: customer exists",
+     select(accounts.c.account_id).where(accounts.c.customer_id == "c").limit(1)),
+    ("auth: customer index refresh",
+     queries.customer_page_since,
+     {"after_created_at": datetime(2024, 1, 1), "after_account_id": "a", "limit": 5000}),
+    ("account: /account-details",
+     select(accounts).where(accounts.c.customer_id == "c")),
+    ("account: GET /customers/{customer_id}/accounts",
+     select(accounts).where(accounts.c.customer_id == "c", accounts.c.account_id > "a")
+     .order_by(accounts.c.account_id).limit(51)),
+    ("transaction: POST /transaction",
+     select(accounts).where(accounts.c.customer_id == "c").limit(1)),
+    ("transaction: /transaction-process account lookup",
+     select(accounts.c.account_id).where(accounts.c.customer_id == "c").limit(1)),
+    ("transaction: /transaction-process balance update",
+     update(accounts).where(accounts.c.account_id == "a", accounts.c.balance >= 1.0)
+     .values(balance=accounts.c.balance - 1.0)),
+    ("transaction: account history",
+     select(transactions).where(
+         transactions.c.account_id == "a",
+         transactions.c.created_at >= datetime(2024, 1, 1),
+         transactions.c.created_at < datetime(2025, 1, 1),
+     ).order_by(transactions.c.created_at)),
+]
+
+
+# A range over the primary key bounded only from below (``account_id > ?``)
+# walks the table from that point on: an index in name only
+_SQLITE_OPEN_PRIMARY_KEY_RANGE = re.compile(
+    r"USING (?:INTEGER PRIMARY KEY|PRIMARY KEY|INDEX sqlite_autoindex_\w+) \(\w+>=?\?\)$")
+
+
+def _explain_uses_index(conn, statement, params=None):
+    compiled = statement.compile(dialect=conn.dialect)
+    bound = compiled.construct_params(params)
+    args = tuple(bound[name] for name in compiled.positiontup)
+    if conn.dialect.name == "mysql":
+        rows = conn.exec_driver_sql("EXPLAIN " + compiled.string, args).mappings().all()
+        plan = "; ".join(f"{row['table']}: type={row['type']} key={row['key']}" for row in rows)
+        # Hot queries only touch PRIMARY by equality; a PRIMARY range is a walk
+        return all(
+            row["key"] and row["type"] not in ("ALL", "index")
+            and not (row["key"] == "PRIMARY" and row["type"] == "range")
+            for row in rows
+        ), plan
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + compiled.string, args).all()
+        details = [row[-1] for row in rows]
+        scans = [detail for detail in details if detail.startswith(("SCAN", "SEARCH"))]
+        return all(
+            "USING" in detail and not _SQLITE_OPEN_PRIMARY_KEY_RANGE.search(detail) for detail in scans
+        ), "; ".join(details)
+    raise RuntimeError(f"EXPLAIN check not supported for {conn.dialect.name}")
+
+
+def check_indexes(conn):
+    """EXPLAIN every hot query; returns ``(name, uses_index, plan)`` rows."""
+    return [(name, *_explain_uses_index(conn, statement, *params)) for name, statement, *params in HOT_QUERIES]
+
+
+async def _main(command):
+    from common.database import create_engine
+
+    url = os.getenv("DATABASE_URL") or (
+        f"mysql+aiomysql://root:{os.getenv('MYSQL_ROOT_PASSWORD', 'default_password')}"
+        f"@{os.getenv('MYSQL_HOST', 'account-mysql')}:3306/{os.getenv('MYSQL_DB', 'accounts_db')}"
+    )
+    engine = create_engine(url)
+    try:
+        async with engine.begin() as conn:
+            if command == "upgrade":
+                applied = await conn.run_sync(upgrade)
+                print(f"Applied migrations: {applied or 'none'}")
+                return 0
+            results = await conn.run_sync(check_indexes)
+    finally:
+        await engine.dispose()
+
+    for name, uses_index, plan in results:
+        print(f"{'ok  ' if uses_index else 'FAIL'} {name}\n     {plan}")
+    return 0 if all(uses_index for _, uses_index, _ in results) else 1
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ("upgrade", "check-indexes"):
+        sys.exit("usage: python -m common.migrations upgrade|check-indexes")
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(_main(sys.argv[1])))
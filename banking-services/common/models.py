@@ -0,0 +1,43 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import BigInteger, Column, DateTime, Float, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
+
+# ORM models shared by the services. The schema itself is owned by
+# common.migrations; these only describe it for queries.
+Base = declarative_base()
+
+
+class AccountModel(Base):
+    __tablename__ = "accounts"
+    account_id = Column(String, primary_key=True, index=True)
+    customer_id = Column(String, nullable=False, index=True)
+    account_type = Column(String, nullable=False)
+    currency = Column(String, nullable=False)
+    balance = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+    status = Column(String, default="ACTIVE")
+
+
+class TransactionModel(Base):
+    __tablename__ = "transactions"
+    transaction_id = Column(String, primary_key=True, index=True)
+    account_id = Column(String, ForeignKey("accounts.account_id"), nullable=False)
+    transaction_type = Column(String, nullable=False)  # 'credit' or 'debit'
+    amount = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    account = relationship("AccountModel", backref="transactions")
+
+    __table_args__ = (Index("ix_transactions_account_id_created_at", "account_id", "created_at"),)
+
+
+class OutboxModel(Base):
+    """Events waiting to be published; written in the same DB transaction
+    as the change they describe and deleted once published (common.outbox)."""
+    __tablename__ = "transaction_outbox"
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    topic = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime, nullable=False)
@@ -0,0 +1,82 @@
+"""Content negotiation between a service's HTML views and its JSON API.
+
+One route serves both browsers and machine clients. ``read_payload`` takes
+the body as a form (what the HTML pages post) or as JSON, validated by the
+same pydantic model; JSON bodies are parsed and validated in one pass by
+pydantic-core, without form parsing. ``prefers_json`` picks the response
+format from ``Accept``: JSON when the client ranks ``application/json``
+above ``text/html``. When both rank the same (no header, ``*/*``), the
+response follows the request body, so a client posting JSON gets JSON back.
+"""
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+JSON_MEDIA_TYPE = "application/json"
+HTML_MEDIA_TYPE = "text/html"
+
+
+def _media_ranges(accept: str):
+    ranges = []
+    for part in accept.split(","):
+        media_range, *params = part.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        ranges.append((media_range.strip().lower(), quality))
+    return ranges
+
+
+def _quality(ranges, media_type: str) -> float:
+    """q of the most specific range matching ``media_type`` (RFC 9110)."""
+    main_type = media_type.split("/")[0]
+    best_specificity, best_quality = -1, 0.0
+    for media_range, quality in ranges:
+        if media_range == media_type:
+            specificity = 2
+        elif media_range == f"{main_type}/*":
+            specificity = 1
+        elif media_range == "*/*":
+            specificity = 0
+        else:
+            continue
+        if specificity > best_specificity:
+            best_specificity, best_quality = specificity, quality
+    return best_quality
+
+
+def has_json_body(request) -> bool:
+    content_type = request.headers.get("content-type", "")
+    return content_type.split(";")[0].strip().lower() == JSON_MEDIA_TYPE
+
+
+def prefers_json(request) -> bool:
+    accept = request.headers.get("accept")
+    if not accept:
+        return has_json_body(request)
+    ranges = _media_ranges(accept)
+    json_quality = _quality(ranges, JSON_MEDIA_TYPE)
+    html_quality = _quality(ranges, HTML_MEDIA_TYPE)
+    if json_quality == html_quality:
+        return json_quality > 0 and has_json_body(request)
+    return json_quality > html_quality
+
+
+async def read_payload(request, model):
+    """The request body as ``model``, from JSON or form data.
+
+    Invalid input raises ``RequestValidationError``, so the client gets the
+    same 422 response as for a declared body parameter.
+    """
+    try:
+        if has_json_body(request):
+            return model.model_validate_json(await request.body())
+        return model.model_validate(dict(await request.form()))
+    except ValidationError as exc:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in exc.errors()]
+        ) from exc
@@ -0,0 +1,317 @@
+"""Transactional outbox: events committed with the data, published later.
+
+A service writes ``outbox_row(...)`` into ``transaction_outbox`` in the same
+DB transaction as the change the event describes, so an event exists if and
+only if the change committed, and the request never waits on the event
+sink. ``OutboxPublisher`` drains the table in the background:
+
+- Rows are claimed in id order, ``OUTBOX_BATCH_SIZE`` at a time, with
+  ``SELECT ... FOR UPDATE SKIP LOCKED`` so the publishers of several workers
+  and pods take disjoint batches. Each batch is handed to the sink in one
+  call and deleted in the same transaction that claimed it.
+- Lag is bounded: a full batch is followed immediately by the next one, and
+  an idle publisher polls every ``OUTBOX_POLL_SECONDS`` or sooner when
+  ``notify()`` is called after a commit.
+- Backpressure: at most one batch per worker is in flight and held in
+  memory. A slow sink slows the drain, a failing one is retried with
+  exponential backoff up to ``OUTBOX_MAX_BACKOFF_SECONDS``; meanwhile events
+  wait in the table and ``outbox_lag_seconds`` grows, but postings are never
+  blocked or lost.
+
+Delivery is at least once: a batch the sink accepted whose delete then fails
+is published again, so consumers should be idempotent by event id. The
+fraud-detection Lambda is only partly so: alerts are keyed by
+``transaction_id`` and duplicates within one SQS batch are collapsed, but a
+redelivery in a later batch is added to the hourly aggregates again and
+can push a customer over the HIGH_FREQUENCY threshold. SQLite ignores
+``FOR UPDATE``; there several workers may publish the same rows.
+
+The sink is chosen with ``OUTBOX_SINK``:
+
+    file  append each payload as a JSON line to OUTBOX_FILE (default);
+          development only, nothing consumes or rotates the file
+    sqs   send to OUTBOX_SQS_QUEUE_URL, ten messages per SendMessageBatch
+          (needs boto3, imported and connected on the first publish)
+
+Outside the environments in ``OUTBOX_FILE_SINK_ENVIRONMENTS`` (``ENVIRONMENT``
+unset counts as development) the file sink is refused at startup, so a
+deployment that forgot to configure SQS fails instead of deleting events
+into a local file.
+
+``QueueSink`` puts the events on an ``asyncio.Queue`` for tests.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import bindparam, delete, select
+
+from common.models import OutboxModel
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_SINK = os.getenv("OUTBOX_SINK", "file")
+OUTBOX_FILE = os.getenv("OUTBOX_FILE", "outbox-events.jsonl")
+OUTBOX_SQS_QUEUE_URL = os.getenv("OUTBOX_SQS_QUEUE_URL")
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "0.5"))
+OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", "30"))
+OUTBOX_DRAIN_SECONDS = float(os.getenv("OUTBOX_DRAIN_SECONDS", "5"))
+ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+OUTBOX_FILE_SINK_ENVIRONMENTS = frozenset(
+    os.getenv("OUTBOX_FILE_SINK_ENVIRONMENTS", "development,dev,local,test,benchmark").split(",")
+)
+
+outbox_published = Counter(
+    'outbox_events_published_total',
+    'Outbox events handed to the sink',
+    ['sink']
+)
+outbox_failures = Counter(
+    'outbox_publish_failures_total',
+    'Outbox batches that failed to publish and will be retried',
+    ['sink']
+)
+outbox_batch_size = Histogram(
+    'outbox_publish_batch_size',
+    'Events published in one outbox batch',
+    ['sink'],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+outbox_publish_duration = Histogram(
+    'outbox_publish_duration_seconds',
+    'Time to claim, publish and delete one outbox batch',
+    ['sink']
+)
+outbox_event_delay = Histogram(
+    'outbox_event_delay_seconds',
+    'Time from commit to publish, per event',
+    ['sink'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+)
+outbox_lag = Gauge(
+    'outbox_lag_seconds',
+    'Age of the oldest unpublished outbox event at the last poll',
+    multiprocess_mode='livemax'
+)
+
+# Oldest unclaimed rows first; rows another publisher holds are skipped
+claim_batch = (
+    select(OutboxModel.id, OutboxModel.topic, OutboxModel.payload, OutboxModel.created_at)
+    .order_by(OutboxModel.id)
+    .limit(bindparam("limit"))
+    .with_for_update(skip_locked=True)
+)
+delete_published = delete(OutboxModel).where(OutboxModel.id.in_(bindparam("ids", expanding=True)))
+
+
+def outbox_row(topic: str, payload: dict, created_at: datetime = None) -> dict:
+    """Values for one ``transaction_outbox`` insert."""
+    return {
+        "topic": topic,
+        "payload": json.dumps(payload, separators=(",", ":")),
+        "created_at": created_at or datetime.now(timezone.utc),
+    }
+
+
+def _age(created_at, now):
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return max((now - created_at).total_seconds(), 0.0)
+
+
+class FileSink:
+    """Appends each event's JSON payload as one line to ``path``."""
+
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def publish(self, rows):
+        lines = "".join(row.payload + "\n" for row in rows)
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines):
+        with open(self.path, "a") as events:
+            events.write(lines)
+            events.flush()
+
+    async def close(self):
+        pass
+
+
+class QueueSink:
+    """Puts decoded payloads on ``queue``; a bounded queue blocks the
+    publisher until the consumer catches up."""
+
+    name = "queue"
+
+    def __init__(self, queue: asyncio.Queue = None):
+        self.queue = queue if queue is not None else asyncio.Queue()
+
+    async def publish(self, rows):
+        for row in rows:
+            await self.queue.put(json.loads(row.payload))
+
+    async def close(self):
+        pass
+
+
+class SQSSink:
+    """Sends each event's payload as one SQS message, ten per batch call."""
+
+    name = "sqs"
+    MAX_BATCH = 10
+
+    def __init__(self, queue_url: str):
+        if not queue_url:
+            raise ValueError("OUTBOX_SQS_QUEUE_URL must be set for the sqs outbox sink")
+        self.queue_url = queue_url
+        self.client = None
+
+    async def publish(self, rows):
+        await asyncio.to_thread(self._send, rows)
+
+    def _send(self, rows):
+        if self.client is None:
+            # Built here rather than at import: boto3 takes the better part
+            # of a second to load. One batch is in flight per worker, so
+            # this never races
+            import boto3
+
+            self.client = boto3.client("sqs")
+        for start in range(0, len(rows), self.MAX_BATCH):
+            batch = rows[start:start + self.MAX_BATCH]
+            response = self.client.send_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[{"Id": str(row.id), "MessageBody": row.payload} for row in batch],
+            )
+            if response.get("Failed"):
+                # Retry the whole batch; messages already sent are duplicates
+                # the consumer drops
+                raise RuntimeError(f"SQS rejected {len(response['Failed'])} outbox message(s)")
+
+    async def close(self):
+        pass
+
+
+def make_sink(kind: str = OUTBOX_SINK, environment: str = ENVIRONMENT):
+    if kind == "file":
+        if environment not in OUTBOX_FILE_SINK_ENVIRONMENTS:
+            raise ValueError(
+                f"OUTBOX_SINK=file is for development only (ENVIRONMENT={environment!r}); "
+                "set OUTBOX_SINK=sqs and OUTBOX_SQS_QUEUE_URL"
+            )
+        return FileSink(OUTBOX_FILE)
+    if kind == "sqs":
+        return SQSSink(OUTBOX_SQS_QUEUE_URL)
+    if kind == "queue":
+        return QueueSink()
+    raise ValueError(f"Unknown OUTBOX_SINK {kind!r}")
+
+
+class OutboxPublisher:
+    """Background task draining ``transaction_outbox`` into ``sink``.
+
+    ``session_factory`` must open sessions on the primary. ``ready``, if
+    given, is polled before each batch so the publisher waits for startup
+    work such as migrations.
+    """
+
+    def __init__(self, session_factory, sink, batch_size: int = OUTBOX_BATCH_SIZE,
+                 poll_interval: float = OUTBOX_POLL_SECONDS,
+                 max_backoff: float = OUTBOX_MAX_BACKOFF_SECONDS, ready=None):
+        self.session_factory = session_factory
+        self.sink = sink
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self._ready = ready
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def notify(self):
+        """Wake the publisher early; call after committing outbox rows."""
+        self._wakeup.set()
+
+    async def stop(self):
+        """Stop polling, then publish what is left for up to
+        OUTBOX_DRAIN_SECONDS; anything remaining stays in the table."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            if self._ready is None or self._ready():
+                try:
+                    await asyncio.wait_for(self.drain(), timeout=OUTBOX_DRAIN_SECONDS)
+                except Exception as exc:
+                    logger.warning("Outbox not drained on shutdown (%s)", type(exc).__name__)
+        await self.sink.close()
+
+    async def drain(self):
+        """Publish batches until the outbox is empty; returns the count."""
+        total = 0
+        while True:
+            published = await self.publish_batch()
+            total += published
+            if published < self.batch_size:
+                return total
+
+    async def publish_batch(self) -> int:
+        """Claim, publish and delete one batch; returns its size."""
+        start_time = time.perf_counter()
+        async with self.session_factory() as db:
+            rows = (await db.execute(claim_batch, {"limit": self.batch_size})).all()
+            now = datetime.now(timezone.utc)
+            if not rows:
+                await db.rollback()
+                outbox_lag.set(0)
+                return 0
+            outbox_lag.set(_age(rows[0].created_at, now))
+            await self.sink.publish(rows)
+            await db.execute(delete_published, {"ids": [row.id for row in rows]})
+            await db.commit()
+
+        sink = self.sink.name
+        published_at = datetime.now(timezone.utc)
+        for row in rows:
+            outbox_event_delay.labels(sink=sink).observe(_age(row.created_at, published_at))
+        outbox_published.labels(sink=sink).inc(len(rows))
+        outbox_batch_size.labels(sink=sink).observe(len(rows))
+        outbox_publish_duration.labels(sink=sink).observe(time.perf_counter() - start_time)
+        return len(rows)
+
+    async def _run(self):
+        delay = 0.0
+        while True:
+            if self._ready is not None and not self._ready():
+                await self._wait(self.poll_interval)
+                continue
+            try:
+                published = await self.publish_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                outbox_failures.labels(sink=self.sink.name).inc()
+                delay = min(max(delay * 2, self.poll_interval), self.max_backoff)
+                logger.warning("Outbox publish failed (%s), retrying in %.1fs", exc, delay)
+                await asyncio.sleep(delay)
+                continue
+            delay = 0.0
+            if published < self.batch_size:
+                await self._wait(self.poll_interval)
+
+    async def _wait(self, timeout):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
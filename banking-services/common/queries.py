@@ -0,0 +1,110 @@
+"""Hot queries shared by the services.
+
+Statements are built once at import with bind parameters, so a request
+only supplies values: no per-call construction, and every call hits the
+same entry of the engine's compiled-statement cache
+(``DB_QUERY_CACHE_SIZE``).
+"""
+from sqlalchemy import and_, bindparam, or_, select, update
+
+from common.models import AccountModel
+
+account_by_id = select(AccountModel).where(AccountModel.account_id == bindparam("account_id"))
+
+accounts_by_customer = select(AccountModel).where(AccountModel.customer_id == bindparam("customer_id"))
+
+first_account_by_customer = accounts_by_customer.limit(1)
+
+account_id_by_customer = (
+    select(AccountModel.account_id)
+    .where(AccountModel.customer_id == bindparam("customer_id"))
+    .limit(1)
+)
+
+owned_account_ids_query = (
+    select(AccountModel.account_id)
+    .where(
+        AccountModel.customer_id == bindparam("customer_id"),
+        AccountModel.account_id.in_(bindparam("account_ids", expanding=True)),
+    )
+)
+
+# Customer index refresh (auth-service). Full loads page by account_id;
+# incremental ones by (created_at, account_id) from the high-water mark, a
+# range of ix_accounts_created_at rather than a walk of the primary key
+customer_page = (
+    select(AccountModel.account_id, AccountModel.customer_id, AccountModel.created_at)
+    .where(AccountModel.account_id > bindparam("after_account_id"))
+    .order_by(AccountModel.account_id)
+    .limit(bindparam("limit"))
+)
+_after_created_at = bindparam("after_created_at")
+customer_page_since = (
+    select(AccountModel.account_id, AccountModel.customer_id, AccountModel.created_at)
+    .where(
+        AccountModel.created_at >= _after_created_at,
+        or_(
+            AccountModel.created_at > _after_created_at,
+            and_(AccountModel.created_at == _after_created_at,
+                 AccountModel.account_id > bindparam("after_account_id")),
+        ),
+    )
+    .order_by(AccountModel.created_at, AccountModel.account_id)
+    .limit(bindparam("limit"))
+)
+
+# Conditional balance updates: one statement, no read-modify-write, so
+# concurrent postings cannot overdraw an account or lose an update. (UPDATE
+# reserves bind names equal to column names, hence target_account_id.)
+credit_balance = (
+    update(AccountModel)
+    .where(AccountModel.account_id == bindparam("target_account_id"))
+    .values(balance=AccountModel.balance + bindparam("amount"))
+    .execution_options(synchronize_session=False)
+)
+debit_balance = (
+    update(AccountModel)
+    .where(AccountModel.account_id == bindparam("target_account_id"), AccountModel.balance >= bindparam("amount"))
+    .values(balance=AccountModel.balance - bindparam("amount"))
+    .execution_options(synchronize_session=False)
+)
+
+
+async def get_account(db, account_id):
+    return (await db.execute(account_by_id, {"account_id": account_id})).scalars().first()
+
+
+async def get_first_account(db, customer_id):
+    return (await db.execute(first_account_by_customer, {"customer_id": customer_id})).scalars().first()
+
+
+async def list_accounts(db, customer_id):
+    return (await db.execute(accounts_by_customer, {"customer_id": customer_id})).scalars().all()
+
+
+async def find_account_id(db, customer_id):
+    return (await db.execute(account_id_by_customer, {"customer_id": customer_id})).scalar()
+
+
+async def owned_account_ids(db, customer_id, account_ids) -> set:
+    """The subset of ``account_ids`` that belongs to ``customer_id``."""
+    result = await db.execute(owned_account_ids_query, {"customer_id": customer_id, "account_ids": list(account_ids)})
+    return set(result.scalars().all())
+
+
+async def customer_exists(db, customer_id) -> bool:
+    return await find_account_id(db, customer_id) is not None
+
+
+async def load_customer_page(db, after_created_at, after_account_id, limit):
+    params = {"after_account_id": after_account_id, "limit": limit}
+    if after_created_at is None:
+        return (await db.execute(customer_page, params)).all()
+    return (await db.execute(customer_page_since, {**params, "after_created_at": after_created_at})).all()
+
+
+async def apply_balance_change(db, account_id, transaction_type, amount) -> bool:
+    """Credit or debit ``amount``; False if a debit would overdraw the account."""
+    statement = debit_balance if transaction_type == "debit" else credit_balance
+    result = await db.execute(statement, {"target_account_id": account_id, "amount": amount})
+    return result.rowcount > 0
@@ -0,0 +1,53 @@
+"""Jinja2 templates compiled once, not on every request.
+
+``make_templates`` returns a ``Jinja2Templates`` whose environment:
+
+- loads from an absolute directory, so rendering does not depend on the
+  working directory;
+- never re-checks template files for changes (``auto_reload=False``), so a
+  cached template is rendered without a ``stat`` per request;
+- keeps compiled bytecode in ``TEMPLATE_BYTECODE_DIR`` (a per-user temp
+  directory by default), so a new worker unmarshals the templates instead
+  of parsing and compiling them.
+
+``precompile`` loads every template into the environment's cache; services
+call it from their lifespan. The image build fills the bytecode directory
+ahead of time:
+
+    python -m common.templates transaction-service/templates
+"""
+import os
+import sys
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+TEMPLATE_BYTECODE_DIR = os.getenv("TEMPLATE_BYTECODE_DIR")
+TEMPLATE_CACHE_SIZE = int(os.getenv("TEMPLATE_CACHE_SIZE", "400"))
+
+
+def make_templates(directory: str, bytecode_dir: str = TEMPLATE_BYTECODE_DIR) -> Jinja2Templates:
+    if bytecode_dir:
+        os.makedirs(bytecode_dir, exist_ok=True)
+    return Jinja2Templates(
+        directory=os.path.abspath(directory),
+        auto_reload=False,
+        cache_size=TEMPLATE_CACHE_SIZE,
+        bytecode_cache=FileSystemBytecodeCache(bytecode_dir),
+    )
+
+
+def precompile(templates: Jinja2Templates) -> int:
+    """Compile every template now; returns how many there are."""
+    names = templates.env.list_templates()
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m common.templates TEMPLATE_DIR...")
+    for directory in sys.argv[1:]:
+        count = precompile(make_templates(directory))
+        print(f"Compiled {count} template(s) from {directory}")
@@ -0,0 +1,217 @@
+"""Short-lived signed session tokens (HS256 JWTs).
+
+auth-service issues them; other services verify them locally instead of
+calling auth-service on every request.
+
+Keys are a ring of ``kid:secret`` pairs in ``JWT_KEYS`` (falling back to
+``JWT_SECRET`` as kid ``default``). New tokens are signed with
+``JWT_ACTIVE_KID``; any key still in the ring verifies. To rotate, add the
+new key everywhere, switch ``JWT_ACTIVE_KID`` on auth-service, and drop the
+old key once ``TOKEN_TTL_SECONDS`` has passed. Without either variable
+the ring is a well-known development key, so outside the environments in
+``JWT_DEVELOPMENT_ENVIRONMENTS`` (``ENVIRONMENT`` unset counts as
+development) the services refuse to start instead.
+
+Customer tokens carry the customer as ``sub`` and their account as
+``acct``. Internal callers use service tokens from the same ring whose
+``roles`` claim grants them more, for example posting to any account:
+
+    python -m common.tokens ledger-sync service --ttl 3600
+
+Revocation: ``JWT_REVOCATION_FILE`` lists one entry per line, either a token
+``jti`` or ``sub:<customer_id>`` to reject every token of that customer. It
+is re-read when it changes, checked at most every
+``JWT_REVOCATION_REFRESH_SECONDS``. Entries only need to outlive the TTL.
+"""
+import logging
+import os
+import time
+import uuid
+
+import jwt
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM = "HS256"
+TOKEN_ISSUER = "auth-service"
+TOKEN_AUDIENCE = "banking-services"
+TOKEN_TTL_SECONDS = int(os.getenv("TOKEN_TTL_SECONDS", "900"))
+TOKEN_LEEWAY_SECONDS = int(os.getenv("TOKEN_LEEWAY_SECONDS", "10"))
+TOKEN_COOKIE_NAME = "access_token"
+ROLES_CLAIM = "roles"
+TOKEN_COOKIE_SECURE = os.getenv("TOKEN_COOKIE_SECURE", "false").lower() == "true"
+JWT_REVOCATION_FILE = os.getenv("JWT_REVOCATION_FILE")
+JWT_REVOCATION_REFRESH_SECONDS = float(os.getenv("JWT_REVOCATION_REFRESH_SECONDS", "5"))
+ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+JWT_DEVELOPMENT_ENVIRONMENTS = frozenset(
+    os.getenv("JWT_DEVELOPMENT_ENVIRONMENTS", "development,dev,local,test,benchmark").split(",")
+)
+DEVELOPMENT_SECRET = "sample_secret"
+
+token_verifications = Counter(
+    'token_verifications_total',
+    'Session token verifications by outcome',
+    ['result']
+)
+
+
+class TokenError(Exception):
+    """The token is missing, malformed, expired, unknown or revoked."""
+
+
+def parse_key_ring(value: str) -> dict:
+    keys = {}
+    for entry in value.split(","):
+        kid, sep, secret = entry.strip().partition(":")
+        if not sep or not kid or not secret:
+            raise ValueError("JWT_KEYS entries must look like kid:secret")
+        keys[kid] = secret
+    return keys
+
+
+def _load_key_ring(environment: str = ENVIRONMENT):
+    if os.getenv("JWT_KEYS"):
+        keys = parse_key_ring(os.environ["JWT_KEYS"])
+    elif os.getenv("JWT_SECRET"):
+        keys = {"default": os.environ["JWT_SECRET"]}
+    elif environment in JWT_DEVELOPMENT_ENVIRONMENTS:
+        logger.warning("Neither JWT_KEYS nor JWT_SECRET is set; using the development key")
+        keys = {"default": DEVELOPMENT_SECRET}
+    else:
+        raise ValueError(
+            f"JWT_KEYS or JWT_SECRET must be set outside development (ENVIRONMENT={environment!r})"
+        )
+    active_kid = os.getenv("JWT_ACTIVE_KID") or next(iter(keys))
+    if active_kid not in keys:
+        raise ValueError(f"JWT_ACTIVE_KID {active_kid!r} is not in JWT_KEYS")
+    return keys, active_kid
+
+
+class RevocationList:
+    """Revoked token IDs and subjects, reloaded from a file when it changes."""
+
+    def __init__(self, path=None, refresh_seconds: float = JWT_REVOCATION_REFRESH_SECONDS):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.jtis = frozenset()
+        self.subjects = frozenset()
+        self._mtime = None
+        self._checked_at = 0.0
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if not self.path or now - self._checked_at < self.refresh_seconds:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return
+            with open(self.path) as revocations:
+                entries = [line.strip() for line in revocations if line.strip() and not line.startswith("#")]
+        except OSError:
+            # Keep the last list we managed to read
+            logger.warning("Could not read revocation list %s", self.path)
+            return
+        self._mtime = mtime
+        self.subjects = frozenset(entry[4:] for entry in entries if entry.startswith("sub:"))
+        self.jtis = frozenset(entry for entry in entries if not entry.startswith("sub:"))
+
+    def is_revoked(self, claims: dict) -> bool:
+        self._maybe_reload()
+        return claims.get("jti") in self.jtis or claims.get("sub") in self.subjects
+
+
+class SessionTokens:
+    """Issues and verifies tokens with one key ring."""
+
+    def __init__(self, keys=None, active_kid=None, ttl: int = TOKEN_TTL_SECONDS, revocations=None):
+        if keys is None:
+            keys, default_kid = _load_key_ring()
+            active_kid = active_kid or default_kid
+        self.keys = keys
+        self.active_kid = active_kid or next(iter(keys))
+        self.ttl = ttl
+        self.revocations = revocations if revocations is not None else RevocationList(JWT_REVOCATION_FILE)
+
+    def issue(self, customer_id: str, **claims):
+        """Sign a token for ``customer_id``; returns ``(token, expires_in)``."""
+        now = int(time.time())
+        payload = {
+            **claims,
+            "sub": customer_id,
+            "iss": TOKEN_ISSUER,
+            "aud": TOKEN_AUDIENCE,
+            "iat": now,
+            "exp": now + self.ttl,
+            "jti": uuid.uuid4().hex,
+        }
+        token = jwt.encode(payload, self.keys[self.active_kid], algorithm=ALGORITHM, headers={"kid": self.active_kid})
+        return token, self.ttl
+
+    def verify(self, token: str) -> dict:
+        """Return the claims of a valid token or raise ``TokenError``."""
+        if not token:
+            token_verifications.labels(result="missing").inc()
+            raise TokenError("missing token")
+        try:
+            kid = jwt.get_unverified_header(token).get("kid", "default")
+            key = self.keys.get(kid)
+            if key is None:
+                raise TokenError(f"unknown key id {kid!r}")
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[ALGORITHM],
+                audience=TOKEN_AUDIENCE,
+                issuer=TOKEN_ISSUER,
+                leeway=TOKEN_LEEWAY_SECONDS,
+                options={"require": ["exp", "iat", "sub", "jti"]},
+            )
+        except jwt.ExpiredSignatureError as exc:
+            token_verifications.labels(result="expired").inc()
+            raise TokenError(str(exc)) from exc
+        except (jwt.PyJWTError, TokenError) as exc:
+            token_verifications.labels(result="invalid").inc()
+            raise TokenError(str(exc)) from exc
+        if self.revocations.is_revoked(claims):
+            token_verifications.labels(result="revoked").inc()
+            raise TokenError("token revoked")
+        token_verifications.labels(result="valid").inc()
+        return claims
+
+
+def has_role(claims: dict, role: str) -> bool:
+    return role in claims.get(ROLES_CLAIM, ())
+
+
+def set_token_cookie(response, token: str, expires_in: int):
+    response.set_cookie(
+        TOKEN_COOKIE_NAME,
+        token,
+        max_age=expires_in,
+        httponly=True,
+        samesite="strict",
+        secure=TOKEN_COOKIE_SECURE,
+    )
+
+
+def token_from_request(request):
+    """The bearer token of a Starlette request, or its session cookie."""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, credentials = authorization.partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials.strip()
+    return request.cookies.get(TOKEN_COOKIE_NAME)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Issue a service token signed with the active key.")
+    parser.add_argument("subject", help="name of the calling service")
+    parser.add_argument("roles", nargs="+", help="roles to grant, e.g. service or compliance")
+    parser.add_argument("--ttl", type=int, default=TOKEN_TTL_SECONDS)
+    args = parser.parse_args()
+    print(SessionTokens(ttl=args.ttl).issue(args.subject, **{ROLES_CLAIM: args.roles})[0])
@@ -0,0 +1,43 @@
+import os
+
+JAEGER_AGENT_HOST = os.getenv("JAEGER_AGENT_HOST", "jaeger")
+JAEGER_AGENT_PORT = int(os.getenv("JAEGER_AGENT_PORT", "6831"))
+
+
+def instrument_app(app):
+    """Add OpenTelemetry request spans to ``app``.
+
+    Middleware can only be added before the app receives its first event,
+    so this runs at import; the exporter is set up later by ``setup_tracing``.
+    """
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
+    FastAPIInstrumentor.instrument_app(app)
+
+
+def setup_tracing(service_name: str):
+    """Install a Jaeger-backed tracer provider and return it.
+
+    Called from the application lifespan; call ``shutdown()`` on the returned
+    provider to flush pending spans.
+    """
+    from opentelemetry import trace
+    from opentelemetry.exporter.jaeger.thrift import JaegerExporter
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    resource = Resource(attributes={
+        "service.name": service_name,
+        "service.namespace": "finance",
+        "service.version": "1.0.0",
+    })
+    tracer_provider = TracerProvider(resource=resource)
+    trace.set_tracer_provider(tracer_provider)
+
+    jaeger_exporter = JaegerExporter(
+        agent_host_name=JAEGER_AGENT_HOST,
+        agent_port=JAEGER_AGENT_PORT,
+    )
+    tracer_provider.add_span_processor(BatchSpanProcessor(jaeger_exporter))
+    return tracer_provider
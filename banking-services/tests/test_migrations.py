@@ -0,0 +1,27 @@
+"""check-indexes against a freshly migrated SQLite database."""
+import os
+import sys
+
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import migrations, queries  # noqa: E402
+
+
+def test_hot_queries_are_served_by_an_index():
+    with create_engine("sqlite://").begin() as conn:
+        migrations.upgrade(conn)
+        results = migrations.check_indexes(conn)
+
+    assert [(name, plan) for name, uses_index, plan in results if not uses_index] == []
+
+
+def test_primary_key_range_open_above_is_a_failure():
+    with create_engine("sqlite://").begin() as conn:
+        migrations.upgrade(conn)
+        uses_index, plan = migrations._explain_uses_index(
+            conn, queries.customer_page, {"after_account_id": "", "limit": 5000})
+
+    assert "(account_id>?)" in plan
+    assert not uses_index
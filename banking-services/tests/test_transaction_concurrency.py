@@ -0,0 +1,120 @@
+"""Concurrent debits against one account through /transaction-process.
+
+transaction-service is loaded in-process against a throwaway SQLite
+database, as in benchmarks/load.py. Every debit races the others for the
+same balance; the conditional UPDATE (or, with group commit, the locked
+running balance) must let exactly as many through as the balance covers.
+Both paths also answer a posting to a missing account with a 404.
+
+    python -m pytest tests
+"""
+import asyncio
+import importlib.util
+import logging
+import os
+import sys
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from sqlalchemy import func, select
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICE_DIR = os.path.join(ROOT, "transaction-service")
+
+INITIAL_BALANCE = 100.0
+DEBIT = 10.0
+DEBITS = 40
+
+
+def load_transaction_service():
+    for path in (ROOT, SERVICE_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    name = f"transaction_service_app_{uuid.uuid4().hex}"
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SERVICE_DIR, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    logging.disable(logging.INFO)
+    return module
+
+
+async def hammer(service):
+    async with service.app.router.lifespan_context(service.app):
+        while not service.readiness.started:
+            await asyncio.sleep(0.05)
+
+        customer_id, account_id = "concurrency-1", str(uuid.uuid4())
+        async with service.SessionLocal() as db:
+            db.add(service.AccountModel(
+                account_id=account_id,
+                customer_id=customer_id,
+                account_type="checking",
+                currency="USD",
+                balance=INITIAL_BALANCE,
+                created_at=datetime.now(timezone.utc),
+                status="ACTIVE",
+            ))
+            await db.commit()
+        token = service.session_tokens.issue(customer_id, acct=account_id)[0]
+
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(
+                client.post(
+                    "/transaction-process",
+                    json={"customer_id": customer_id, "transaction_type": "debit", "amount": DEBIT},
+                    headers={"authorization": f"Bearer {token}", "accept": "application/json"},
+                )
+                for _ in range(DEBITS)
+            ))
+
+        async with service.SessionLocal() as db:
+            balance = (await db.get(service.AccountModel, account_id)).balance
+            recorded = (await db.execute(
+                select(func.count()).select_from(service.TransactionModel)
+                .where(service.TransactionModel.account_id == account_id)
+            )).scalar()
+    return [response.status_code for response in responses], balance, recorded
+
+
+async def post_to_missing_account(service):
+    async with service.app.router.lifespan_context(service.app):
+        while not service.readiness.started:
+            await asyncio.sleep(0.05)
+        token = service.session_tokens.issue("ghost", acct="no-such-account")[0]
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [
+                (await client.post(
+                    "/transaction-process",
+                    json={"customer_id": "ghost", "transaction_type": transaction_type, "amount": DEBIT},
+                    headers={"authorization": f"Bearer {token}", "accept": "application/json"},
+                )).status_code
+                for transaction_type in ("credit", "debit")
+            ]
+
+
+@pytest.fixture(params=[False, True], ids=["conditional-update", "group-commit"])
+def service(request, tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path}/test.db?timeout=60")
+    monkeypatch.setenv("OUTBOX_FILE", str(tmp_path / "outbox-events.jsonl"))
+    monkeypatch.setenv("JAEGER_AGENT_HOST", "127.0.0.1")
+    monkeypatch.setenv("GROUP_COMMIT_ENABLED", "true" if request.param else "false")
+    monkeypatch.chdir(SERVICE_DIR)
+    return load_transaction_service()
+
+
+def test_concurrent_debits_never_overdraw(service):
+    statuses, balance, recorded = asyncio.run(hammer(service))
+
+    applied = statuses.count(200)
+    assert set(statuses) <= {200, 409}
+    assert applied == int(INITIAL_BALANCE // DEBIT)
+    assert balance == pytest.approx(INITIAL_BALANCE - applied * DEBIT)
+    assert recorded == applied
+
+
+def test_posting_to_missing_account_is_not_found(service):
+    assert asyncio.run(post_to_missing_account(service)) == [404, 404]
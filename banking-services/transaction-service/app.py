@@ -1,33 +1,37 @@
-from fastapi.templating import Jinja2Templates
 from fastapi.requests import Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
-from typing import List
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
 from datetime import datetime, timezone
+import time
 import uuid
-import jwt  # Install with `pip install pyjwt`
-from prometheus_client import make_asgi_app
+from common.metrics import make_metrics_app, worker_started, worker_stopped
 from common.middleware import MetricsMiddleware
-from sqlalchemy import create_engine, Column, String, Float, DateTime
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select, update, insert, case, and_, or_
+from sqlalchemy.exc import SQLAlchemyError
+from common.database import SessionRouter, set_read_key
+from common import migrations, queries
+from common.models import AccountModel, OutboxModel, TransactionModel
 import os
+import csv
+import io
+import json
+import zlib
 from fastapi.responses import HTMLResponse
-from fastapi import Form
-from sqlalchemy import ForeignKey
-from sqlalchemy.orm import relationship
-import requests
+import httpx
 from opentelemetry import trace
-from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.jaeger.thrift import JaegerExporter
-from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.instrumentation.requests import RequestsInstrumentor
-from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
 from opentelemetry.context import attach, detach
+from contextlib import asynccontextmanager
+from common.http_client import UpstreamClient
+from common.group_commit import GroupCommitter
+from common.lifecycle import Readiness
+from common.negotiation import prefers_json, read_payload
+from common.outbox import OutboxPublisher, make_sink, outbox_row
+from common.templates import make_templates, precompile
+from common.tokens import SessionTokens, TokenError, has_role, set_token_cookie, token_from_request
+from common.tracing import instrument_app, setup_tracing
 import logging
 logging.basicConfig(level=logging.DEBUG)
 
@@ -40,94 +44,163 @@ MYSQL_PORT = 3306
 MYSQL_DB = os.getenv("MYSQL_DB", "accounts_db")
 AUTH_HOST = os.getenv("AUTH_HOST", "auth-service")
 AUTH_PORT = os.getenv("AUTH_PORT", 8082)
+BATCH_MAX_OPERATIONS = int(os.getenv("BATCH_MAX_OPERATIONS", "10000"))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "500"))
+GROUP_COMMIT_ENABLED = os.getenv("GROUP_COMMIT_ENABLED", "false").lower() == "true"
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "2"))
+GROUP_COMMIT_MAX_ITEMS = int(os.getenv("GROUP_COMMIT_MAX_ITEMS", "64"))
+# Roles of service tokens (see common.tokens): post to and export any
+# account, or only export any account's statement
+SERVICE_ROLE = "service"
+COMPLIANCE_ROLE = "compliance"
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "10000"))
+EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "1000"))
+
+DATABASE_URL = os.getenv("DATABASE_URL", f"mysql+aiomysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}")
+
+# Writes go to the primary; read-only sessions to DATABASE_REPLICA_URLS if set
+db_router = SessionRouter(DATABASE_URL)
+engine = db_router.primary
+SessionLocal = db_router.session
+# Pydantic models
+class PostingRequest(BaseModel):
+    account_id: str
+    transaction_type: Literal["credit", "debit"]
+    amount: float = Field(gt=0)
+    location: Optional[str] = None
+
+class BatchPostingRequest(BaseModel):
+    operations: List[PostingRequest] = Field(min_length=1, max_length=BATCH_MAX_OPERATIONS)
+
+# Bodies of the negotiated routes (form fields or JSON); values are checked
+# by the handlers so both formats get the same errors
+class AuthenticateRequest(BaseModel):
+    customer_id: str
 
-DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
+class TransactionRequest(BaseModel):
+    customer_id: str
+    transaction_type: str
+    amount: float
+    location: Optional[str] = None
 
-engine = create_engine(DATABASE_URL, pool_recycle=280, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+# Shared keep-alive client for auth-service (one pool per worker)
+auth_client = UpstreamClient("auth-service", f"http://{AUTH_HOST}:{AUTH_PORT}")
 
-# Database models
-class AccountModel(Base):
-    __tablename__ = "accounts"
-    account_id = Column(String, primary_key=True, index=True)
-    customer_id = Column(String, nullable=False)
-    account_type = Column(String, nullable=False)
-    currency = Column(String, nullable=False)
-    balance = Column(Float, nullable=False)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
-    status = Column(String, default="ACTIVE")
+# Verifies auth-service's session tokens locally (same JWT_KEYS ring)
+session_tokens = SessionTokens()
 
-class TransactionModel(Base):
-    __tablename__ = "transactions"
-    transaction_id = Column(String, primary_key=True, index=True)
-    account_id = Column(String, ForeignKey("accounts.account_id"), nullable=False)
-    transaction_type = Column(String, nullable=False)  # 'credit' or 'debit'
-    amount = Column(Float, nullable=False)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+readiness = Readiness(engine)
 
-    account = relationship("AccountModel", backref="transactions")
+# Transaction events for fraud-detection, committed with each posting and
+# published in the background (OUTBOX_SINK)
+outbox_publisher = OutboxPublisher(SessionLocal, make_sink(), ready=lambda: readiness.started)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+def transaction_event(transaction_id, customer_id, account_id, transaction_type, amount, created_at, location=None):
+    """Outbox row for one posting, in the fraud-detection Lambda's format."""
+    return outbox_row("transaction.posted", {
+        "transaction_id": transaction_id,
+        "user_id": customer_id,
+        "account_id": account_id,
+        "transaction_type": transaction_type,
+        "amount": amount,
+        "timestamp": created_at.isoformat(),
+        "location": location,
+    }, created_at)
+
+async def apply_migrations():
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations.upgrade)
+
+# Heavy initialization runs once per worker when it starts serving, not at
+# import; migrations retry in the background until the database is reachable
+@asynccontextmanager
+async def lifespan(app):
+    worker_started()
+    tracer_provider = setup_tracing("transaction-service")
+    readiness.start("migrations", apply_migrations)
+    await auth_client.start()
+    outbox_publisher.start()
+    precompile(templates)
+    try:
+        yield
+    finally:
+        if posting_committer is not None:
+            await posting_committer.close()
+        await outbox_publisher.stop()
+        await auth_client.close()
+        await readiness.stop()
+        await db_router.dispose()
+        tracer_provider.shutdown()
+        worker_stopped()
 
 # # FastAPI app setup
-app = FastAPI()
-templates = Jinja2Templates(directory="templates")
-# Jaeger setup
-resource = Resource(attributes={
-    "service.name": "transaction-service",
-    "service.namespace": "finance",
-    "service.version": "1.0.0",
-})
-
-# Set up tracer provider
-tracer_provider = TracerProvider(resource=resource)
-trace.set_tracer_provider(tracer_provider)
-
-# Configure Jaeger exporter
-jaeger_exporter = JaegerExporter(
-    agent_host_name="jaeger",  # Replace with your Jaeger's host name or IP
-    agent_port=6831,                # Jaeger agent port
-)
-
-# Add span processor
-span_processor = BatchSpanProcessor(jaeger_exporter)
-tracer_provider.add_span_processor(span_processor)
-
-# Instrument FastAPI and Requests
-FastAPIInstrumentor.instrument_app(app)
-RequestsInstrumentor().instrument()
-
-def make_authenticated_request(url):
-    tracer = trace.get_tracer("transaction-service")
-    propagator = TraceContextTextMapPropagator()
+app = FastAPI(lifespan=lifespan)
+templates = make_templates(os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates"))
+
+# Instrument FastAPI
+instrument_app(app)
+
+async def request_token(customer_id):
+    # Trace context is injected into the headers by the shared client
+    return await auth_client.request("POST", "/token", data={"customer_id": customer_id})
+
+def session_claims(request, customer_id):
+    """Claims of the request's session token if it is valid for ``customer_id``."""
+    try:
+        claims = session_tokens.verify(token_from_request(request))
+    except TokenError:
+        return None
+    return claims if claims["sub"] == customer_id else None
+
+def error_response(as_json, status_code, message, html_status_code=None):
+    """``message`` as ``{"detail": ...}`` or as the HTML pages show it.
+
+    The HTML pages answer some errors with 200; ``html_status_code``
+    keeps that for them while JSON clients get ``status_code``.
+    """
+    if as_json:
+        return ORJSONResponse({"detail": message}, status_code=status_code)
+    return HTMLResponse(
+        content=f"<h1>{message}</h1>",
+        status_code=status_code if html_status_code is None else html_status_code,
+    )
 
-    # Create a span for the outgoing request
-    with tracer.start_as_current_span("http_request_to_auth_service") as span:
-        carrier = {}
-        propagator.inject(carrier)  # Inject trace context into headers
+def session_response(customer_id, token, claims):
+    return ORJSONResponse({
+        "customer_id": customer_id,
+        "account_id": claims.get("acct"),
+        "access_token": token,
+        "token_type": "bearer",
+        "expires_in": max(int(claims["exp"] - time.time()), 0),
+    })
 
-        # Convert carrier to flat headers and make the HTTP call
-        response = requests.get(url, headers={key: str(value) for key, value in carrier.items()})
-        return response
+def account_summary(account):
+    return {
+        "account_id": account.account_id,
+        "customer_id": account.customer_id,
+        "account_type": account.account_type,
+        "currency": account.currency,
+        "balance": account.balance,
+        "status": account.status,
+    }
 
 
 # Add middleware for metrics
 app.add_middleware(MetricsMiddleware, app_name="transaction-service")
 
-metrics_app = make_asgi_app()
+metrics_app = make_metrics_app()
 app.mount("/metrics", metrics_app)
 
 
 
 # Dependency for DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
+
+async def get_read_db():
+    async with SessionLocal(read_only=True) as db:
         yield db
-    finally:
-        db.close()
 
 # HTML templates
 '''
@@ -236,48 +309,382 @@ async def get_customer_form(request: Request):
     return templates.TemplateResponse("customer_form.html", {"request": request})
 
 @app.post("/transaction", response_class=HTMLResponse)
-async def authenticate_customer(request: Request, customer_id: str = Form(...), db=Depends(get_db)):
-    # Call auth-service for verification
-    auth_url = f"http://{AUTH_HOST}:{AUTH_PORT}/authenticate/{customer_id}"
-    response = make_authenticated_request(auth_url)
-    #response = requests.get(auth_url)
-
-    if response.status_code == 200:
-        # Check if the customer exists in the database
-        account = db.query(AccountModel).filter(AccountModel.customer_id == customer_id).first()
-        if not account:
-            return HTMLResponse(content=f"<h1>Customer ID {customer_id} does not exist in the database.</h1>")
+async def authenticate_customer(request: Request):
+    """Start a transaction session for ``customer_id``.
+
+    Answers with the transaction form (and a session cookie) or, for JSON
+    clients, with the session token itself.
+    """
+    as_json = prefers_json(request)
+    customer_id = (await read_payload(request, AuthenticateRequest)).customer_id
+
+    # A valid session token for this customer is proof enough
+    claims = session_claims(request, customer_id)
+    if claims is not None:
+        if as_json:
+            return session_response(customer_id, token_from_request(request), claims)
         return templates.TemplateResponse("transaction_form.html", {"request": request, "customer_id": customer_id})
-    else:
-        return HTMLResponse(content=f"<h1>Authentication failed for Customer ID: {customer_id}</h1>")
+
+    # Otherwise ask auth-service for one; it only issues tokens for
+    # customers that have an account
+    try:
+        response = await request_token(customer_id)
+    except httpx.HTTPError:
+        return error_response(as_json, 503, "Authentication service unavailable, please try again.")
+    if response.status_code == 404:
+        return error_response(as_json, 404, f"Customer ID {customer_id} does not exist in the database.", 200)
+    if response.status_code != 200:
+        return error_response(as_json, 502, f"Authentication failed for Customer ID: {customer_id}", 200)
+
+    issued = response.json()
+    try:
+        claims = session_tokens.verify(issued["access_token"])
+    except TokenError:
+        logging.exception("auth-service issued a token this service cannot verify; check JWT_KEYS")
+        return error_response(as_json, 502, f"Authentication failed for Customer ID: {customer_id}", 200)
+    if as_json:
+        return session_response(customer_id, issued["access_token"], claims)
+    page = templates.TemplateResponse("transaction_form.html", {"request": request, "customer_id": customer_id})
+    set_token_cookie(page, issued["access_token"], issued["expires_in"])
+    return page
 
 @app.post("/transaction-process", response_class=HTMLResponse)
-async def process_transaction(request: Request, customer_id: str = Form(...), transaction_type: str = Form(...), amount: float = Form(...), db=Depends(get_db)):
-    # Fetch account details
-    account = db.query(AccountModel).filter(AccountModel.customer_id == customer_id).first()
-    if not account:
-        return HTMLResponse(content=f"<h1>Customer ID {customer_id} does not exist in the database.</h1>")
-
-    # Perform transaction
-    if transaction_type == "debit":
-        if account.balance < amount:
-            return HTMLResponse(content=f"<h1>Insufficient funds for debit transaction.</h1>")
-        account.balance -= amount
-    elif transaction_type == "credit":
-        account.balance += amount
-
-    # Update transaction table
-    transaction = TransactionModel(
-        transaction_id=str(uuid.uuid4()),
-        account_id=account.account_id,
-        transaction_type=transaction_type,
-        amount=amount
+async def process_transaction(request: Request, db=Depends(get_db)):
+    """Post a credit or debit to the session's account.
+
+    Answers with the updated account page, or for JSON clients with the
+    transaction ID and the account summary.
+    """
+    as_json = prefers_json(request)
+    posted = await read_payload(request, TransactionRequest)
+    customer_id, transaction_type, amount, location = (
+        posted.customer_id, posted.transaction_type, posted.amount, posted.location
     )
-    db.add(transaction)
-    db.commit()
+    if transaction_type not in ("credit", "debit"):
+        return error_response(as_json, 400, f"Unsupported transaction type: {transaction_type}")
+    if amount <= 0:
+        return error_response(as_json, 400, "Amount must be positive.")
+
+    # The session token proves authentication and names the account
+    claims = session_claims(request, customer_id)
+    if claims is None:
+        return error_response(as_json, 401, "Please authenticate before making a transaction.")
+
+    # Reads after the commit below stay on the primary for this customer
+    set_read_key(db, customer_id)
+    account_id = claims.get("acct") or await queries.find_account_id(db, customer_id)
+    if account_id is None:
+        return error_response(as_json, 404, f"Customer ID {customer_id} does not exist in the database.", 200)
+
+    if posting_committer is not None:
+        # Coalesced with concurrent postings into one DB transaction
+        posting = PostingRequest(account_id=account_id, transaction_type=transaction_type, amount=amount, location=location)
+        try:
+            status, transaction_id = await posting_committer.submit(posting)
+        except SQLAlchemyError:
+            return error_response(as_json, 503, "Transaction could not be recorded, please try again.")
+        if status == "unknown_account":
+            return error_response(as_json, 404, f"Account {account_id} not found.", 200)
+        if status != "ok":
+            return error_response(as_json, 409, "Insufficient funds for debit transaction.", 200)
+        db_router.mark_written(customer_id)
+    else:
+        # Apply the posting in one conditional UPDATE so concurrent debits
+        # cannot overdraw the account or overwrite each other's balance
+        if not await queries.apply_balance_change(db, account_id, transaction_type, amount):
+            await db.rollback()
+            # No row matched: a missing account or a short balance
+            if await queries.get_account(db, account_id) is None:
+                return error_response(as_json, 404, f"Account {account_id} not found.", 200)
+            return error_response(as_json, 409, "Insufficient funds for debit transaction.", 200)
 
+        # Record the transaction and its event in the same DB transaction
+        transaction = TransactionModel(
+            transaction_id=str(uuid.uuid4()),
+            account_id=account_id,
+            transaction_type=transaction_type,
+            amount=amount,
+            created_at=datetime.now(timezone.utc),
+        )
+        db.add(transaction)
+        db.add(OutboxModel(**transaction_event(
+            transaction.transaction_id, customer_id, account_id, transaction_type, amount,
+            transaction.created_at, location,
+        )))
+        await db.commit()
+        outbox_publisher.notify()
+        transaction_id = transaction.transaction_id
+
+    # Read the committed state back for display (row locks already released)
+    account = await db.get(AccountModel, account_id)
+    if as_json:
+        return ORJSONResponse({"transaction_id": transaction_id, "account": account_summary(account)})
+    return templates.TemplateResponse("account_details.html", {"request": request, "account": account})
+
+@app.get("/account-summary", response_class=HTMLResponse)
+async def get_account_summary(request: Request, db=Depends(get_read_db)):
+    """The session's account, as the account page or as JSON."""
+    as_json = prefers_json(request)
+    try:
+        claims = session_tokens.verify(token_from_request(request))
+    except TokenError:
+        return error_response(as_json, 401, "Please authenticate to view your account.")
+
+    customer_id = claims["sub"]
+    set_read_key(db, customer_id)
+    account_id = claims.get("acct") or await queries.find_account_id(db, customer_id)
+    account = await queries.get_account(db, account_id) if account_id is not None else None
+    if account is None:
+        return error_response(as_json, 404, f"Customer ID {customer_id} does not exist in the database.")
+    if as_json:
+        return ORJSONResponse(account_summary(account))
     return templates.TemplateResponse("account_details.html", {"request": request, "account": account})
 
+async def apply_postings(db, postings):
+    """Apply a group of postings inside the caller's DB transaction.
+
+    The touched accounts are locked once, every posting is checked against
+    the running balance in order, and the accepted ones are written with one
+    grouped balance UPDATE plus bulk INSERTs of the transactions and their
+    outbox events. Returns one ``(status, transaction_id)`` pair per
+    posting; the caller commits.
+    """
+    account_ids = sorted({posting.account_id for posting in postings})
+    # Lock rows in a fixed order so overlapping batches cannot deadlock
+    result = await db.execute(
+        select(AccountModel.account_id, AccountModel.balance, AccountModel.customer_id)
+        .where(AccountModel.account_id.in_(account_ids))
+        .order_by(AccountModel.account_id)
+        .with_for_update()
+    )
+    balances = {}
+    customers = {}
+    for account_id, balance, customer_id in result.all():
+        balances[account_id] = balance
+        customers[account_id] = customer_id
+
+    created_at = datetime.now(timezone.utc)
+    deltas = {}
+    rows = []
+    events = []
+    results = []
+    for posting in postings:
+        balance = balances.get(posting.account_id)
+        if balance is None:
+            results.append(("unknown_account", None))
+            continue
+        if posting.transaction_type == "debit":
+            if balance < posting.amount:
+                results.append(("insufficient_funds", None))
+                continue
+            delta = -posting.amount
+        else:
+            delta = posting.amount
+        balances[posting.account_id] = balance + delta
+        deltas[posting.account_id] = deltas.get(posting.account_id, 0.0) + delta
+
+        transaction_id = str(uuid.uuid4())
+        rows.append({
+            "transaction_id": transaction_id,
+            "account_id": posting.account_id,
+            "transaction_type": posting.transaction_type,
+            "amount": posting.amount,
+            "created_at": created_at,
+        })
+        events.append(transaction_event(
+            transaction_id, customers[posting.account_id], posting.account_id, posting.transaction_type,
+            posting.amount, created_at, posting.location,
+        ))
+        results.append(("ok", transaction_id))
+
+    if deltas:
+        await db.execute(
+            update(AccountModel)
+            .where(AccountModel.account_id.in_(list(deltas)))
+            .values(balance=AccountModel.balance + case(deltas, value=AccountModel.account_id))
+            .execution_options(synchronize_session=False)
+        )
+    if rows:
+        await db.execute(insert(TransactionModel), rows)
+        await db.execute(insert(OutboxModel), events)
+    return results
+
+# Optional group commit for /transaction-process: postings arriving within
+# GROUP_COMMIT_WINDOW_MS of each other share one DB transaction
+async def flush_postings(postings):
+    async with SessionLocal() as db:
+        results = await apply_postings(db, postings)
+        await db.commit()
+    outbox_publisher.notify()
+    return results
+
+posting_committer = None
+if GROUP_COMMIT_ENABLED:
+    posting_committer = GroupCommitter(
+        "transaction-process",
+        flush_postings,
+        window=GROUP_COMMIT_WINDOW_MS / 1000,
+        max_items=GROUP_COMMIT_MAX_ITEMS,
+    )
+
+def require_claims(request):
+    """Claims of the request's token; 401 if it has no valid one."""
+    try:
+        return session_tokens.verify(token_from_request(request))
+    except TokenError:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+
+@app.post("/transactions/batch")
+async def process_transaction_batch(request: Request, batch: BatchPostingRequest, db=Depends(get_db)):
+    """Apply many postings, committing every BATCH_CHUNK_SIZE operations.
+
+    Needs a session token; customers may only post to their own accounts,
+    service tokens with the ``service`` role to any. Results are returned
+    in request order. A chunk that fails in the database is rolled back and
+    its items are reported as ``error`` so the caller can resubmit just
+    those.
+    """
+    claims = require_claims(request)
+    operations = batch.operations
+    if not has_role(claims, SERVICE_ROLE):
+        account_ids = {operation.account_id for operation in operations} - {claims.get("acct")}
+        if account_ids and account_ids - await queries.owned_account_ids(db, claims["sub"], account_ids):
+            raise HTTPException(status_code=403, detail="Operations target accounts of another customer")
+
+    results = []
+    for start in range(0, len(operations), BATCH_CHUNK_SIZE):
+        chunk = operations[start:start + BATCH_CHUNK_SIZE]
+        try:
+            results.extend(await apply_postings(db, chunk))
+            await db.commit()
+            outbox_publisher.notify()
+        except SQLAlchemyError:
+            logging.exception("Batch chunk starting at %d failed", start)
+            await db.rollback()
+            results.extend([("error", None)] * len(chunk))
+
+    applied = sum(1 for status, _ in results if status == "ok")
+    return JSONResponse({
+        "applied": applied,
+        "rejected": len(results) - applied,
+        "results": [
+            {"status": status, "transaction_id": transaction_id} if transaction_id else {"status": status}
+            for status, transaction_id in results
+        ],
+    })
+
+EXPORT_COLUMNS = ("transaction_id", "account_id", "transaction_type", "amount", "created_at")
+EXPORT_EPOCH = datetime(1970, 1, 1)
+
+async def iter_transaction_batches(account_id, start, end):
+    """Yield lists of rows for one account and ``start <= created_at < end``.
+
+    Rows are read in keyset chunks of EXPORT_CHUNK_ROWS ordered by
+    (created_at, transaction_id), each in its own short transaction, and
+    each chunk is streamed from a server-side cursor EXPORT_YIELD_PER rows
+    at a time. A multi-million row export therefore never holds a
+    transaction open for its whole duration nor buffers more than one
+    partition.
+    """
+    columns = [getattr(TransactionModel, name) for name in EXPORT_COLUMNS]
+    created_at, transaction_id = TransactionModel.created_at, TransactionModel.transaction_id
+    last = None
+    while True:
+        query = select(*columns).where(
+            TransactionModel.account_id == account_id,
+            created_at >= start,
+            created_at < end,
+        )
+        if last is not None:
+            # Resume after the last row of the previous chunk
+            query = query.where(
+                created_at >= last[0],
+                or_(created_at > last[0], and_(created_at == last[0], transaction_id > last[1])),
+            )
+        query = query.order_by(created_at, transaction_id).limit(EXPORT_CHUNK_ROWS)
+
+        fetched = 0
+        async with SessionLocal(read_only=True) as db:
+            result = await db.stream(query.execution_options(yield_per=EXPORT_YIELD_PER))
+            async for partition in result.partitions():
+                fetched += len(partition)
+                last = (partition[-1].created_at, partition[-1].transaction_id)
+                yield partition
+        if fetched < EXPORT_CHUNK_ROWS:
+            return
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+async def export_ndjson(batches):
+    async for rows in batches:
+        yield "".join(
+            json.dumps({name: _export_value(value) for name, value in zip(EXPORT_COLUMNS, row)}) + "\n"
+            for row in rows
+        ).encode()
+
+async def export_csv_gzip(batches):
+    # One gzip stream, compressed incrementally; each partition is flushed
+    # to the client as soon as it has been encoded
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in batches:
+        writer.writerows([_export_value(value) for value in row] for row in rows)
+        chunk = compressor.compress(buffer.getvalue().encode())
+        buffer.seek(0)
+        buffer.truncate()
+        if chunk:
+            yield chunk
+    yield compressor.compress(buffer.getvalue().encode()) + compressor.flush()
+
+@app.get("/accounts/{account_id}/transactions/export")
+async def export_transactions(
+    request: Request,
+    account_id: str,
+    start: datetime = None,
+    end: datetime = None,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    db=Depends(get_read_db),
+):
+    """Stream an account statement for ``start <= created_at < end``.
+
+    Needs the session token of the account's customer, or a service token
+    with the ``compliance`` or ``service`` role. ``format=ndjson`` streams
+    one JSON object per line; ``format=csv`` streams a gzip-compressed CSV
+    file. Both bounds are optional.
+    """
+    claims = require_claims(request)
+    privileged = has_role(claims, COMPLIANCE_ROLE) or has_role(claims, SERVICE_ROLE)
+    account = await db.get(AccountModel, account_id)
+    # Customers cannot tell other customers' accounts from missing ones
+    if account is None or not (privileged or account.customer_id == claims["sub"]):
+        raise HTTPException(status_code=404, detail="Account not found")
+    # Release the request's connection before streaming
+    await db.close()
+
+    start = start or EXPORT_EPOCH
+    end = end or datetime.now(timezone.utc)
+    if start.tzinfo is not None:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    if end.tzinfo is not None:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+
+    batches = iter_transaction_batches(account_id, start, end)
+    if format == "csv":
+        return StreamingResponse(
+            export_csv_gzip(batches),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{account_id}-transactions.csv.gz"'},
+        )
+    return StreamingResponse(export_ndjson(batches), media_type="application/x-ndjson")
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "account"}
+
+@app.get("/ready")
+async def readiness_check():
+    ready, detail = await readiness.check()
+    return JSONResponse({**detail, "service": "transaction"}, status_code=200 if ready else 503)
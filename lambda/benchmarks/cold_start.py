@@ -0,0 +1,149 @@
+"""Cold-start and warm-invocation cost of the Lambdas with the real boto3.
+
+Each run is a fresh Python process, like a new execution environment: it
+times importing the function's app.py (including whatever boto3 work it
+does at import), its first invocation (including clients created lazily)
+and the mean of the following warm invocations. boto3 is real; only the
+HTTP round trips are replaced with canned responses, by patching
+BaseClient._make_api_call as soon as botocore.client is imported, so
+client creation, credential and endpoint resolution are all measured.
+
+Compare two trees with --lambda-dir, e.g. the previous commit:
+
+    git archive HEAD~1 lambda | tar -x -C /tmp/before
+    python lambda/benchmarks/cold_start.py --lambda-dir /tmp/before/lambda
+    python lambda/benchmarks/cold_start.py
+"""
+import argparse
+import importlib.abc
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+LAMBDA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENV = {
+    "AWS_DEFAULT_REGION": "eu-west-2",
+    "AWS_ACCESS_KEY_ID": "benchmark",
+    "AWS_SECRET_ACCESS_KEY": "benchmark",
+    "AWS_EC2_METADATA_DISABLED": "true",
+    "DYNAMODB_TABLE": "fraud-alerts",
+    "FRAUD_AGGREGATES_TABLE": "fraud-aggregates",
+    "SNS_TOPIC_ARN": "arn:aws:sns:eu-west-2:123456789012:alerts",
+    "APPROVED_PORTS": "80,443,22",
+    "VPC_ID": "vpc-0benchmark",
+    "ENVIRONMENT": "benchmark",
+}
+
+EVENTS = {
+    "fraud-detection": {"body": json.dumps({
+        "transaction_id": "txn-1", "user_id": "user-1", "amount": 125.5,
+        "timestamp": "2025-01-01T12:00:00+00:00", "location": "London",
+    })},
+    "config-rule-changes": {"detail": {"configurationItem": {
+        "resourceId": "sg-0benchmark", "changes": {},
+        "configurationItemCaptureTime": "2025-01-01T12:00:00Z",
+    }}},
+    "macie-findings": {"detail": {
+        "id": "finding-1", "region": "eu-west-2", "accountId": "123456789012",
+        "severity": {"description": "HIGH"}, "description": "Unencrypted sensitive data detected",
+        "resourcesAffected": {"s3Bucket": {"name": "bucket-1"}, "s3Object": {"key": "exports/1.csv"}},
+    }},
+}
+
+RESPONSES = {
+    "DescribeSecurityGroups": {"SecurityGroups": [{
+        "GroupId": "sg-0benchmark", "VpcId": "vpc-0benchmark",
+        "IpPermissions": [{"IpProtocol": "tcp", "FromPort": 3389, "ToPort": 3389, "IpRanges": [{"CidrIp": "0.0.0.0/0"}]}],
+    }]},
+    "Query": {"Items": [], "Count": 0},
+    "UpdateItem": {},
+    "BatchWriteItem": {"UnprocessedItems": {}},
+    "Publish": {"MessageId": "1"},
+    "PublishBatch": {"Successful": [], "Failed": []},
+    "BatchImportFindings": {"FailedCount": 0, "SuccessCount": 1, "FailedFindings": []},
+}
+
+
+def canned_api_call(self, operation_name, api_params):
+    return RESPONSES.get(operation_name, {})
+
+
+class StubBotocoreClient(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Patches botocore.client right after it is first imported."""
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname != "botocore.client":
+            return None
+        sys.meta_path.remove(self)
+        self.spec = importlib.util.find_spec(fullname)
+        self.original_loader = self.spec.loader
+        self.spec.loader = self
+        return self.spec
+
+    def create_module(self, spec):
+        return self.original_loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.original_loader.exec_module(module)
+        module.BaseClient._make_api_call = canned_api_call
+
+
+def child(args):
+    os.environ.update(ENV)
+    sys.meta_path.insert(0, StubBotocoreClient())
+    function_dir = os.path.join(args.lambda_dir, args.child)
+    sys.path[:0] = [function_dir, os.path.join(args.lambda_dir, "common")]
+    event = EVENTS[args.child]
+
+    def invoke():
+        try:
+            handler(event, None)
+        except Exception:
+            # Errors are part of what the handler does today; time them too
+            pass
+
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    start = time.perf_counter()
+    spec = importlib.util.spec_from_file_location("app", os.path.join(function_dir, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    handler = module.lambda_handler
+    imported = time.perf_counter()
+    invoke()
+    first = time.perf_counter()
+    for _ in range(args.warm):
+        invoke()
+    warm = (time.perf_counter() - first) / args.warm
+    sys.stdout = stdout
+    print(json.dumps({"import": imported - start, "first": first - imported, "warm": warm}))
+
+
+def main(args):
+    print(f"{'function':<22} {'import ms':>10} {'first call ms':>14} {'cold total ms':>14} {'warm ms':>9}")
+    for function in sorted(EVENTS):
+        runs = []
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", function, "--lambda-dir", args.lambda_dir, "--warm", str(args.warm)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        imported = statistics.median(run["import"] for run in runs)
+        first = statistics.median(run["first"] for run in runs)
+        cold = statistics.median(run["import"] + run["first"] for run in runs)
+        warm = statistics.median(run["warm"] for run in runs)
+        print(f"{function:<22} {imported * 1e3:>10.1f} {first * 1e3:>14.1f} {cold * 1e3:>14.1f} {warm * 1e3:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lambda-dir", default=LAMBDA_DIR)
+    parser.add_argument("--runs", type=int, default=7, help="fresh processes per function")
+    parser.add_argument("--warm", type=int, default=200, help="warm invocations per process")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    main(parser.parse_args()) if not parser.parse_args().child else child(parser.parse_args())
@@ -0,0 +1,315 @@
+"""In-process stand-ins for the AWS APIs the Lambdas call.
+
+install() puts a fake ``boto3`` module into sys.modules so the handlers
+import and run unchanged, without network or credentials. Every API call is
+counted in ``calls`` by (service, operation) and can be given a simulated
+round-trip time. Only the operations and expression forms the Lambdas use
+are supported; anything else raises NotImplementedError so a new call shows
+up here instead of passing silently. Like boto3, the fakes take keyword
+arguments only and reject floats in DynamoDB items.
+"""
+import copy
+import re
+import sys
+import time
+import types
+from collections import Counter
+from decimal import Decimal
+
+calls = Counter()
+# Simulated round trip per API call, in seconds
+api_latency = 0.0
+
+
+class ClientError(Exception):
+    def __init__(self, code, operation):
+        super().__init__(f"An error occurred ({code}) when calling the {operation} operation")
+        self.response = {"Error": {"Code": code}}
+
+
+def api_call(service, operation):
+    calls[(service, operation)] += 1
+    if api_latency:
+        time.sleep(api_latency)
+
+
+def _check_attribute(value):
+    if isinstance(value, float):
+        raise TypeError("Float types are not supported. Use Decimal types instead.")
+    if isinstance(value, dict):
+        for item in value.values():
+            _check_attribute(item)
+    elif isinstance(value, (list, set, tuple)):
+        for item in value:
+            _check_attribute(item)
+
+
+def _to_number(value):
+    return value if isinstance(value, Decimal) else Decimal(value)
+
+
+class Table:
+    _KEY_CONDITION = re.compile(
+        r"^\s*(\S+)\s*=\s*(:\w+)(?:\s+AND\s+(\S+)\s*(=|<=|<|>=|>)\s*(:\w+))?\s*$", re.IGNORECASE
+    )
+
+    def __init__(self, name, hash_key, range_key=None):
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.items = {}
+
+    def _key(self, item):
+        return (item[self.hash_key], item[self.range_key] if self.range_key else None)
+
+    def put_item(self, *, Item, **kwargs):
+        api_call("dynamodb", "PutItem")
+        self._put(Item)
+        return {}
+
+    def _put(self, item):
+        _check_attribute(item)
+        self.items[self._key(item)] = copy.deepcopy(item)
+
+    def get_item(self, *, Key, **kwargs):
+        api_call("dynamodb", "GetItem")
+        item = self.items.get(self._key(Key))
+        return {"Item": copy.deepcopy(item)} if item is not None else {}
+
+    def update_item(self, *, Key, UpdateExpression, ExpressionAttributeValues=None,
+                    ExpressionAttributeNames=None, ReturnValues="NONE", **kwargs):
+        api_call("dynamodb", "UpdateItem")
+        values = ExpressionAttributeValues or {}
+        names = ExpressionAttributeNames or {}
+        _check_attribute(values)
+        key = self._key(Key)
+        old = self.items.get(key)
+        item = copy.deepcopy(old) if old is not None else dict(Key)
+        updated = set()
+        for clause, body in re.findall(r"\b(ADD|SET)\s+(.*?)(?=\s+\b(?:ADD|SET|REMOVE)\b|$)", UpdateExpression):
+            for action in (part.strip() for part in re.split(r",(?![^(]*\))", body)):
+                if clause == "ADD":
+                    name, placeholder = action.split()
+                    name = names.get(name, name)
+                    item[name] = _to_number(item.get(name, 0)) + _to_number(values[placeholder])
+                else:
+                    name, expression = (side.strip() for side in action.split("=", 1))
+                    name = names.get(name, name)
+                    default = re.match(r"if_not_exists\(\s*(\S+)\s*,\s*(:\w+)\s*\)", expression)
+                    if default:
+                        existing = names.get(default.group(1), default.group(1))
+                        item[name] = item[existing] if existing in item else values[default.group(2)]
+                    elif expression in values:
+                        item[name] = values[expression]
+                    else:
+                        raise NotImplementedError(f"SET {action}")
+                updated.add(name)
+        self.items[key] = item
+        if ReturnValues == "ALL_OLD":
+            return {"Attributes": copy.deepcopy(old)} if old is not None else {}
+        if ReturnValues == "UPDATED_OLD":
+            attributes = {name: old[name] for name in updated if old and name in old}
+            return {"Attributes": attributes} if attributes else {}
+        if ReturnValues in ("ALL_NEW", "UPDATED_NEW"):
+            return {"Attributes": copy.deepcopy(item)}
+        return {}
+
+    def query(self, *, KeyConditionExpression, ExpressionAttributeValues, ExpressionAttributeNames=None,
+              ProjectionExpression=None, ScanIndexForward=True, **kwargs):
+        api_call("dynamodb", "Query")
+        names = ExpressionAttributeNames or {}
+        match = self._KEY_CONDITION.match(KeyConditionExpression)
+        if not match:
+            raise NotImplementedError(KeyConditionExpression)
+        hash_name, hash_value, range_name, operator, range_value = match.groups()
+        if names.get(hash_name, hash_name) != self.hash_key:
+            raise NotImplementedError("query on a non-key attribute")
+        hash_value = ExpressionAttributeValues[hash_value]
+        items = [item for (hash_key, _), item in self.items.items() if hash_key == hash_value]
+        if range_name:
+            bound = ExpressionAttributeValues[range_value]
+            compare = {
+                "=": lambda value: value == bound,
+                "<": lambda value: value < bound,
+                "<=": lambda value: value <= bound,
+                ">": lambda value: value > bound,
+                ">=": lambda value: value >= bound,
+            }[operator]
+            items = [item for item in items if compare(item[self.range_key])]
+        if self.range_key:
+            items.sort(key=lambda item: item[self.range_key], reverse=not ScanIndexForward)
+        if ProjectionExpression:
+            fields = [names.get(field.strip(), field.strip()) for field in ProjectionExpression.split(",")]
+            items = [{field: item[field] for field in fields if field in item} for item in items]
+        return {"Items": copy.deepcopy(items), "Count": len(items)}
+
+    def scan(self, **kwargs):
+        api_call("dynamodb", "Scan")
+        return {"Items": copy.deepcopy(list(self.items.values()))}
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return BatchWriter(self)
+
+
+class BatchWriter:
+    """Buffers puts and flushes them 25 at a time, one BatchWriteItem each."""
+
+    def __init__(self, table):
+        self.table = table
+        self.buffer = []
+
+    def put_item(self, *, Item):
+        _check_attribute(Item)
+        self.buffer.append(Item)
+        if len(self.buffer) == 25:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            api_call("dynamodb", "BatchWriteItem")
+            for item in self.buffer:
+                self.table._put(item)
+            self.buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+
+class DynamoDB:
+    def __init__(self):
+        self.tables = {}
+
+    def define_table(self, name, hash_key, range_key=None):
+        self.tables[name] = Table(name, hash_key, range_key)
+        return self.tables[name]
+
+    def Table(self, name):
+        if name not in self.tables:
+            raise NotImplementedError(f"table {name!r} was not defined")
+        return self.tables[name]
+
+
+class SNS:
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, *, TopicArn, Message, Subject=None, **kwargs):
+        api_call("sns", "Publish")
+        self.messages.append((TopicArn, Subject, Message))
+        return {"MessageId": str(len(self.messages))}
+
+    def publish_batch(self, *, TopicArn, PublishBatchRequestEntries):
+        api_call("sns", "PublishBatch")
+        if len(PublishBatchRequestEntries) > 10:
+            raise ClientError("TooManyEntriesInBatchRequest", "PublishBatch")
+        for entry in PublishBatchRequestEntries:
+            self.messages.append((TopicArn, entry.get("Subject"), entry["Message"]))
+        return {"Successful": [{"Id": entry["Id"]} for entry in PublishBatchRequestEntries], "Failed": []}
+
+
+class EC2:
+    def __init__(self):
+        self.security_groups = {}
+
+    def add_security_group(self, group_id, vpc_id, ip_permissions):
+        self.security_groups[group_id] = {
+            "GroupId": group_id,
+            "VpcId": vpc_id,
+            "IpPermissions": copy.deepcopy(ip_permissions),
+        }
+
+    def describe_security_groups(self, *, GroupIds=None, Filters=None, **kwargs):
+        api_call("ec2", "DescribeSecurityGroups")
+        groups = list(self.security_groups.values())
+        if GroupIds is not None:
+            missing = set(GroupIds) - self.security_groups.keys()
+            if missing:
+                raise ClientError("InvalidGroup.NotFound", "DescribeSecurityGroups")
+            groups = [self.security_groups[group_id] for group_id in GroupIds]
+        for group_filter in Filters or ():
+            if group_filter["Name"] == "group-id":
+                groups = [group for group in groups if group["GroupId"] in group_filter["Values"]]
+            elif group_filter["Name"] == "vpc-id":
+                groups = [group for group in groups if group["VpcId"] in group_filter["Values"]]
+            else:
+                raise NotImplementedError(f"filter {group_filter['Name']}")
+        return {"SecurityGroups": copy.deepcopy(groups)}
+
+    def revoke_security_group_ingress(self, *, GroupId, IpPermissions, **kwargs):
+        api_call("ec2", "RevokeSecurityGroupIngress")
+        group = self.security_groups[GroupId]
+        group["IpPermissions"] = [rule for rule in group["IpPermissions"] if rule not in IpPermissions]
+        return {"Return": True}
+
+
+class S3:
+    def __init__(self):
+        self.encryption = {}
+
+    def put_bucket_encryption(self, *, Bucket, ServerSideEncryptionConfiguration, **kwargs):
+        api_call("s3", "PutBucketEncryption")
+        self.encryption[Bucket] = copy.deepcopy(ServerSideEncryptionConfiguration)
+        return {}
+
+    def get_bucket_encryption(self, *, Bucket, **kwargs):
+        api_call("s3", "GetBucketEncryption")
+        if Bucket not in self.encryption:
+            raise ClientError("ServerSideEncryptionConfigurationNotFoundError", "GetBucketEncryption")
+        return {"ServerSideEncryptionConfiguration": copy.deepcopy(self.encryption[Bucket])}
+
+
+class SecurityHub:
+    def __init__(self):
+        self.findings = []
+
+    def batch_import_findings(self, *, Findings):
+        api_call("securityhub", "BatchImportFindings")
+        if len(Findings) > 100:
+            raise ClientError("InvalidInputException", "BatchImportFindings")
+        self.findings.extend(Findings)
+        return {"FailedCount": 0, "SuccessCount": len(Findings), "FailedFindings": []}
+
+
+class FakeAWS:
+    """One account's worth of fake services, shared by every client."""
+
+    def __init__(self):
+        self.dynamodb = DynamoDB()
+        self.services = {"sns": SNS(), "ec2": EC2(), "s3": S3(), "securityhub": SecurityHub()}
+
+    def client(self, service_name, *args, **kwargs):
+        if service_name not in self.services:
+            raise NotImplementedError(f"no fake for {service_name!r}")
+        return self.services[service_name]
+
+    def resource(self, service_name, *args, **kwargs):
+        if service_name != "dynamodb":
+            raise NotImplementedError(f"no fake resource for {service_name!r}")
+        return self.dynamodb
+
+
+class Config:
+    """botocore.config.Config; the options are kept but have no effect."""
+
+    def __init__(self, **options):
+        self.options = options
+
+
+def install():
+    """Replace ``boto3`` (and ``botocore.config``) with a fresh set of fakes;
+    returns them."""
+    aws = FakeAWS()
+    module = types.ModuleType("boto3")
+    module.client = aws.client
+    module.resource = aws.resource
+    sys.modules["boto3"] = module
+    botocore = types.ModuleType("botocore")
+    botocore.config = types.ModuleType("botocore.config")
+    botocore.config.Config = Config
+    sys.modules["botocore"] = botocore
+    sys.modules["botocore.config"] = botocore.config
+    calls.clear()
+    return aws
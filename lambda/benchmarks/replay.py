@@ -0,0 +1,283 @@
+"""Replay event streams through the Lambda handlers against in-process fakes.
+
+Each function is imported with fake_aws installed in place of boto3, so no
+AWS account or network is involved. Events are synthetic (seeded) or read
+from a JSON Lines file of recorded events. For each function it reports:
+
+- cold start: module import and first invocation, median over fresh imports
+- warm invocations: events per second and p50/p99 handler latency
+- AWS API calls per event, by operation
+- handler errors (the first one is printed)
+
+With --batch-size, functions with a queue in front of them get their events
+as SQS batches; each record still counts as one event.
+
+    python lambda/benchmarks/replay.py all --events 5000
+    python lambda/benchmarks/replay.py fraud-detection --batch-size 100 --api-latency-ms 5
+    python lambda/benchmarks/replay.py macie-findings --events-file recorded.jsonl
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+# Shared modules sit next to app.py in the deployed zips
+sys.path.insert(0, os.path.join(LAMBDA_DIR, "common"))
+
+import fake_aws  # noqa: E402
+
+SNS_TOPIC_ARN = "arn:aws:sns:eu-west-2:123456789012:alerts"
+VPC_ID = "vpc-0replay"
+
+
+def fraud_setup(aws):
+    aws.dynamodb.define_table("fraud-alerts", "user_id", "transaction_id")
+    aws.dynamodb.define_table("fraud-aggregates", "user_id", "bucket")
+
+
+def fraud_events(aws, count, rng, args):
+    users = [f"user-{index}" for index in range(args.users)]
+    locations = ["London", "London", "London", "Manchester", "Paris"]
+    start = datetime.now(timezone.utc)
+
+    def transaction(index):
+        return {
+            "transaction_id": f"txn-{index}",
+            "user_id": rng.choice(users),
+            # Mostly small amounts with the occasional large one
+            "amount": round(rng.choice([rng.uniform(5, 300)] * 19 + [rng.uniform(5000, 25000)]), 2),
+            "timestamp": (start + timedelta(seconds=index)).isoformat(),
+            "location": rng.choice(locations),
+        }
+
+    for index in range(count):
+        yield {"body": json.dumps(transaction(index))}, 1
+
+
+def sqs_batches(events, batch_size, body):
+    """Group single events into SQS batch events; ``body`` gives a record's body."""
+    records = []
+    for event, _ in events:
+        records.append({"messageId": f"msg-{len(records)}", "body": body(event)})
+        if len(records) == batch_size:
+            yield {"Records": records}, len(records)
+            records = []
+    if records:
+        yield {"Records": records}, len(records)
+
+
+def config_setup(aws):
+    for index in range(50):
+        aws.services["ec2"].add_security_group(f"sg-{index:04d}", VPC_ID, [
+            {"IpProtocol": "tcp", "FromPort": 443, "ToPort": 443, "IpRanges": [{"CidrIp": "10.0.0.0/16"}]},
+        ])
+
+
+def config_events(aws, count, rng, args):
+    ec2 = aws.services["ec2"]
+    groups = sorted(ec2.security_groups)
+    for index in range(count):
+        group_id = rng.choice(groups)
+        # The change the event reports: an open or unapproved port, or nothing suspicious
+        rule = rng.choice([
+            {"IpProtocol": "tcp", "FromPort": 3389, "ToPort": 3389, "IpRanges": [{"CidrIp": "0.0.0.0/0"}]},
+            {"IpProtocol": "tcp", "FromPort": 8080, "ToPort": 8080, "IpRanges": [{"CidrIp": "10.0.0.0/16"}]},
+            {"IpProtocol": "tcp", "FromPort": 80, "ToPort": 80, "IpRanges": [{"CidrIp": "10.0.0.0/16"}]},
+        ])
+        if rule not in ec2.security_groups[group_id]["IpPermissions"]:
+            ec2.security_groups[group_id]["IpPermissions"].append(rule)
+        yield {
+            "detail-type": "Config Configuration Item Change",
+            "source": "aws.config",
+            "detail": {
+                "configurationItem": {
+                    "resourceId": group_id,
+                    "resourceType": "AWS::EC2::SecurityGroup",
+                    "configurationItemCaptureTime": datetime.now(timezone.utc).isoformat(),
+                    "changes": {"ipPermissions": [rule]},
+                },
+            },
+        }, 1
+
+
+def macie_setup(aws):
+    pass
+
+
+def macie_events(aws, count, rng, args):
+    buckets = [f"bucket-{index}" for index in range(20)]
+    for index in range(count):
+        bucket = rng.choice(buckets)
+        severity = rng.choice(["HIGH", "HIGH", "MEDIUM", "LOW"])
+        yield {
+            "detail-type": "Macie Finding",
+            "source": "aws.macie",
+            "detail": {
+                "id": f"finding-{index}",
+                "region": "eu-west-2",
+                "accountId": "123456789012",
+                "severity": {"description": severity},
+                "description": rng.choice([
+                    "Unencrypted sensitive data detected",
+                    "Sensitive data detected",
+                ]),
+                "resourcesAffected": {
+                    "s3Bucket": {"name": bucket},
+                    "s3Object": {"key": f"exports/{index}.csv"},
+                },
+            },
+        }, 1
+
+
+FUNCTIONS = {
+    "fraud-detection": {
+        "env": {
+            "DYNAMODB_TABLE": "fraud-alerts",
+            "FRAUD_AGGREGATES_TABLE": "fraud-aggregates",
+            "SNS_TOPIC_ARN": SNS_TOPIC_ARN,
+        },
+        "setup": fraud_setup,
+        "events": fraud_events,
+        "sqs_body": lambda event: event["body"],
+    },
+    "config-rule-changes": {
+        "env": {
+            "APPROVED_PORTS": "80,443,22",
+            "VPC_ID": VPC_ID,
+            "SNS_TOPIC_ARN": SNS_TOPIC_ARN,
+            "ENVIRONMENT": "replay",
+        },
+        "setup": config_setup,
+        "events": config_events,
+        # EventBridge delivers the whole event to the queue
+        "sqs_body": json.dumps,
+    },
+    "macie-findings": {
+        "env": {"SNS_TOPIC_ARN": SNS_TOPIC_ARN},
+        "setup": macie_setup,
+        "events": macie_events,
+        "sqs_body": json.dumps,
+    },
+}
+
+
+def recorded_events(path):
+    with open(path) as events:
+        for line in events:
+            if line.strip():
+                event = json.loads(line)
+                yield event, len(event.get("Records", ())) or 1
+
+
+def cold_start(function):
+    """Import the handler the way a fresh execution environment would."""
+    aws = fake_aws.install()
+    FUNCTIONS[function]["setup"](aws)
+    os.environ.update(FUNCTIONS[function]["env"])
+    # Forget modules of earlier imports (the function's own and shared ones)
+    for name, module in list(sys.modules.items()):
+        module_file = getattr(module, "__file__", None) or ""
+        if module_file.startswith(LAMBDA_DIR) and not module_file.startswith(BENCHMARKS_DIR):
+            del sys.modules[name]
+    function_dir = os.path.join(LAMBDA_DIR, function)
+    if function_dir not in sys.path:
+        sys.path.insert(0, function_dir)
+    spec = importlib.util.spec_from_file_location(f"{function.replace('-', '_')}_app", os.path.join(function_dir, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    start = time.perf_counter()
+    spec.loader.exec_module(module)
+    return aws, module, time.perf_counter() - start
+
+
+def invoke(handler, event, output, errors):
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            handler(event, None)
+    except Exception as exc:
+        errors.append(f"{type(exc).__name__}: {exc}")
+    return time.perf_counter() - start
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def replay(function, args):
+    output = sys.stdout if args.verbose else io.StringIO()
+    rng = random.Random(args.seed)
+    errors = []
+
+    imports, first_calls = [], []
+    for _ in range(args.cold_starts):
+        aws, module, import_seconds = cold_start(function)
+        events = recorded_events(args.events_file) if args.events_file else \
+            FUNCTIONS[function]["events"](aws, args.events, rng, args)
+        if args.batch_size > 1 and "sqs_body" in FUNCTIONS[function]:
+            events = sqs_batches(events, args.batch_size, FUNCTIONS[function]["sqs_body"])
+        first_event, _ = next(events)
+        imports.append(import_seconds)
+        first_calls.append(invoke(module.lambda_handler, first_event, output, errors))
+        if not args.verbose:
+            output.seek(0)
+            output.truncate()
+
+    # Warm: keep the last environment and replay the rest of its stream
+    fake_aws.calls.clear()
+    latencies, event_count = [], 0
+    start = time.perf_counter()
+    for event, size in events:
+        latencies.append(invoke(module.lambda_handler, event, output, errors))
+        event_count += size
+        if not args.verbose and output.tell() > 1 << 20:
+            output.seek(0)
+            output.truncate()
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{function}")
+    print(f"  cold start   import {statistics.median(imports) * 1e3:8.2f} ms   "
+          f"first invocation {statistics.median(first_calls) * 1e3:8.2f} ms   (median of {args.cold_starts})")
+    if not latencies:
+        print("  no warm events")
+        return
+    print(f"  warm         {event_count} events in {len(latencies)} invocations, "
+          f"{event_count / elapsed:,.0f} events/s")
+    print(f"               p50 {percentile(latencies, 0.50) * 1e3:.3f} ms   p99 {percentile(latencies, 0.99) * 1e3:.3f} ms per invocation")
+    total_calls = sum(fake_aws.calls.values())
+    print(f"  API calls    {total_calls / event_count:.3f} per event")
+    for (service, operation), count in sorted(fake_aws.calls.items()):
+        print(f"               {service + ':' + operation:<36} {count / event_count:.3f}")
+    if errors:
+        print(f"  errors       {len(errors)}, first: {errors[0]}")
+
+
+def main(args):
+    fake_aws.api_latency = args.api_latency_ms / 1000
+    functions = sorted(FUNCTIONS) if args.function == "all" else [args.function]
+    for function in functions:
+        replay(function, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("function", choices=["all", *sorted(FUNCTIONS)])
+    parser.add_argument("--events", type=int, default=2000, help="synthetic events to generate")
+    parser.add_argument("--events-file", help="JSON Lines file of recorded events to replay instead")
+    parser.add_argument("--batch-size", type=int, default=1, help="SQS records per invocation, for functions fed by a queue")
+    parser.add_argument("--users", type=int, default=200, help="fraud-detection: distinct users")
+    parser.add_argument("--cold-starts", type=int, default=5)
+    parser.add_argument("--api-latency-ms", type=float, default=0.0, help="simulated round trip per AWS call")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="show handler output")
+    main(parser.parse_args())
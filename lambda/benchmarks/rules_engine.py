@@ -0,0 +1,74 @@
+"""Cost of one fraud rules evaluation as the history window grows.
+
+Times RulesEngine.evaluate with the default rules plus time-of-day and
+location-change, their windows stretched to the whole history, over hourly
+bucket arrays of increasing length. For comparison it times the same
+frequency and velocity checks done the old way, looping over one record per
+transaction (TXNS_PER_HOUR of them per hour of history).
+
+    python lambda/benchmarks/rules_engine.py --iterations 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fraud-detection"))
+
+from rules import RulesEngine, build_rules  # noqa: E402
+
+TXNS_PER_HOUR = 5
+HISTORY_HOURS = (24, 168, 720, 2160)
+
+
+def engine_for(hours):
+    return RulesEngine(build_rules([
+        {"name": "HIGH_VALUE_TRANSACTION", "type": "amount", "threshold": 10000},
+        {"name": "HIGH_FREQUENCY", "type": "frequency", "threshold": 10, "hours": hours},
+        {"name": "VELOCITY_CHECK_FAILED", "type": "velocity", "threshold": 20000, "hours": hours},
+        {"name": "NIGHT_TIME", "type": "time_of_day", "start_hour": 1, "end_hour": 5},
+        {"name": "LOCATION_CHANGE", "type": "location_change", "hours": hours},
+    ]))
+
+
+def per_call(fn, iterations):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main(args):
+    rng = random.Random(42)
+    moment = datetime(2025, 1, 1, 3, tzinfo=timezone.utc)
+
+    print(f"{'history':>8} {'engine us':>10} {'per-txn loop us':>16}  slowest rule")
+    for hours in HISTORY_HOURS:
+        engine = engine_for(hours)
+        history = engine.new_history()
+        for hour in range(hours):
+            history.counts[hour] = TXNS_PER_HOUR
+            history.amounts[hour] = TXNS_PER_HOUR * rng.uniform(10, 500)
+        history.last_location, history.last_location_age = "London", 2
+        transactions = [{"amount": rng.uniform(10, 500)} for _ in range(hours * TXNS_PER_HOUR)]
+
+        def per_transaction_loop():
+            count, total = 0, 0.0
+            for transaction in transactions:
+                count += 1
+                total += transaction["amount"]
+            return count > 10, total > 20000
+
+        engine_seconds = per_call(lambda: engine.evaluate(2500.0, moment, "Paris", history), args.iterations)
+        loop_seconds = per_call(per_transaction_loop, max(args.iterations // hours, 10))
+        slowest = max(engine.report().items(), key=lambda item: item[1]["mean_us"])
+        print(f"{hours:>7}h {engine_seconds * 1e6:>10.2f} {loop_seconds * 1e6:>16.1f}  {slowest[0]} ({slowest[1]['mean_us']:.2f} us)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    main(parser.parse_args())
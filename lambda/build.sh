@@ -0,0 +1,12 @@
+#!/bin/sh
+# Build each function's deployment zip (the files terraform/modules/compute
+# uploads): the function's own modules plus the shared ones in common/, all
+# at the root of the archive. Run after changing any Lambda code.
+set -eu
+cd "$(dirname "$0")"
+
+for function in fraud-detection config-rule-changes macie-findings; do
+    rm -f "$function/$function.zip"
+    zip -q -j -X "$function/$function.zip" "$function"/*.py common/*.py
+    echo "built $function/$function.zip"
+done
@@ -0,0 +1,67 @@
+"""
+Lazily created, cached AWS clients shared by the Lambdas.
+
+boto3 is imported and each client, resource or table is built on first
+use, then kept for the life of the execution environment, so warm
+invocations reuse the same clients and their pooled HTTPS connections.
+Importing this module does no work, and code paths that never call a
+service never pay for its client.
+
+Retries and timeouts are tuned for functions with a 30 second timeout:
+standard retry mode (backoff with jitter, throttling aware) with
+AWS_CLIENT_MAX_ATTEMPTS attempts, short connect/read timeouts so a stuck
+connection is retried instead of eating the invocation, and TCP keepalive
+for connections reused across invocations.
+
+The module is copied next to each function's app.py when the zips are
+built (lambda/build.sh).
+"""
+import os
+from typing import Any, Dict
+
+AWS_CLIENT_MAX_ATTEMPTS = int(os.environ.get('AWS_CLIENT_MAX_ATTEMPTS', '3'))
+AWS_CLIENT_CONNECT_TIMEOUT = float(os.environ.get('AWS_CLIENT_CONNECT_TIMEOUT', '2'))
+AWS_CLIENT_READ_TIMEOUT = float(os.environ.get('AWS_CLIENT_READ_TIMEOUT', '5'))
+AWS_CLIENT_POOL_CONNECTIONS = int(os.environ.get('AWS_CLIENT_POOL_CONNECTIONS', '10'))
+
+_clients: Dict[str, Any] = {}
+_resources: Dict[str, Any] = {}
+_tables: Dict[str, Any] = {}
+_config = None
+
+
+def client_config():
+    global _config
+    if _config is None:
+        from botocore.config import Config
+        _config = Config(
+            retries={'mode': 'standard', 'max_attempts': AWS_CLIENT_MAX_ATTEMPTS},
+            connect_timeout=AWS_CLIENT_CONNECT_TIMEOUT,
+            read_timeout=AWS_CLIENT_READ_TIMEOUT,
+            max_pool_connections=AWS_CLIENT_POOL_CONNECTIONS,
+            tcp_keepalive=True,
+        )
+    return _config
+
+
+def client(service_name: str):
+    """The shared low-level client for ``service_name``."""
+    if service_name not in _clients:
+        import boto3
+        _clients[service_name] = boto3.client(service_name, config=client_config())
+    return _clients[service_name]
+
+
+def resource(service_name: str):
+    """The shared resource object for ``service_name`` (e.g. dynamodb)."""
+    if service_name not in _resources:
+        import boto3
+        _resources[service_name] = boto3.resource(service_name, config=client_config())
+    return _resources[service_name]
+
+
+def table(name: str):
+    """A cached DynamoDB Table resource."""
+    if name not in _tables:
+        _tables[name] = resource('dynamodb').Table(name)
+    return _tables[name]
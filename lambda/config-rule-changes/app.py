@@ -1,16 +1,168 @@
 import json
-import boto3
-from typing import Dict, Any
+import os
+from collections import Counter
+from typing import Dict, Any, List
+
+import aws_clients
+
+# Ports a rule may open (both ends of its range), e.g. "80,443,22"
+APPROVED_PORTS = frozenset(int(port) for port in os.environ.get('APPROVED_PORTS', '80,443,22').split(',') if port.strip())
+OPEN_CIDR = '0.0.0.0/0'
+# Most values EC2 accepts in one describe filter
+DESCRIBE_BATCH_SIZE = 200
+# Stay under SNS's 256 KB message limit
+DIGEST_MAX_BYTES = 250_000
+
+def unauthorised_rules(sg_details: Dict[str, Any]) -> List[Dict[str, Any]]:
+   """Ingress rules open to all ports, open to the internet or on unapproved ports."""
+   rules = []
+   for rule in sg_details['IpPermissions']:
+       port_range_from = rule.get('FromPort', 0)
+       port_range_to = rule.get('ToPort', 0)
+
+       # Check for overly permissive rules
+       if (port_range_from == 0 and port_range_to == 0) or \
+          any(ip['CidrIp'] == OPEN_CIDR for ip in rule.get('IpRanges', [])):
+           rules.append(rule)
+
+       # Check for unauthorised ports
+       elif port_range_from not in APPROVED_PORTS or port_range_to not in APPROVED_PORTS:
+           rules.append(rule)
+   return rules
+
+def describe_groups(ec2, group_ids: List[str], api_calls: Counter) -> Dict[str, Dict[str, Any]]:
+   """Security groups by ID, DESCRIBE_BATCH_SIZE per call. Groups deleted
+   since the event are simply missing (a filter, unlike GroupIds, does not
+   fail the whole call for them)."""
+   groups = {}
+   for start in range(0, len(group_ids), DESCRIBE_BATCH_SIZE):
+       request = {'Filters': [{'Name': 'group-id', 'Values': group_ids[start:start + DESCRIBE_BATCH_SIZE]}]}
+       while True:
+           api_calls['DescribeSecurityGroups'] += 1
+           response = ec2.describe_security_groups(**request)
+           for group in response['SecurityGroups']:
+               groups[group['GroupId']] = group
+           if not response.get('NextToken'):
+               break
+           request['NextToken'] = response['NextToken']
+   return groups
+
+def describe_rule(rule: Dict[str, Any]) -> str:
+   cidrs = ','.join(ip['CidrIp'] for ip in rule.get('IpRanges', [])) or '-'
+   return f"{rule.get('IpProtocol')} {rule.get('FromPort', 'all')}-{rule.get('ToPort', 'all')} from {cidrs}"
+
+def digest_message(reverted: List[Dict[str, Any]]) -> str:
+   lines = [f"Unauthorised security group changes detected and reverted in {len(reverted)} group(s):", ""]
+   size = sum(len(line) + 1 for line in lines)
+   for index, entry in enumerate(reverted):
+       block = [
+           f"- Security Group: {entry['group_id']} (VPC {entry['vpc_id']})",
+           f"  Events: {entry['events']}, last change at {entry['time']}",
+           *(f"  Reverted: {describe_rule(rule)}" for rule in entry['rules']),
+       ]
+       block_size = sum(len(line.encode()) + 1 for line in block)
+       if size + block_size > DIGEST_MAX_BYTES:
+           lines.append(f"... and {len(reverted) - index} more group(s); see the function logs")
+           break
+       lines.extend(block)
+       size += block_size
+   return '\n'.join(lines)
+
+def batch_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+   """
+   Handles a burst of Config change events delivered in one SQS batch.
+
+   Events are deduplicated by security group, the groups are described a
+   few hundred at a time, each offending group gets one revoke for all its
+   unauthorised rules and the security team gets one digest for the whole
+   batch. Records that cannot be parsed or whose group could not be
+   described or reverted are reported in batchItemFailures.
+   """
+   ec2 = aws_clients.client('ec2')
+   sns = aws_clients.client('sns')
+   api_calls = Counter()
+   failures = []
+
+   # Latest change per security group, with the records that reported it
+   changes: Dict[str, Dict[str, Any]] = {}
+   for record in event['Records']:
+       try:
+           config_item = json.loads(record['body'])['detail']['configurationItem']
+           sg_id = config_item['resourceId']
+       except (KeyError, TypeError, ValueError) as e:
+           print(f"Skipping malformed Config change record: {str(e)}")
+           failures.append(record['messageId'])
+           continue
+       change = changes.setdefault(sg_id, {'item': config_item, 'records': []})
+       if config_item.get('configurationItemCaptureTime', '') > change['item'].get('configurationItemCaptureTime', ''):
+           change['item'] = config_item
+       change['records'].append(record['messageId'])
+
+   try:
+       groups = describe_groups(ec2, list(changes), api_calls)
+   except Exception as e:
+       print(f"Error describing security groups: {str(e)}")
+       groups = None
+
+   reverted = []
+   for sg_id, change in changes.items():
+       if groups is None:
+           failures.extend(change['records'])
+           continue
+       group = groups.get(sg_id)
+       rules = unauthorised_rules(group) if group else []
+       if not rules:
+           continue
+       try:
+           api_calls['RevokeSecurityGroupIngress'] += 1
+           ec2.revoke_security_group_ingress(GroupId=sg_id, IpPermissions=rules)
+       except Exception as e:
+           print(f"Error reverting {sg_id}: {str(e)}")
+           failures.extend(change['records'])
+           continue
+       reverted.append({
+           'group_id': sg_id,
+           'vpc_id': group['VpcId'],
+           'rules': rules,
+           'events': len(change['records']),
+           'time': change['item'].get('configurationItemCaptureTime'),
+       })
+
+   if reverted:
+       message = digest_message(reverted)
+       try:
+           api_calls['Publish'] += 1
+           sns.publish(
+               TopicArn=os.environ['SNS_TOPIC_ARN'],
+               Subject=f'Security Group Change Alert: {len(reverted)} group(s) reverted',
+               Message=message
+           )
+       except Exception as e:
+           # The rules are already reverted; a retry would find nothing to report
+           print(f"Error publishing security group digest: {str(e)}\n{message}")
+
+   print(json.dumps({
+       'events': len(event['Records']),
+       'security_groups': len(changes),
+       'reverted': len(reverted),
+       'api_calls': dict(api_calls),
+   }))
+   return {'batchItemFailures': [{'itemIdentifier': item_id} for item_id in failures]}
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
    """
    Handles AWS Config changes to security groups.
    Reverts unauthorised changes and notifies security team.
+
+   Batches of events buffered in SQS (events with ``Records``) go to
+   batch_handler.
    """
-   
-   # Initialize AWS clients
-   ec2 = boto3.client('ec2')
-   sns = boto3.client('sns')
+   if 'Records' in event:
+       return batch_handler(event, context)
+
+   # Shared AWS clients, created once per execution environment
+   ec2 = aws_clients.client('ec2')
+   sns = aws_clients.client('sns')
 
    try:
        # Parse Config change event
@@ -18,42 +170,26 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
        sg_id = config_item['resourceId']
        changes = config_item['changes']
 
-       APPROVED_PORTS = {443, 80, 22}  
-       
        # Check security group rules
        sg_details = ec2.describe_security_groups(GroupIds=[sg_id])['SecurityGroups'][0]
-       unauthorised_rules = []
-
-       # Check ingress rules
-       for rule in sg_details['IpPermissions']:
-           port_range_from = rule.get('FromPort', 0)
-           port_range_to = rule.get('ToPort', 0)
-           
-           # Check for overly permissive rules
-           if (port_range_from == 0 and port_range_to == 0) or \
-              ('0.0.0.0/0' in [ip['CidrIp'] for ip in rule.get('IpRanges', [])]):
-               unauthorised_rules.append(rule)
-           
-           # Check for unauthorised ports
-           elif not (port_range_from in APPROVED_PORTS and port_range_to in APPROVED_PORTS):
-               unauthorised_rules.append(rule)
-
-       if unauthorised_rules:
+       unauthorised = unauthorised_rules(sg_details)
+
+       if unauthorised:
            # Revert unauthorized changes
            ec2.revoke_security_group_ingress(
                GroupId=sg_id,
-               IpPermissions=unauthorised_rules
+               IpPermissions=unauthorised
            )
 
            # Alert security team
            sns.publish(
-               TopicArn='YOUR_SNS_TOPIC_ARN',
+               TopicArn=os.environ['SNS_TOPIC_ARN'],
                Subject='Security Group Change Alert',
                Message=f"""
                Unauthorised security group change detected and reverted:
                - Security Group: {sg_id}
                - VPC: {sg_details['VpcId']}
-               - Unauthorised Rules: {json.dumps(unauthorised_rules, indent=2)}
+               - Unauthorised Rules: {json.dumps(unauthorised, indent=2)}
                - Action: Changes reverted
                - Time: {config_item['configurationItemCaptureTime']}
                """
@@ -66,4 +202,4 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
    except Exception as e:
        print(f"Error processing Config change: {str(e)}")
-       raise
\ No newline at end of file
+       raise
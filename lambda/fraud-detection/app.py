@@ -1,82 +1,292 @@
+import base64
 import json
-import boto3
 import os
-from datetime import datetime, timedelta
-from typing import Dict, Any
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Any, List, Optional
+
+import aws_clients
+from rules import History, RulesEngine
+
+ALERTS_TABLE = os.environ['DYNAMODB_TABLE']
+# Per-user hourly counters: user_id (hash) + bucket (range, "YYYY-MM-DDTHH")
+AGGREGATES_TABLE = os.environ['FRAUD_AGGREGATES_TABLE']
+
+# Fraud rules and thresholds from FRAUD_RULES (see rules.py)
+engine = RulesEngine.from_environment()
+# Buckets outlive the longest rule window a little; DynamoDB TTL deletes them afterwards
+BUCKET_RETENTION_HOURS = engine.window_hours + 24
+# Most entries SNS accepts in one PublishBatch call
+SNS_BATCH_SIZE = 10
+
+
+def hour_bucket(moment: datetime) -> str:
+    return moment.strftime('%Y-%m-%dT%H')
+
+
+def transaction_time(transaction: Dict[str, Any], now: datetime) -> datetime:
+    """When the transaction happened (ISO 8601 timestamp), else ``now``."""
+    try:
+        moment = datetime.fromisoformat(str(transaction['timestamp']).replace('Z', '+00:00'))
+    except (KeyError, ValueError):
+        return now
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def record_transaction(user_id: str, amount: float, now: datetime, count: int = 1,
+                       location: Optional[str] = None) -> Optional[str]:
+    """Add ``count`` transactions totalling ``amount`` to the user's current
+    hour bucket (atomic ADD) and make ``location`` its last location.
+
+    Returns the bucket's previous last location, if it had one."""
+    update = 'ADD txn_count :count, txn_amount :amount SET expires_at = if_not_exists(expires_at, :expires_at)'
+    values = {
+        ':count': count,
+        ':amount': Decimal(str(amount)),
+        ':expires_at': int((now + timedelta(hours=BUCKET_RETENTION_HOURS)).timestamp()),
+    }
+    if location is not None:
+        update += ', last_location = :location'
+        values[':location'] = location
+    response = aws_clients.table(AGGREGATES_TABLE).update_item(
+        Key={'user_id': user_id, 'bucket': hour_bucket(now)},
+        UpdateExpression=update,
+        ExpressionAttributeValues=values,
+        ReturnValues='ALL_OLD',
+    )
+    return response.get('Attributes', {}).get('last_location')
+
+
+def load_history(user_id: str, now: datetime, previous_location: Optional[str] = None) -> History:
+    """The user's buckets over the rules' window (engine.window_hours),
+    current hour first; reads at most that many small items.
+
+    The current bucket's last location has just been overwritten, so the
+    one it held before (``previous_location``) is passed in."""
+    history = engine.new_history()
+    current = now.replace(minute=0, second=0, microsecond=0)
+    query = {
+        'KeyConditionExpression': 'user_id = :uid AND #bucket >= :first',
+        'ExpressionAttributeNames': {'#bucket': 'bucket'},
+        'ExpressionAttributeValues': {
+            ':uid': user_id,
+            ':first': hour_bucket(now - timedelta(hours=engine.window_hours - 1)),
+        },
+        'ProjectionExpression': '#bucket, txn_count, txn_amount, last_location',
+        'ConsistentRead': True,
+        'ScanIndexForward': False,
+    }
+    while True:
+        response = aws_clients.table(AGGREGATES_TABLE).query(**query)
+        for item in response['Items']:
+            bucket_start = datetime.strptime(item['bucket'], '%Y-%m-%dT%H').replace(tzinfo=timezone.utc)
+            age = int((current - bucket_start).total_seconds() // 3600)
+            if not 0 <= age < engine.window_hours:
+                continue
+            history.counts[age] = float(item.get('txn_count', 0))
+            history.amounts[age] = float(item.get('txn_amount', 0))
+            # Newest first: keep the most recent location older buckets saw
+            if age > 0 and history.last_location is None and 'last_location' in item:
+                history.last_location = item['last_location']
+                history.last_location_age = age
+        if 'LastEvaluatedKey' not in response:
+            break
+        query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    if previous_location is not None:
+        history.last_location = previous_location
+        history.last_location_age = 0
+    return history
+
+
+def report_rule_stats() -> None:
+    """Log per-rule evaluation counts and timings for this invocation."""
+    print(json.dumps({'fraud_rules': engine.report()}))
+    engine.reset_stats()
+
+
+def build_alert(transaction: Dict[str, Any], risk_factors: List[str]) -> Dict[str, Any]:
+    return {
+        'user_id': transaction['user_id'],
+        'transaction_id': transaction['transaction_id'],
+        'amount': transaction['amount'],
+        'risk_factors': risk_factors,
+        'timestamp': transaction['timestamp']
+    }
+
+
+def alert_item(alert: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'user_id': alert['user_id'],
+        'transaction_id': alert['transaction_id'],
+        'alert_type': 'FRAUD_DETECTION',
+        'risk_factors': alert['risk_factors'],
+        'timestamp': alert['timestamp'],
+        'status': 'PENDING_REVIEW'
+    }
+
+
+def parse_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Transaction carried by an SQS message or a Kinesis record."""
+    if 'kinesis' in record:
+        transaction = json.loads(base64.b64decode(record['kinesis']['data']))
+    else:
+        transaction = json.loads(record['body'])
+    # Reject records the checks could not evaluate
+    transaction['amount'] = float(transaction['amount'])
+    for field in ('user_id', 'transaction_id', 'timestamp'):
+        if field not in transaction:
+            raise KeyError(field)
+    return transaction
+
+
+def record_id(record: Dict[str, Any]) -> str:
+    """Identifier Lambda expects in batchItemFailures for this record."""
+    if 'kinesis' in record:
+        return record['kinesis']['sequenceNumber']
+    return record['messageId']
+
+
+def publish_alerts(alerts: List[Dict[str, Any]]) -> List[int]:
+    """Publish alerts through SNS PublishBatch; returns the indexes of the
+    alerts SNS did not accept."""
+    failed = []
+    for start in range(0, len(alerts), SNS_BATCH_SIZE):
+        entries = [
+            {
+                'Id': str(index),
+                'Message': json.dumps(alerts[index]),
+                'Subject': 'Potential Fraud Detection'
+            }
+            for index in range(start, min(start + SNS_BATCH_SIZE, len(alerts)))
+        ]
+        try:
+            response = aws_clients.client('sns').publish_batch(TopicArn=os.environ['SNS_TOPIC_ARN'], PublishBatchRequestEntries=entries)
+        except Exception as e:
+            print(f"Error publishing fraud alerts: {str(e)}")
+            failed.extend(int(entry['Id']) for entry in entries)
+            continue
+        failed.extend(int(entry['Id']) for entry in response.get('Failed', []))
+    return failed
+
+
+def batch_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Analyses a batch of transactions from an SQS queue or Kinesis stream.
+
+    Records are grouped by user: each user costs one aggregate update and
+    one window read however many of their transactions are in the batch,
+    and every transaction is checked against the window as it stood when
+    that transaction arrived. Alerts are written with BatchWriteItem and
+    published with SNS PublishBatch.
+
+    Records that cannot be parsed or processed are returned in
+    batchItemFailures (the event source mapping needs
+    ReportBatchItemFailures) so only they are retried. Delivery is at least
+    once: alert items are keyed by transaction and simply overwritten on a
+    retry, but a retried transaction is counted in the aggregates again,
+    which can only make the checks stricter. A transaction delivered twice
+    in the same batch is checked once.
+    """
+    failures = []
+    # user_id -> transactions in arrival order; transaction_id -> record ids
+    by_user: Dict[str, List[Dict[str, Any]]] = {}
+    record_ids: Dict[str, List[str]] = {}
+
+    for record in event['Records']:
+        try:
+            transaction = parse_record(record)
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Skipping malformed fraud detection record: {str(e)}")
+            failures.append(record_id(record))
+            continue
+        transaction_id = transaction['transaction_id']
+        if transaction_id not in record_ids:
+            by_user.setdefault(transaction['user_id'], []).append(transaction)
+            record_ids[transaction_id] = []
+        record_ids[transaction_id].append(record_id(record))
+
+    now = datetime.now(timezone.utc)
+    alerts = []
+    for user_id, transactions in by_user.items():
+        batch_amount = sum(transaction['amount'] for transaction in transactions)
+        try:
+            previous_location = record_transaction(
+                user_id, batch_amount, now, count=len(transactions), location=transactions[-1].get('location'))
+            history = load_history(user_id, now, previous_location)
+        except Exception as e:
+            print(f"Error updating fraud aggregates for {user_id}: {str(e)}")
+            for transaction in transactions:
+                failures.extend(record_ids[transaction['transaction_id']])
+            continue
+
+        # Replay the user's transactions on top of the window without them
+        history.withdraw(len(transactions), batch_amount)
+        for transaction in transactions:
+            location = transaction.get('location')
+            history.add(transaction['amount'])
+            risk_factors = engine.evaluate(transaction['amount'], transaction_time(transaction, now), location, history)
+            history.seen_at(location)
+            if risk_factors:
+                alerts.append(build_alert(transaction, risk_factors))
+
+    if alerts:
+        try:
+            with aws_clients.table(ALERTS_TABLE).batch_writer(overwrite_by_pkeys=['user_id', 'transaction_id']) as batch:
+                for alert in alerts:
+                    batch.put_item(Item=alert_item(alert))
+            failed = publish_alerts(alerts)
+        except Exception as e:
+            print(f"Error storing fraud alerts: {str(e)}")
+            failed = range(len(alerts))
+        for index in failed:
+            failures.extend(record_ids[alerts[index]['transaction_id']])
+
+    report_rule_stats()
+    return {'batchItemFailures': [{'itemIdentifier': item_id} for item_id in failures]}
 
-dynamodb = boto3.resource('dynamodb')
-sns = boto3.client('sns')
-table = dynamodb.Table(os.environ['DYNAMODB_TABLE'])
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Analyses transactions for potential fraud patterns.
     
-    Patterns checked:
-    1. High-value transactions
-    2. Frequent transactions
-    3. Unusual locations/times
+    Patterns checked are the rules configured in FRAUD_RULES (rules.py):
+    by default high-value and frequent transactions and velocity; unusual
+    times and location changes are available.
+
+    Queue and stream batches (events with ``Records``) go to batch_handler.
     """
-    
+    if 'Records' in event:
+        return batch_handler(event, context)
+
     transaction = json.loads(event['body'])
     user_id = transaction['user_id']
     amount = transaction['amount']
     timestamp = transaction['timestamp']
     location = transaction['location']
 
-    # Get recent transactions
-    response = table.query(
-        KeyConditionExpression='user_id = :uid AND transaction_time > :time',
-        ExpressionAttributeValues={
-            ':uid': user_id,
-            ':time': (datetime.now() - timedelta(hours=24)).isoformat()
-        }
-    )
+    # Count this transaction, then read the user's hourly buckets
+    # (including it) instead of every transaction in the window
+    now = datetime.now(timezone.utc)
+    previous_location = record_transaction(user_id, amount, now, location=location)
+    history = load_history(user_id, now, previous_location)
 
-    recent_transactions = response['Items']
-    
     # Fraud checks
-    risk_factors = []
-    
-    # Check 1: High-value transaction
-    if amount > 10000:
-        risk_factors.append('HIGH_VALUE_TRANSACTION')
-    
-    # Check 2: Frequency check
-    if len(recent_transactions) > 10:
-        risk_factors.append('HIGH_FREQUENCY')
-    
-    # Check 3: Velocity check (amount over time)
-    total_recent_amount = sum(float(t['amount']) for t in recent_transactions)
-    if total_recent_amount > 20000:
-        risk_factors.append('VELOCITY_CHECK_FAILED')
+    risk_factors = engine.evaluate(amount, transaction_time(transaction, now), location, history)
+    report_rule_stats()
 
     # If risks detected, send alert
     if risk_factors:
-        alert = {
-            'user_id': user_id,
-            'transaction_id': transaction['transaction_id'],
-            'amount': amount,
-            'risk_factors': risk_factors,
-            'timestamp': timestamp
-        }
+        alert = build_alert(transaction, risk_factors)
         
         # Send to SNS
-        sns.publish(
+        aws_clients.client('sns').publish(
             TopicArn=os.environ['SNS_TOPIC_ARN'],
             Message=json.dumps(alert),
             Subject='Potential Fraud Detection'
         )
         
         # Store alert in DynamoDB
-        table.put_item(Item={
-            'user_id': user_id,
-            'transaction_id': transaction['transaction_id'],
-            'alert_type': 'FRAUD_DETECTION',
-            'risk_factors': risk_factors,
-            'timestamp': timestamp,
-            'status': 'PENDING_REVIEW'
-        })
+        aws_clients.table(ALERTS_TABLE).put_item(Item=alert_item(alert))
         
         return {
             'statusCode': 200,
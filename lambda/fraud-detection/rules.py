@@ -0,0 +1,216 @@
+"""
+Fraud rules evaluated over a user's recent hourly activity.
+
+A user's history is the per-hour aggregate buckets of the last N hours,
+held as two compact float arrays (transaction counts and amounts, index 0 =
+current hour) plus the last location seen. Window rules reduce an array
+slice in one call instead of looping over transactions, so an evaluation
+costs the same however many transactions the user made.
+
+Rules come from the FRAUD_RULES environment variable, a JSON list such as
+
+    [{"name": "HIGH_VALUE_TRANSACTION", "type": "amount", "threshold": 10000},
+     {"name": "HIGH_FREQUENCY", "type": "frequency", "threshold": 10, "hours": 24},
+     {"name": "VELOCITY_CHECK_FAILED", "type": "velocity", "threshold": 20000, "hours": 24},
+     {"name": "NIGHT_TIME", "type": "time_of_day", "start_hour": 1, "end_hour": 5},
+     {"name": "LOCATION_CHANGE", "type": "location_change", "hours": 2}]
+
+Without it the first three rules apply. Their thresholds can be set with
+HIGH_VALUE_THRESHOLD (default 10000), HIGH_FREQUENCY_THRESHOLD (default 10)
+and VELOCITY_THRESHOLD (default 20000), the values the checks used to
+hard-code. New rule types subclass Rule and register themselves with
+@rule_type.
+"""
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from array import array
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+RULE_TYPES: Dict[str, type] = {}
+
+
+def rule_type(name: str):
+    def register(cls):
+        RULE_TYPES[name] = cls
+        return cls
+    return register
+
+
+class History:
+    """Hourly counts and amounts of one user, newest hour first."""
+
+    __slots__ = ('counts', 'amounts', 'last_location', 'last_location_age')
+
+    def __init__(self, hours: int):
+        self.counts = array('d', bytes(8 * hours))
+        self.amounts = array('d', bytes(8 * hours))
+        self.last_location: Optional[str] = None
+        # Hours between the current bucket and the one last_location came from
+        self.last_location_age = 0
+
+    def add(self, amount: float) -> None:
+        """Count one more transaction in the current hour."""
+        self.counts[0] += 1
+        self.amounts[0] += amount
+
+    def seen_at(self, location: Optional[str]) -> None:
+        if location is not None:
+            self.last_location = location
+            self.last_location_age = 0
+
+    def withdraw(self, count: int, amount: float) -> None:
+        """Take transactions back out of the current hour (to replay them)."""
+        self.counts[0] -= count
+        self.amounts[0] -= amount
+
+
+class Rule(ABC):
+    """Fires for a transaction given the user's history before it."""
+
+    hours = 0
+
+    def __init__(self, name: str, **options: Any):
+        self.name = name
+
+    @abstractmethod
+    def __call__(self, amount: float, moment: datetime, location: Optional[str], history: History) -> bool:
+        """Whether the rule fires for this transaction."""
+
+
+@rule_type('amount')
+class AmountRule(Rule):
+    def __init__(self, name: str, threshold: float, **options: Any):
+        super().__init__(name)
+        self.threshold = float(threshold)
+
+    def __call__(self, amount, moment, location, history):
+        return amount > self.threshold
+
+
+@rule_type('frequency')
+class FrequencyRule(Rule):
+    """More than ``threshold`` transactions in the last ``hours`` buckets."""
+
+    def __init__(self, name: str, threshold: int, hours: int = 24, **options: Any):
+        super().__init__(name)
+        self.threshold = int(threshold)
+        self.hours = int(hours)
+
+    def __call__(self, amount, moment, location, history):
+        return sum(history.counts[:self.hours]) > self.threshold
+
+
+@rule_type('velocity')
+class VelocityRule(Rule):
+    """More than ``threshold`` moved in the last ``hours`` buckets."""
+
+    def __init__(self, name: str, threshold: float, hours: int = 24, **options: Any):
+        super().__init__(name)
+        self.threshold = float(threshold)
+        self.hours = int(hours)
+
+    def __call__(self, amount, moment, location, history):
+        return sum(history.amounts[:self.hours]) > self.threshold
+
+
+@rule_type('time_of_day')
+class TimeOfDayRule(Rule):
+    """Transaction between ``start_hour`` and ``end_hour`` (UTC, may wrap midnight)."""
+
+    def __init__(self, name: str, start_hour: int, end_hour: int, **options: Any):
+        super().__init__(name)
+        self.start_hour = int(start_hour)
+        self.end_hour = int(end_hour)
+
+    def __call__(self, amount, moment, location, history):
+        if self.start_hour <= self.end_hour:
+            return self.start_hour <= moment.hour < self.end_hour
+        return moment.hour >= self.start_hour or moment.hour < self.end_hour
+
+
+@rule_type('location_change')
+class LocationChangeRule(Rule):
+    """Location differs from one seen within the last ``hours`` buckets."""
+
+    def __init__(self, name: str, hours: int = 1, **options: Any):
+        super().__init__(name)
+        self.hours = int(hours)
+
+    def __call__(self, amount, moment, location, history):
+        return (
+            location is not None
+            and history.last_location is not None
+            and history.last_location != location
+            and history.last_location_age < self.hours
+        )
+
+
+def default_rule_config() -> List[Dict[str, Any]]:
+    return [
+        {'name': 'HIGH_VALUE_TRANSACTION', 'type': 'amount',
+         'threshold': float(os.environ.get('HIGH_VALUE_THRESHOLD', '10000'))},
+        {'name': 'HIGH_FREQUENCY', 'type': 'frequency', 'hours': 24,
+         'threshold': int(os.environ.get('HIGH_FREQUENCY_THRESHOLD', '10'))},
+        {'name': 'VELOCITY_CHECK_FAILED', 'type': 'velocity', 'hours': 24,
+         'threshold': float(os.environ.get('VELOCITY_THRESHOLD', '20000'))},
+    ]
+
+
+def build_rules(config: List[Dict[str, Any]]) -> List[Rule]:
+    rules = []
+    for entry in config:
+        options = dict(entry)
+        kind = options.pop('type')
+        if kind not in RULE_TYPES:
+            raise ValueError(f"Unknown fraud rule type: {kind}")
+        rules.append(RULE_TYPES[kind](**options))
+    return rules
+
+
+class RulesEngine:
+    """Runs every rule for a transaction and keeps per-rule timings."""
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+        # Buckets the rules need; at least the current hour
+        self.window_hours = max([rule.hours for rule in rules] + [1])
+        self.reset_stats()
+
+    @classmethod
+    def from_environment(cls) -> 'RulesEngine':
+        config = os.environ.get('FRAUD_RULES')
+        return cls(build_rules(json.loads(config) if config else default_rule_config()))
+
+    def new_history(self) -> History:
+        return History(self.window_hours)
+
+    def evaluate(self, amount: float, moment: datetime, location: Optional[str], history: History) -> List[str]:
+        """Names of the rules that fired, in configuration order."""
+        fired = []
+        for rule in self.rules:
+            start = time.perf_counter_ns()
+            hit = rule(amount, moment, location, history)
+            stats = self.stats[rule.name]
+            stats['evaluations'] += 1
+            stats['nanoseconds'] += time.perf_counter_ns() - start
+            if hit:
+                stats['fired'] += 1
+                fired.append(rule.name)
+        return fired
+
+    def reset_stats(self) -> None:
+        self.stats = {rule.name: {'evaluations': 0, 'fired': 0, 'nanoseconds': 0} for rule in self.rules}
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Evaluations, hits and mean microseconds per rule since the last reset."""
+        return {
+            name: {
+                'evaluations': stats['evaluations'],
+                'fired': stats['fired'],
+                'mean_us': round(stats['nanoseconds'] / stats['evaluations'] / 1000, 3) if stats['evaluations'] else 0.0,
+            }
+            for name, stats in self.stats.items()
+        }
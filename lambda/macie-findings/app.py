@@ -1,74 +1,202 @@
 import json
-import boto3
-from datetime import datetime
-from typing import Dict, Any
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List
+
+import aws_clients
+
+# Buckets this environment has already encrypted, with when to check again.
+# Kept across warm invocations so a burst of findings on one bucket
+# remediates it once.
+BUCKET_CACHE_SECONDS = float(os.environ.get('MACIE_BUCKET_CACHE_SECONDS', '300'))
+_encrypted_buckets: Dict[str, float] = {}
+# Most findings Security Hub accepts in one BatchImportFindings call
+SECURITY_HUB_BATCH_SIZE = 100
+# Object keys listed in one bucket alert
+ALERT_MAX_OBJECTS = 50
+
+def needs_remediation(finding: Dict[str, Any]) -> bool:
+   return finding['severity']['description'] == 'HIGH' and 'Unencrypted' in finding['description']
+
+def ensure_bucket_encrypted(s3, bucket_name: str) -> bool:
+   """Enable default encryption on the bucket unless this environment did so
+   recently; returns whether a call was made."""
+   now = time.monotonic()
+   if _encrypted_buckets.get(bucket_name, 0) > now:
+       return False
+   s3.put_bucket_encryption(
+       Bucket=bucket_name,
+       ServerSideEncryptionConfiguration={
+           'Rules': [
+               {
+                   'ApplyServerSideEncryptionByDefault': {
+                       'SSEAlgorithm': 'AES256'
+                   }
+               }
+           ]
+       }
+   )
+   _encrypted_buckets[bucket_name] = now + BUCKET_CACHE_SECONDS
+   return True
+
+def security_hub_finding(finding: Dict[str, Any]) -> Dict[str, Any]:
+   bucket_name = finding['resourcesAffected']['s3Bucket']['name']
+   object_key = finding['resourcesAffected']['s3Object']['key']
+   now = datetime.now(timezone.utc).isoformat()
+   return {
+       'SchemaVersion': '2018-10-08',
+       'Id': finding['id'],
+       # Findings imported by this account go to its default product
+       'ProductArn': f"arn:aws:securityhub:{finding['region']}:{finding['accountId']}:product/{finding['accountId']}/default",
+       'GeneratorId': 'macie-sensitive-data',
+       'AwsAccountId': finding['accountId'],
+       'Types': ['Software and Configuration Checks/AWS Security Best Practices'],
+       'CreatedAt': now,
+       'UpdatedAt': now,
+       'Severity': {'Label': 'HIGH'},
+       # Required by BatchImportFindings
+       'Resources': [{'Type': 'AwsS3Bucket', 'Id': f'arn:aws:s3:::{bucket_name}', 'Region': finding['region']}],
+       'Title': 'Unencrypted Sensitive Data Detected',
+       'Description': f'Unencrypted sensitive data found in {bucket_name}/{object_key}',
+       'Remediation': {
+           'Recommendation': {
+               'Text': 'Bucket encryption has been automatically enabled'
+           }
+       }
+   }
+
+def import_findings(security_hub, findings: List[Dict[str, Any]]) -> List[str]:
+   """Import findings SECURITY_HUB_BATCH_SIZE at a time; returns the IDs
+   Security Hub did not accept."""
+   failed = []
+   for start in range(0, len(findings), SECURITY_HUB_BATCH_SIZE):
+       batch = findings[start:start + SECURITY_HUB_BATCH_SIZE]
+       try:
+           response = security_hub.batch_import_findings(Findings=batch)
+       except Exception as e:
+           print(f"Error importing findings into Security Hub: {str(e)}")
+           failed.extend(finding['Id'] for finding in batch)
+           continue
+       failed.extend(finding['Id'] for finding in response.get('FailedFindings', []))
+   return failed
+
+def bucket_alert(bucket_name: str, object_keys: List[str]) -> str:
+   listed = '\n'.join(f"    {key}" for key in object_keys[:ALERT_MAX_OBJECTS])
+   more = f"\n    ... and {len(object_keys) - ALERT_MAX_OBJECTS} more" if len(object_keys) > ALERT_MAX_OBJECTS else ''
+   return f"""
+               Critical security alert:
+               - Bucket: {bucket_name}
+               - Issue: Unencrypted sensitive data in {len(object_keys)} object(s)
+               - Action: Bucket encryption enabled
+               - Time: {datetime.now(timezone.utc).isoformat()}
+               - Objects:
+{listed}{more}
+               """
+
+def batch_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+   """
+   Handles a batch of Macie findings buffered in SQS.
+
+   Findings are grouped per bucket: each affected bucket is encrypted at
+   most once (and not again while cached), Security Hub gets the findings
+   in full batches and the security team one alert per bucket. Records
+   that cannot be parsed (including findings to remediate that lack the
+   object key, region, account or ID the import and alert need), whose
+   bucket could not be remediated or whose finding Security Hub rejected
+   are reported in batchItemFailures.
+   """
+   s3 = aws_clients.client('s3')
+   sns = aws_clients.client('sns')
+   security_hub = aws_clients.client('securityhub')
+   failures = []
+
+   # bucket -> (Security Hub finding, object key, record) per finding to
+   # remediate; building them here rejects incomplete findings up front
+   by_bucket: Dict[str, List[Any]] = {}
+   for record in event['Records']:
+       try:
+           finding = json.loads(record['body'])['detail']
+           bucket_name = finding['resourcesAffected']['s3Bucket']['name']
+           if not needs_remediation(finding):
+               continue
+           object_key = finding['resourcesAffected']['s3Object']['key']
+           hub_finding = security_hub_finding(finding)
+       except (KeyError, TypeError, ValueError) as e:
+           print(f"Skipping malformed Macie finding record: {str(e)}")
+           failures.append(record['messageId'])
+           continue
+       by_bucket.setdefault(bucket_name, []).append((hub_finding, object_key, record['messageId']))
+
+   remediated = {}
+   for bucket_name, findings in by_bucket.items():
+       try:
+           ensure_bucket_encrypted(s3, bucket_name)
+       except Exception as e:
+           print(f"Error encrypting bucket {bucket_name}: {str(e)}")
+           failures.extend(message_id for _, _, message_id in findings)
+           continue
+       remediated[bucket_name] = findings
+
+   # Send to Security Hub
+   records_by_finding: Dict[str, List[str]] = {}
+   hub_findings = []
+   for findings in remediated.values():
+       for hub_finding, _, message_id in findings:
+           if hub_finding['Id'] not in records_by_finding:
+               hub_findings.append(hub_finding)
+           records_by_finding.setdefault(hub_finding['Id'], []).append(message_id)
+   for finding_id in import_findings(security_hub, hub_findings):
+       failures.extend(records_by_finding[finding_id])
+
+   # Alert security team, one message per bucket
+   for bucket_name, findings in remediated.items():
+       object_keys = [object_key for _, object_key, _ in findings]
+       try:
+           sns.publish(
+               TopicArn=os.environ['SNS_TOPIC_ARN'],
+               Subject='Macie Alert: Sensitive Data Exposure',
+               Message=bucket_alert(bucket_name, object_keys)
+           )
+       except Exception as e:
+           # Retrying would re-import the findings; the log keeps the alert
+           print(f"Error alerting on bucket {bucket_name}: {str(e)}")
+
+   return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in dict.fromkeys(failures)]}
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
    """
    Handles Macie findings and initiates remediation.
-   Triggered by EventBridge when Macie creates a finding.
+   Triggered by EventBridge when Macie creates a finding; batches buffered
+   in SQS (events with ``Records``) go to batch_handler.
    """
-   
-   # Initialise AWS clients
-   s3 = boto3.client('s3')
-   sns = boto3.client('sns')
-   security_hub = boto3.client('securityhub')
+   if 'Records' in event:
+       return batch_handler(event, context)
+
+   # Shared AWS clients, created once per execution environment
+   s3 = aws_clients.client('s3')
+   sns = aws_clients.client('sns')
+   security_hub = aws_clients.client('securityhub')
 
    try:
        # Parse Macie finding
        finding = event['detail']
        bucket_name = finding['resourcesAffected']['s3Bucket']['name']
        object_key = finding['resourcesAffected']['s3Object']['key']
-       severity = finding['severity']['description']
 
        # Check if unencrypted sensitive data
-       if severity == 'HIGH' and 'Unencrypted' in finding['description']:
-           # Enable default encryption on bucket
-           s3.put_bucket_encryption(
-               Bucket=bucket_name,
-               ServerSideEncryptionConfiguration={
-                   'Rules': [
-                       {
-                           'ApplyServerSideEncryptionByDefault': {
-                               'SSEAlgorithm': 'AES256'
-                           }
-                       }
-                   ]
-               }
-           )
+       if needs_remediation(finding):
+           # Enable default encryption on bucket (once per cache period)
+           ensure_bucket_encrypted(s3, bucket_name)
 
            # Send to Security Hub
-           security_hub.batch_import_findings([{
-               'SchemaVersion': '2018-10-08',
-               'Id': finding['id'],
-               'ProductArn': f"arn:aws:securityhub:{finding['region']}:{finding['accountId']}:product/aws/macie",
-               'GeneratorId': 'macie-sensitive-data',
-               'AwsAccountId': finding['accountId'],
-               'Types': ['Software and Configuration Checks/AWS Security Best Practices'],
-               'CreatedAt': datetime.now().isoformat(),
-               'UpdatedAt': datetime.now().isoformat(),
-               'Severity': {'Label': 'HIGH'},
-               'Title': 'Unencrypted Sensitive Data Detected',
-               'Description': f'Unencrypted sensitive data found in {bucket_name}/{object_key}',
-               'Remediation': {
-                   'Recommendation': {
-                       'Text': 'Bucket encryption has been automatically enabled'
-                   }
-               }
-           }])
+           security_hub.batch_import_findings(Findings=[security_hub_finding(finding)])
 
            # Alert security team
            sns.publish(
-               TopicArn='YOUR_SNS_TOPIC_ARN',
+               TopicArn=os.environ['SNS_TOPIC_ARN'],
                Subject='Macie Alert: Sensitive Data Exposure',
-               Message=f"""
-               Critical security alert:
-               - Bucket: {bucket_name}
-               - Object: {object_key}
-               - Issue: Unencrypted sensitive data
-               - Action: Bucket encryption enabled
-               - Time: {datetime.now().isoformat()}
-               """
+               Message=bucket_alert(bucket_name, [object_key])
            )
 
        return {
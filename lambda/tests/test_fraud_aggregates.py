@@ -0,0 +1,123 @@
+"""fraud-detection against moto's DynamoDB and SNS.
+
+Pins the semantics of the hourly aggregates: the transaction being checked
+counts towards its own window, and the window is the current hour bucket
+plus the 23 before it, so a bucket 24 hours old no longer counts.
+
+    python -m pytest lambda/tests
+"""
+import importlib.util
+import json
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+moto = pytest.importorskip("moto")
+import boto3  # noqa: E402
+
+LAMBDA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCTION_DIR = os.path.join(LAMBDA_DIR, "fraud-detection")
+NOW = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return NOW if tz is not None else NOW.replace(tzinfo=None)
+
+
+@pytest.fixture
+def fraud(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-west-2")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("DYNAMODB_TABLE", "fraud-alerts")
+    monkeypatch.setenv("FRAUD_AGGREGATES_TABLE", "fraud-aggregates")
+    monkeypatch.delenv("FRAUD_RULES", raising=False)
+    monkeypatch.delenv("HIGH_FREQUENCY_THRESHOLD", raising=False)
+    # Shared modules sit next to app.py in the deployed zips
+    for path in (os.path.join(LAMBDA_DIR, "common"), FUNCTION_DIR):
+        monkeypatch.syspath_prepend(path)
+
+    with moto.mock_aws():
+        dynamodb = boto3.resource("dynamodb")
+        for name, range_key in (("fraud-alerts", "transaction_id"), ("fraud-aggregates", "bucket")):
+            dynamodb.create_table(
+                TableName=name,
+                KeySchema=[{"AttributeName": "user_id", "KeyType": "HASH"},
+                           {"AttributeName": range_key, "KeyType": "RANGE"}],
+                AttributeDefinitions=[{"AttributeName": "user_id", "AttributeType": "S"},
+                                      {"AttributeName": range_key, "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+            )
+        topic_arn = boto3.client("sns").create_topic(Name="fraud-alerts")["TopicArn"]
+        monkeypatch.setenv("SNS_TOPIC_ARN", topic_arn)
+
+        sys.modules.pop("rules", None)
+        sys.modules.pop("aws_clients", None)
+        spec = importlib.util.spec_from_file_location(
+            f"fraud_detection_app_{uuid.uuid4().hex}", os.path.join(FUNCTION_DIR, "app.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        monkeypatch.setattr(module, "datetime", FrozenDatetime)
+        yield module
+        sys.modules.pop("rules", None)
+        sys.modules.pop("aws_clients", None)
+
+
+def transaction(user_id, index, amount=25.0):
+    return {
+        "transaction_id": f"{user_id}-{index}",
+        "user_id": user_id,
+        "amount": amount,
+        "timestamp": NOW.isoformat(),
+        "location": "London",
+    }
+
+
+def check(fraud, body):
+    response = fraud.lambda_handler({"body": json.dumps(body)}, None)
+    return json.loads(response["body"]).get("risk_factors", [])
+
+
+def seed_bucket(fraud, user_id, hours_ago, count):
+    fraud.aws_clients.table("fraud-aggregates").put_item(Item={
+        "user_id": user_id,
+        "bucket": fraud.hour_bucket(NOW - timedelta(hours=hours_ago)),
+        "txn_count": count,
+        "txn_amount": 25 * count,
+    })
+
+
+def test_eleventh_transaction_fires_high_frequency(fraud):
+    fired = [check(fraud, transaction("alice", index)) for index in range(1, 12)]
+
+    assert all("HIGH_FREQUENCY" not in risk_factors for risk_factors in fired[:10])
+    assert "HIGH_FREQUENCY" in fired[10]
+
+
+def test_eleventh_transaction_in_one_batch_fires(fraud):
+    records = [
+        {"messageId": f"m{index}", "body": json.dumps(transaction("bob", index))}
+        for index in range(1, 12)
+    ]
+
+    assert fraud.batch_handler({"Records": records}, None) == {"batchItemFailures": []}
+
+    alerts = fraud.aws_clients.table("fraud-alerts").scan()["Items"]
+    assert [(alert["transaction_id"], alert["risk_factors"]) for alert in alerts] == [
+        ("bob-11", ["HIGH_FREQUENCY"]),
+    ]
+
+
+def test_window_counts_the_last_24_hour_buckets(fraud):
+    # 24 hours back is outside the window, however busy it was
+    seed_bucket(fraud, "carol", hours_ago=24, count=100)
+    assert "HIGH_FREQUENCY" not in check(fraud, transaction("carol", 1))
+
+    # 23 hours back is inside: 9 there, the one above and this one make 11
+    seed_bucket(fraud, "carol", hours_ago=23, count=9)
+    assert "HIGH_FREQUENCY" in check(fraud, transaction("carol", 2))
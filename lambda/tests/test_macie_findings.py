@@ -0,0 +1,87 @@
+"""macie-findings batch handling against moto's S3, SNS and Security Hub.
+
+    python -m pytest lambda/tests
+"""
+import importlib.util
+import json
+import os
+import sys
+import uuid
+
+import pytest
+
+moto = pytest.importorskip("moto")
+import boto3  # noqa: E402
+
+LAMBDA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCTION_DIR = os.path.join(LAMBDA_DIR, "macie-findings")
+
+
+@pytest.fixture
+def macie(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-west-2")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    # Shared modules sit next to app.py in the deployed zips
+    monkeypatch.syspath_prepend(os.path.join(LAMBDA_DIR, "common"))
+
+    with moto.mock_aws():
+        boto3.client("s3").create_bucket(
+            Bucket="customer-data", CreateBucketConfiguration={"LocationConstraint": "eu-west-2"})
+        topic_arn = boto3.client("sns").create_topic(Name="security-alerts")["TopicArn"]
+        monkeypatch.setenv("SNS_TOPIC_ARN", topic_arn)
+
+        sys.modules.pop("aws_clients", None)
+        spec = importlib.util.spec_from_file_location(
+            f"macie_findings_app_{uuid.uuid4().hex}", os.path.join(FUNCTION_DIR, "app.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        yield module
+        sys.modules.pop("aws_clients", None)
+
+
+def finding(finding_id, severity="HIGH", **overrides):
+    detail = {
+        "id": finding_id,
+        "accountId": "123456789012",
+        "region": "eu-west-2",
+        "severity": {"description": severity},
+        "description": "Unencrypted sensitive data",
+        "resourcesAffected": {
+            "s3Bucket": {"name": "customer-data"},
+            "s3Object": {"key": f"exports/{finding_id}.csv"},
+        },
+    }
+    detail.update(overrides)
+    return detail
+
+
+def record(message_id, detail):
+    return {"messageId": message_id, "body": json.dumps({"detail": detail})}
+
+
+def test_incomplete_findings_are_reported_not_imported(macie):
+    no_object = finding("f-2")
+    del no_object["resourcesAffected"]["s3Object"]
+    low_without_object = finding("f-5", severity="LOW")
+    del low_without_object["resourcesAffected"]["s3Object"]
+    records = [
+        record("m-1", finding("f-1")),
+        record("m-2", no_object),
+        record("m-3", {key: value for key, value in finding("f-3").items() if key != "region"}),
+        record("m-4", {key: value for key, value in finding("f-4").items() if key != "accountId"}),
+        # Not remediated, so the object key is not needed
+        record("m-5", low_without_object),
+    ]
+
+    result = macie.batch_handler({"Records": records}, None)
+
+    assert result == {"batchItemFailures": [
+        {"itemIdentifier": "m-2"}, {"itemIdentifier": "m-3"}, {"itemIdentifier": "m-4"},
+    ]}
+    imported = boto3.client("securityhub").get_findings()["Findings"]
+    assert [hub_finding["Id"] for hub_finding in imported] == ["f-1"]
+    assert imported[0]["ProductArn"] == "arn:aws:securityhub:eu-west-2:123456789012:product/123456789012/default"
+    encryption = boto3.client("s3").get_bucket_encryption(Bucket="customer-data")
+    rules = encryption["ServerSideEncryptionConfiguration"]["Rules"]
+    assert rules[0]["ApplyServerSideEncryptionByDefault"]["SSEAlgorithm"] == "AES256"
@@ -68,6 +68,7 @@ module "compute" {
     production_vpc_id = module.vpcs["production"].vpc_id
     lambda_role_arn = module.security.lambda_role_arn
     dynamodb_table_name = module.database.dynamodb_table_name
+    fraud_aggregates_table_name = module.database.fraud_aggregates_table_name
     sns_topic_arn = module.monitoring.sns_topic_arn
     rest_api_id = module.api.rest_api_id
     cloudwatch_event_rule_macie_findings_arn = module.monitoring.cloudwatch_event_rule_macie_findings_arn
@@ -109,7 +110,9 @@ module "monitoring" {
     network_firewall_arn = module.security.network_firewall_arn
     dynamodb_table_name = module.database.dynamodb_table_name
     macie_findings_arn = module.compute.macie_findings_arn
+    macie_findings_queue_arn = module.compute.macie_findings_queue_arn
     config_rules_arn = module.compute.config_rules_arn
+    config_rule_changes_queue_arn = module.compute.config_rule_changes_queue_arn
 }
 
 # Security Module
@@ -126,6 +129,7 @@ module "security" {
     firewall_logs_name = module.monitoring.network_firewall_logs_name
     sns_topic_arn = module.monitoring.sns_topic_arn
     dynamodb_table_name = module.database.dynamodb_table_name
+    fraud_aggregates_table_arn = module.database.fraud_aggregates_table_arn
     aurora_cluster_arn = module.database.aurora_cluster_arn
     api_log_group_arn = module.monitoring.api_log_group_arn
     eks_oidc_provider_arn = module.eks.oidc_provider_arn
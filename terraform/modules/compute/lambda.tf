@@ -14,6 +14,7 @@ resource "aws_lambda_function" "fraud_detection" {
     environment {
       variables = {
         DYNAMODB_TABLE = var.dynamodb_table_name
+        FRAUD_AGGREGATES_TABLE = var.fraud_aggregates_table_name
         SNS_TOPIC_ARN = var.sns_topic_arn
       }
     }
@@ -33,6 +34,34 @@ resource "aws_lambda_permission" "api_gateway_invoke" {
     source_arn = "arn:aws:execute-api:${var.region}:${data.aws_caller_identity.current.account_id}:${var.rest_api_id}/*"
 }
 
+# Queue feeding transactions to fraud detection in batches
+resource "aws_sqs_queue" "fraud_transactions_dlq" {
+    name = "fraud-transactions-dlq"
+    message_retention_seconds = 1209600
+    sqs_managed_sse_enabled = true
+}
+
+resource "aws_sqs_queue" "fraud_transactions" {
+    name = "fraud-transactions"
+    # Six times the function timeout, as Lambda recommends for SQS sources
+    visibility_timeout_seconds = 180
+    sqs_managed_sse_enabled = true
+
+    redrive_policy = jsonencode({
+        deadLetterTargetArn = aws_sqs_queue.fraud_transactions_dlq.arn
+        maxReceiveCount = 5
+    })
+}
+
+# Batches go to batch_handler (via lambda_handler); only failed records are retried
+resource "aws_lambda_event_source_mapping" "fraud_transactions" {
+    event_source_arn = aws_sqs_queue.fraud_transactions.arn
+    function_name = aws_lambda_function.fraud_detection.arn
+    batch_size = 100
+    maximum_batching_window_in_seconds = 1
+    function_response_types = ["ReportBatchItemFailures"]
+}
+
 # Lambda Function for Macie Findings
 resource "aws_lambda_function" "macie_findings" {
     filename = "${path.module}/../../../lambda/macie-findings/macie-findings.zip" 
@@ -56,6 +85,57 @@ resource "aws_lambda_function" "macie_findings" {
     }
 }
 
+# Queue buffering Macie findings, so findings on the same bucket are handled together
+resource "aws_sqs_queue" "macie_findings_dlq" {
+    name = "macie-findings-dlq"
+    message_retention_seconds = 1209600
+    sqs_managed_sse_enabled = true
+}
+
+resource "aws_sqs_queue" "macie_findings" {
+    name = "macie-findings"
+    # Six times the function timeout, as Lambda recommends for SQS sources
+    visibility_timeout_seconds = 180
+    sqs_managed_sse_enabled = true
+
+    redrive_policy = jsonencode({
+        deadLetterTargetArn = aws_sqs_queue.macie_findings_dlq.arn
+        maxReceiveCount = 5
+    })
+}
+
+resource "aws_sqs_queue_policy" "macie_findings" {
+    queue_url = aws_sqs_queue.macie_findings.id
+
+    policy = jsonencode({
+        Version = "2012-10-17"
+        Statement = [
+            {
+                Effect = "Allow"
+                Principal = {
+                    Service = "events.amazonaws.com"
+                }
+                Action = "sqs:SendMessage"
+                Resource = aws_sqs_queue.macie_findings.arn
+                Condition = {
+                    ArnLike = {
+                        "aws:SourceArn" = "arn:aws:events:${var.region}:${data.aws_caller_identity.current.account_id}:rule/macie-findings-rule"
+                    }
+                }
+            }
+        ]
+    })
+}
+
+# Waits up to 10 seconds to collect a burst; batch_handler groups it per bucket
+resource "aws_lambda_event_source_mapping" "macie_findings" {
+    event_source_arn = aws_sqs_queue.macie_findings.arn
+    function_name = aws_lambda_function.macie_findings.arn
+    batch_size = 1000
+    maximum_batching_window_in_seconds = 10
+    function_response_types = ["ReportBatchItemFailures"]
+}
+
 # Lambda Function for Config Rule Changes
 resource "aws_lambda_function" "config_rules" {
     filename = "${path.module}/../../../lambda/config-rule-changes/config-rule-changes.zip" 
@@ -82,6 +162,57 @@ resource "aws_lambda_function" "config_rules" {
     }
 }
 
+# Queue buffering Config change events, so bursts reach config-rule-changes in batches
+resource "aws_sqs_queue" "config_rule_changes_dlq" {
+    name = "config-rule-changes-dlq"
+    message_retention_seconds = 1209600
+    sqs_managed_sse_enabled = true
+}
+
+resource "aws_sqs_queue" "config_rule_changes" {
+    name = "config-rule-changes"
+    # Six times the function timeout, as Lambda recommends for SQS sources
+    visibility_timeout_seconds = 180
+    sqs_managed_sse_enabled = true
+
+    redrive_policy = jsonencode({
+        deadLetterTargetArn = aws_sqs_queue.config_rule_changes_dlq.arn
+        maxReceiveCount = 5
+    })
+}
+
+resource "aws_sqs_queue_policy" "config_rule_changes" {
+    queue_url = aws_sqs_queue.config_rule_changes.id
+
+    policy = jsonencode({
+        Version = "2012-10-17"
+        Statement = [
+            {
+                Effect = "Allow"
+                Principal = {
+                    Service = "events.amazonaws.com"
+                }
+                Action = "sqs:SendMessage"
+                Resource = aws_sqs_queue.config_rule_changes.arn
+                Condition = {
+                    ArnLike = {
+                        "aws:SourceArn" = "arn:aws:events:${var.region}:${data.aws_caller_identity.current.account_id}:rule/config-rule-changees"
+                    }
+                }
+            }
+        ]
+    })
+}
+
+# Waits up to 10 seconds to collect a burst; batch_handler dedupes it per security group
+resource "aws_lambda_event_source_mapping" "config_rule_changes" {
+    event_source_arn = aws_sqs_queue.config_rule_changes.arn
+    function_name = aws_lambda_function.config_rules.arn
+    batch_size = 500
+    maximum_batching_window_in_seconds = 10
+    function_response_types = ["ReportBatchItemFailures"]
+}
+
 # Lambda Permission to allow EventBridge invocation
 resource "aws_lambda_permission" "allow_eventbridge" {
     for_each = {
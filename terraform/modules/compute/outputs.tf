@@ -16,4 +16,16 @@ output "fraud_detection_invoke_arn" {
 
 output "config_rules_arn" {
     value = aws_lambda_function.config_rules.arn
+}
+
+output "fraud_transactions_queue_url" {
+    value = aws_sqs_queue.fraud_transactions.url
+}
+
+output "config_rule_changes_queue_arn" {
+    value = aws_sqs_queue.config_rule_changes.arn
+}
+
+output "macie_findings_queue_arn" {
+    value = aws_sqs_queue.macie_findings.arn
 }
\ No newline at end of file
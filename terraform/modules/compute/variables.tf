@@ -59,6 +59,11 @@ variable "dynamodb_table_name" {
     description = "DynamoDB Table Name"
 }
 
+variable "fraud_aggregates_table_name" {
+    type = string
+    description = "DynamoDB Table Name for Fraud Detection Hourly Aggregates"
+}
+
 variable "sns_topic_arn" {
     type = string
     description = "SNS Topic ARN"
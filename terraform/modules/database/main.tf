@@ -244,6 +244,38 @@ resource "aws_dynamodb_table" "banking" {
     })
 }
 
+# Fraud detection rolling-window counters (one item per user per hour)
+resource "aws_dynamodb_table" "fraud_aggregates" {
+    name = "fraud-aggregates"
+    billing_mode = "PAY_PER_REQUEST"
+    hash_key = "user_id"
+    range_key = "bucket"
+
+    attribute {
+        name = "user_id"
+        type = "S"
+    }
+
+    attribute {
+        name = "bucket"
+        type = "S"
+    }
+
+    ttl {
+        attribute_name = "expires_at"
+        enabled = true
+    }
+
+    server_side_encryption {
+        enabled = true
+        kms_key_arn = var.database_kms_key_arn
+    }
+
+    tags = merge(local.common_tags, {
+        Name = "Fraud Aggregates"
+    })
+}
+
 # Backup Vault Primary Region
 resource "aws_backup_vault" "primary" {
     name = "banking-backup-vault-primary"
@@ -18,4 +18,12 @@ output "aurora_cluster_arn" {
 
 output "dynamodb_table_name" {
   value = aws_dynamodb_table.banking.name
+}
+
+output "fraud_aggregates_table_name" {
+  value = aws_dynamodb_table.fraud_aggregates.name
+}
+
+output "fraud_aggregates_table_arn" {
+  value = aws_dynamodb_table.fraud_aggregates.arn
 }
\ No newline at end of file
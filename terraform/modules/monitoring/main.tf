@@ -260,11 +260,11 @@ resource "aws_cloudwatch_event_rule" "macie_findings" {
     })
 }
 
-# EventBridge Target (Lambda)
+# EventBridge Target (SQS queue in front of the Lambda, which reads it in batches)
 resource "aws_cloudwatch_event_target" "macie_lambda" {
     rule = aws_cloudwatch_event_rule.macie_findings.name
-    target_id = "MacieToLambda"
-    arn = var.macie_findings_arn
+    target_id = "MacieToQueue"
+    arn = var.macie_findings_queue_arn
 }
 
 # EventBridge Rule for Macie Findings
@@ -285,9 +285,9 @@ resource "aws_cloudwatch_event_rule" "config_rules" {
     })      
 }
 
-# EventBridge Target (Lambda)
+# EventBridge Target (SQS queue in front of the Lambda, which reads it in batches)
 resource "aws_cloudwatch_event_target" "config_lambda" {
     rule = aws_cloudwatch_event_rule.config_rules.name
-    target_id = "ConfigRulesLambda"
-    arn = var.config_rules_arn
+    target_id = "ConfigRulesQueue"
+    arn = var.config_rule_changes_queue_arn
 }
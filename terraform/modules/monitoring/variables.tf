@@ -52,7 +52,17 @@ variable "macie_findings_arn" {
     description = "Lambda Function ARN for Macie Findings"
 }
 
+variable "macie_findings_queue_arn" {
+    type = string
+    description = "SQS Queue ARN buffering findings for the Macie Findings Lambda"
+}
+
 variable "config_rules_arn" {
     type = string
     description = "Lambda Function ARN for Config Rule Changes"
+}
+
+variable "config_rule_changes_queue_arn" {
+    type = string
+    description = "SQS Queue ARN buffering events for the Config Rule Changes Lambda"
 }
\ No newline at end of file
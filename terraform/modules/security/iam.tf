@@ -194,10 +194,37 @@ resource "aws_iam_policy" "lambda_fraud" {
                 Effect = "Allow"
                 Action = [
                     "dynamodb:Query",
-                    "dynamodb:PutItem"        
+                    "dynamodb:PutItem",
+                    "dynamodb:BatchWriteItem"
                 ]
                 Resource = var.dynamodb_table_name
             },
+            {
+                Effect = "Allow"
+                Action = [
+                    "dynamodb:Query",
+                    "dynamodb:UpdateItem"
+                ]
+                Resource = var.fraud_aggregates_table_arn
+            },
+            {
+                # fraud-aggregates is encrypted with the database key
+                Effect = "Allow"
+                Action = [
+                    "kms:Decrypt",
+                    "kms:GenerateDataKey"
+                ]
+                Resource = aws_kms_key.database.arn
+            },
+            {
+                Effect = "Allow"
+                Action = [
+                    "sqs:ReceiveMessage",
+                    "sqs:DeleteMessage",
+                    "sqs:GetQueueAttributes"
+                ]
+                Resource = "arn:aws:sqs:${var.region}:${data.aws_caller_identity.current.account_id}:fraud-transactions"
+            },
             {
                 Effect = "Allow"
                 Action = [
@@ -243,6 +270,15 @@ resource "aws_iam_policy" "lambda_macie" {
                     "securityhub:UpdateFindings"
                 ]
                 Resource = "*"
+            },
+            {
+                Effect = "Allow"
+                Action = [
+                    "sqs:ReceiveMessage",
+                    "sqs:DeleteMessage",
+                    "sqs:GetQueueAttributes"
+                ]
+                Resource = "arn:aws:sqs:${var.region}:${data.aws_caller_identity.current.account_id}:macie-findings"
             }
         ]
     })
@@ -264,6 +300,15 @@ resource "aws_iam_policy" "lambda_config" {
                 ]
                 Resource = "*"
             },
+            {
+                Effect = "Allow"
+                Action = [
+                    "sqs:ReceiveMessage",
+                    "sqs:DeleteMessage",
+                    "sqs:GetQueueAttributes"
+                ]
+                Resource = "arn:aws:sqs:${var.region}:${data.aws_caller_identity.current.account_id}:config-rule-changes"
+            },
             {
                 Effect = "Allow"
                 Action = [
@@ -376,6 +421,66 @@ resource "aws_iam_role" "eks_service_account" {
     })
 }
 
+# transaction-service pods (IRSA): publish transaction events from the
+# outbox to the fraud-transactions queue
+resource "aws_iam_role" "transaction_service" {
+    name = "transaction-service-role"
+
+    assume_role_policy = jsonencode({
+        Version = "2012-10-17"
+        Statement = [{
+            Action = "sts:AssumeRoleWithWebIdentity"
+            Effect = "Allow"
+            Principal = {
+                Federated = var.eks_oidc_provider_arn
+            }
+            Condition = {
+                StringEquals = {
+                    "${var.eks_cluster_oidc_issuer_url}:aud" = "sts.amazonaws.com",
+                    "${var.eks_cluster_oidc_issuer_url}:sub" = "system:serviceaccount:default:transaction-service"
+                }
+            }
+        }]
+    })
+}
+
+# Session token key for the secrets-store CSI volume (banking-secrets)
+resource "aws_iam_role_policy" "transaction_service_secrets" {
+    name = "transaction-service-secrets"
+    role = aws_iam_role.transaction_service.id
+
+    policy = jsonencode({
+        Version = "2012-10-17"
+        Statement = [
+            {
+                Effect = "Allow"
+                Action = [
+                    "secretsmanager:GetSecretValue"
+                ]
+                Resource = "arn:aws:secretsmanager:${var.region}:${data.aws_caller_identity.current.account_id}:secret:banking-secrets*"
+            }
+        ]
+    })
+}
+
+resource "aws_iam_role_policy" "transaction_service_outbox" {
+    name = "transaction-service-outbox"
+    role = aws_iam_role.transaction_service.id
+
+    policy = jsonencode({
+        Version = "2012-10-17"
+        Statement = [
+            {
+                Effect = "Allow"
+                Action = [
+                    "sqs:SendMessage"
+                ]
+                Resource = "arn:aws:sqs:${var.region}:${data.aws_caller_identity.current.account_id}:fraud-transactions"
+            }
+        ]
+    })
+}
+
 # Policies for Service Accounts
 resource "aws_iam_policy" "dynamodb_eks" {
     name = "dynamodb-eks-policy"
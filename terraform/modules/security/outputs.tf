@@ -72,3 +72,7 @@ output "alb_s3_bucket_policy" {
 output "eks_service_account_role_arn" {
     value = aws_iam_role.eks_service_account.arn
 }
+
+output "transaction_service_role_arn" {
+    value = aws_iam_role.transaction_service.arn
+}
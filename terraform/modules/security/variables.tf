@@ -60,6 +60,11 @@ variable "dynamodb_table_name" {
     description = "DynamoDB Table Name"
 }
 
+variable "fraud_aggregates_table_arn" {
+    type = string
+    description = "DynamoDB Table ARN for Fraud Detection Hourly Aggregates"
+}
+
 variable "sns_topic_arn" {
     type = string
     description = "SNS Topic ARN"
@@ -50,3 +50,12 @@ output "vpc_cidr_blocks" {
     description = "List of all VPC CIDR blocks"
     value = [for vpc_name, vpc in var.vpc_configs : vpc.cidr_block]
 }
+
+# Wired into the transaction-service ServiceAccount and banking-config
+output "transaction_service_role_arn" {
+    value = module.security.transaction_service_role_arn
+}
+
+output "fraud_transactions_queue_url" {
+    value = module.compute.fraud_transactions_queue_url
+}